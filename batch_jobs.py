@@ -0,0 +1,392 @@
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import requests
+import openai
+from langchain_core.prompts import PromptTemplate
+
+
+# Batch settings, overridable through the environment
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("BATCH_POLL_INTERVAL_SECONDS", "30"))
+BATCH_TIMEOUT_SECONDS = float(os.getenv("BATCH_TIMEOUT_SECONDS", str(26 * 60 * 60)))
+LOCAL_BATCH_ROOT = os.getenv("LOCAL_BATCH_ROOT", "batch_jobs")
+
+# Batch statuses after which polling stops
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_chat_request(custom_id, prompt, model="gpt-4o-mini", temperature=0.1, max_tokens=None):
+    """
+    Build one line of a batch input file for the Chat Completions endpoint.
+
+    Args:
+        custom_id (str): Identifier used to map the result back to its resume.
+        prompt (str): The fully rendered prompt.
+        model (str, optional): The OpenAI model name. Defaults to "gpt-4o-mini".
+        temperature (float, optional): Sampling temperature. Defaults to 0.1.
+        max_tokens (int, optional): Completion token cap. Defaults to None.
+
+    Returns:
+        dict: The batch request line.
+    """
+    body = {
+        "model": model,
+        "messages": [{"role": "system", "content": prompt}],
+        "temperature": temperature,
+    }
+    if max_tokens is not None:
+        body["max_tokens"] = max_tokens
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def write_jsonl(path, lines):
+    """
+    Write dictionaries to a JSONL file, one per line.
+
+    Args:
+        path (str): Output path; parent directories are created.
+        lines (Iterable[dict]): The records to write.
+
+    Returns:
+        str: The path written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(content):
+    """
+    Map a batch output file back to response texts.
+
+    Args:
+        content (str): Raw JSONL content of the output file.
+
+    Returns:
+        tuple: (results, errors) where `results` maps custom_id to the response text and
+               `errors` maps custom_id to an error description.
+    """
+    results, errors = {}, {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            errors[custom_id] = record.get("error") or response.get("body")
+            continue
+        results[custom_id] = response["body"]["choices"][0]["message"]["content"]
+    return results, errors
+
+
+class OpenAIBatchClient:
+    """
+    Thin client for the OpenAI Files and Batches HTTP API.
+
+    The installed SDK predates batch jobs, so the endpoints are called directly with the
+    same API key and base URL the SDK is configured with.
+    """
+
+    def __init__(self, api_key=None, api_base=None):
+        self.api_key = api_key or openai.api_key
+        self.api_base = (api_base or openai.api_base).rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {self.api_key}"
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(method, f"{self.api_base}{path}", timeout=120, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def upload_file(self, path):
+        """Upload a JSONL input file and return its file id."""
+        with open(path, "rb") as f:
+            response = self._request("POST", "/files", files={"file": (os.path.basename(path), f)},
+                                     data={"purpose": "batch"})
+        return response.json()["id"]
+
+    def create_batch(self, input_file_id):
+        """Create a batch job for an uploaded input file and return the batch object."""
+        return self._request("POST", "/batches", json={
+            "input_file_id": input_file_id,
+            "endpoint": BATCH_ENDPOINT,
+            "completion_window": BATCH_COMPLETION_WINDOW,
+        }).json()
+
+    def retrieve_batch(self, batch_id):
+        """Return the current batch object."""
+        return self._request("GET", f"/batches/{batch_id}").json()
+
+    def file_content(self, file_id):
+        """Return the content of an output or error file."""
+        return self._request("GET", f"/files/{file_id}/content").text
+
+
+def local_stand_in_response(body):
+    """
+    Deterministic offline answer used by the local stand-in server.
+
+    The text depends only on the request, so repeated runs produce the same scorecard.
+
+    Args:
+        body (dict): The chat completion request body.
+
+    Returns:
+        str: A response text containing a two-digit score.
+    """
+    prompt = body["messages"][-1]["content"]
+    score = 10 + int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 90
+    return f"Local stand-in response. Score {score}"
+
+
+class LocalBatchServer:
+    """
+    File-based stand-in for the provider's batch service.
+
+    Input files, batch objects and output files live under `root` in the same formats the
+    real API uses. `process_pending` completes every submitted batch by answering each
+    request with `responder(body)`, so the whole bulk flow can run offline.
+    """
+
+    def __init__(self, root=LOCAL_BATCH_ROOT, responder=local_stand_in_response):
+        self.root = root
+        self.responder = responder
+        os.makedirs(os.path.join(root, "files"), exist_ok=True)
+        os.makedirs(os.path.join(root, "batches"), exist_ok=True)
+
+    def file_path(self, file_id):
+        return os.path.join(self.root, "files", f"{file_id}.jsonl")
+
+    def batch_path(self, batch_id):
+        return os.path.join(self.root, "batches", f"{batch_id}.json")
+
+    def load_batch(self, batch_id):
+        with open(self.batch_path(batch_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_batch(self, batch):
+        # Write through a temp file so a polling client never reads a partial object
+        path = self.batch_path(batch["id"])
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(batch, f)
+        os.replace(path + ".tmp", path)
+
+    def process_pending(self):
+        """
+        Complete every batch that is still waiting.
+
+        Returns:
+            int: Number of batches processed.
+        """
+        processed = 0
+        for name in sorted(os.listdir(os.path.join(self.root, "batches"))):
+            if not name.endswith(".json"):
+                continue
+            batch = self.load_batch(name[:-len(".json")])
+            if batch["status"] != "validating":
+                continue
+            batch["status"] = "in_progress"
+            self.save_batch(batch)
+
+            output_lines, completed, failed = [], 0, 0
+            with open(self.file_path(batch["input_file_id"]), encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    try:
+                        content = self.responder(request["body"])
+                        response = {"status_code": 200, "body": {
+                            "model": request["body"]["model"],
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                         "finish_reason": "stop"}],
+                        }}
+                        output_lines.append({"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                                             "response": response, "error": None})
+                        completed += 1
+                    except Exception as e:
+                        output_lines.append({"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                                             "response": None, "error": {"message": str(e)}})
+                        failed += 1
+
+            output_file_id = f"file-{uuid.uuid4().hex}"
+            write_jsonl(self.file_path(output_file_id), output_lines)
+            batch.update({
+                "status": "completed",
+                "output_file_id": output_file_id,
+                "completed_at": int(time.time()),
+                "request_counts": {"total": completed + failed, "completed": completed, "failed": failed},
+            })
+            self.save_batch(batch)
+            processed += 1
+        return processed
+
+    def serve_forever(self, poll_interval=1.0):
+        """Watch the root directory and complete batches as they are submitted."""
+        print(f"Local batch server watching {os.path.abspath(self.root)}")
+        while True:
+            if self.process_pending():
+                print("Completed pending batches")
+            time.sleep(poll_interval)
+
+
+class LocalBatchClient:
+    """
+    Client with the same interface as OpenAIBatchClient, backed by a LocalBatchServer directory.
+
+    With `auto_process=True` the stand-in server runs in-process whenever a batch is polled;
+    otherwise run `python batch_jobs.py serve` in another terminal.
+    """
+
+    def __init__(self, root=LOCAL_BATCH_ROOT, auto_process=True, responder=local_stand_in_response):
+        self.server = LocalBatchServer(root, responder)
+        self.auto_process = auto_process
+
+    def upload_file(self, path):
+        file_id = f"file-{uuid.uuid4().hex}"
+        with open(path, encoding="utf-8") as src, open(self.server.file_path(file_id), "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+        return file_id
+
+    def create_batch(self, input_file_id):
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": BATCH_ENDPOINT,
+            "input_file_id": input_file_id,
+            "completion_window": BATCH_COMPLETION_WINDOW,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+        }
+        self.server.save_batch(batch)
+        return batch
+
+    def retrieve_batch(self, batch_id):
+        if self.auto_process:
+            self.server.process_pending()
+        return self.server.load_batch(batch_id)
+
+    def file_content(self, file_id):
+        with open(self.server.file_path(file_id), encoding="utf-8") as f:
+            return f.read()
+
+
+def get_batch_client(local=False):
+    """
+    Return the batch client for bulk runs.
+
+    Args:
+        local (bool, optional): Use the offline file-based stand-in. Defaults to False.
+
+    Returns:
+        OpenAIBatchClient or LocalBatchClient: The client.
+    """
+    return LocalBatchClient() if local else OpenAIBatchClient()
+
+
+def run_batch(client, lines, name="batch", poll_interval=BATCH_POLL_INTERVAL_SECONDS, timeout=BATCH_TIMEOUT_SECONDS):
+    """
+    Submit a batch, poll until it finishes and download its results.
+
+    Args:
+        client: OpenAIBatchClient or LocalBatchClient.
+        lines (list[dict]): Request lines built with `build_chat_request`.
+        name (str, optional): Label used for the JSONL file name and log messages.
+        poll_interval (float, optional): Seconds between status checks.
+        timeout (float, optional): Seconds to wait before giving up.
+
+    Returns:
+        tuple: (results, errors) as returned by `parse_batch_output`.
+    """
+    input_path = write_jsonl(os.path.join(LOCAL_BATCH_ROOT, "requests", f"{name}_{uuid.uuid4().hex[:8]}.jsonl"), lines)
+    batch = client.create_batch(client.upload_file(input_path))
+    print(f"Submitted {name} batch {batch['id']} with {len(lines)} requests")
+
+    started_at = time.time()
+    while True:
+        batch = client.retrieve_batch(batch["id"])
+        if batch["status"] in FINAL_STATUSES:
+            break
+        if time.time() - started_at > timeout:
+            raise TimeoutError(f"Batch {batch['id']} did not finish within {timeout} seconds")
+        print(f"{name} batch {batch['id']} is {batch['status']}; checking again in {poll_interval}s")
+        time.sleep(poll_interval)
+
+    results, errors = {}, {}
+    if batch.get("output_file_id"):
+        results, errors = parse_batch_output(client.file_content(batch["output_file_id"]))
+    if batch.get("error_file_id"):
+        errors.update(parse_batch_output(client.file_content(batch["error_file_id"]))[1])
+    print(f"{name} batch {batch['id']} {batch['status']}: {len(results)} succeeded, {len(errors)} failed")
+    return results, errors
+
+
+def process_resumes_bulk(resume_df, job_description, templates, client, model="gpt-4o-mini", score_parser=None):
+    """
+    Score a folder of resumes through the batch-job API instead of interactive calls.
+
+    The first batch processes the job description together with every resume's key aspects
+    (they are independent), the second batch scores each resume against the processed JD.
+
+    Args:
+        resume_df (pd.DataFrame): DataFrame with 'resume_file_name' and 'resume_file_text' columns.
+        job_description (str): Job description text.
+        templates (dict): The script's TEMPLATES with "job_description", "resume" and "score".
+        client: Batch client from `get_batch_client`.
+        model (str, optional): The OpenAI model name. Defaults to "gpt-4o-mini".
+        score_parser (Callable, optional): Applied to each raw score response.
+
+    Returns:
+        pd.DataFrame: `resume_df` with 'resume_key_aspect' and 'resume_score' filled in.
+    """
+    jd_prompt = PromptTemplate.from_template(templates["job_description"])
+    resume_prompt = PromptTemplate.from_template(templates["resume"])
+    score_prompt = PromptTemplate.from_template(templates["score"])
+
+    # Stage 1: the job description and all key aspect extractions in one batch
+    lines = [build_chat_request("jd", jd_prompt.format(job_description_text=job_description), model)]
+    for index, resume in resume_df.iterrows():
+        lines.append(build_chat_request(f"resume-{index}", resume_prompt.format(resume_text=resume["resume_file_text"]), model))
+    key_aspects, errors = run_batch(client, lines, name="key_aspects")
+    if "jd" not in key_aspects:
+        raise RuntimeError(f"Job description processing failed in batch: {errors.get('jd')}")
+    processed_jd = key_aspects["jd"]
+
+    # Stage 2: score every resume whose key aspects were extracted
+    lines = [
+        build_chat_request(f"score-{index}", score_prompt.format(
+            resume_text=key_aspects[f"resume-{index}"], job_description=processed_jd
+        ), model)
+        for index in resume_df.index
+        if f"resume-{index}" in key_aspects
+    ]
+    scores, _ = run_batch(client, lines, name="scores") if lines else ({}, {})
+
+    # Map results back into the DataFrame
+    for index in resume_df.index:
+        resume_df.loc[index, "resume_key_aspect"] = key_aspects.get(f"resume-{index}")
+        score = scores.get(f"score-{index}")
+        if score is not None and score_parser is not None:
+            score = score_parser(score)
+        resume_df.loc[index, "resume_score"] = score
+    return resume_df
+
+
+if __name__ == "__main__":
+    # python batch_jobs.py serve [root]  -> run the local stand-in server
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        LocalBatchServer(sys.argv[2] if len(sys.argv) > 2 else LOCAL_BATCH_ROOT).serve_forever()
+    else:
+        print("Usage: python batch_jobs.py serve [root]")
@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import asyncio
+import utils
+import rate_limiter
+import llm_providers
+
+
+# Multi-resume scoring settings, overridable through the environment
+SCORE_BATCH_TOKEN_BUDGET = int(os.getenv("SCORE_BATCH_TOKEN_BUDGET", "24000"))
+SCORE_BATCH_MAX_SIZE = int(os.getenv("SCORE_BATCH_MAX_SIZE", "20"))
+SCORE_BATCH_LINGER_SECONDS = float(os.getenv("SCORE_BATCH_LINGER_SECONDS", "0.5"))
+
+# Completion tokens reserved per resume in the JSON answer, plus the JSON wrapper
+OUTPUT_TOKENS_PER_RESUME = 16
+OUTPUT_TOKENS_OVERHEAD = 32
+
+_single_score_conversation = llm_providers.get_conversation_async(
+    utils.TEMPLATES["score_json"], max_tokens=utils.SCORE_MAX_TOKENS,
+    response_format=utils.SCORE_RESPONSE_FORMAT, validate=utils.parse_score_output
+)
+
+
+def plan_batches(key_aspects, fixed_tokens, token_budget=SCORE_BATCH_TOKEN_BUDGET, max_size=SCORE_BATCH_MAX_SIZE):
+    """
+    Group resumes so each multi-resume request stays within the prompt token budget.
+
+    Args:
+        key_aspects (dict): Key-aspect summaries keyed by resume name.
+        fixed_tokens (int): Tokens of the template and job description shared by every request.
+        token_budget (int, optional): Maximum prompt tokens per request.
+        max_size (int, optional): Maximum resumes per request.
+
+    Returns:
+        list[list[str]]: Resume names per request, in input order.
+    """
+    batches, current, current_tokens = [], [], fixed_tokens
+    for name, key_aspect in key_aspects.items():
+        tokens = rate_limiter.estimate_tokens(key_aspect or "") + OUTPUT_TOKENS_PER_RESUME
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_size):
+            batches.append(current)
+            current, current_tokens = [], fixed_tokens
+        current.append(name)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def format_resumes(key_aspects_by_id):
+    """
+    Render the resumes block of the score_batch template.
+
+    Args:
+        key_aspects_by_id (dict): Key-aspect summaries keyed by the short id used in the prompt.
+
+    Returns:
+        str: The resumes section.
+    """
+    return "\n\n".join(
+        f"Resume ID: {resume_id}\n{key_aspect}\n---"
+        for resume_id, key_aspect in key_aspects_by_id.items()
+    )
+
+
+def parse_batch_scores(text, expected_ids):
+    """
+    Parse and validate the JSON answer of a multi-resume scoring request.
+
+    Args:
+        text (str): The model output.
+        expected_ids (list[str]): Ids sent in the request.
+
+    Returns:
+        dict: Score (int, 0-100) keyed by resume id.
+
+    Raises:
+        ValueError: If the answer is not valid JSON, misses an id, or has an out-of-range score.
+    """
+    match = re.search(r"\{.*\}", text, re.S)
+    if match is None:
+        raise ValueError("No JSON object in the scoring output")
+    entries = json.loads(match.group()).get("scores")
+    if not isinstance(entries, list):
+        raise ValueError("Scoring output has no 'scores' list")
+
+    scores = {}
+    for entry in entries:
+        resume_id = str(entry.get("id"))
+        score = entry.get("score")
+        if resume_id in expected_ids and isinstance(score, (int, float)) and 0 <= score <= 100:
+            scores[resume_id] = int(round(score))
+    missing = [resume_id for resume_id in expected_ids if resume_id not in scores]
+    if missing:
+        raise ValueError(f"Scoring output is missing valid scores for {missing}")
+    return scores
+
+
+async def score_single(name, key_aspect, job_description):
+    """
+    Score one resume with the regular single-resume template, re-requesting it only when the output is malformed.
+
+    Failures are kept to this resume, so they never cost the other resumes of its group their scores.
+
+    Returns:
+        str: The total score as a string, or "" if the resume could not be scored.
+    """
+    for attempt in range(utils.SCORE_PARSE_ATTEMPTS):
+        try:
+            response = await _single_score_conversation({"resume_text": key_aspect,
+                                                         "job_description": job_description})
+            return str(utils.parse_score_output(response)["total"])
+        except ValueError as e:
+            # Malformed responses are never cached, so the next attempt is a fresh call
+            print(f"Malformed score for {name} (attempt {attempt + 1}): {e}")
+        except Exception as e:
+            print(f"Error in scoring for {name}: {e}")
+            return ""
+    return ""
+
+
+async def score_group(names, key_aspects, job_description):
+    """
+    Score a group of resumes in one request, splitting the group and retrying on invalid output.
+
+    A group of one that still fails falls back to the single-resume template.
+
+    Args:
+        names (list[str]): Resume names in this group.
+        key_aspects (dict): Key-aspect summaries keyed by resume name.
+        job_description (str): The processed job description.
+
+    Returns:
+        dict: Score strings keyed by resume name.
+    """
+    if len(names) == 1:
+        return {names[0]: await score_single(names[0], key_aspects[names[0]], job_description)}
+
+    ids = [f"R{position + 1}" for position in range(len(names))]
+    conversation = llm_providers.get_conversation_async(
+        utils.TEMPLATES["score_batch"],
+        max_tokens=OUTPUT_TOKENS_OVERHEAD + OUTPUT_TOKENS_PER_RESUME * len(names),
+        response_format={"type": "json_object"},
+        validate=lambda response: parse_batch_scores(response, ids)
+    )
+    try:
+        response = await conversation({
+            "job_description": job_description,
+            "resumes": format_resumes({resume_id: key_aspects[name] for resume_id, name in zip(ids, names)}),
+        })
+        scores = parse_batch_scores(response, ids)
+        return {name: str(scores[resume_id]) for resume_id, name in zip(ids, names)}
+    except Exception as e:
+        print(f"Multi-resume scoring of {len(names)} resumes failed ({e}); splitting and retrying")
+
+    middle = len(names) // 2
+    halves = await asyncio.gather(
+        score_group(names[:middle], key_aspects, job_description),
+        score_group(names[middle:], key_aspects, job_description)
+    )
+    return {**halves[0], **halves[1]}
+
+
+async def score_resumes_batched(key_aspects, job_description,
+                                token_budget=SCORE_BATCH_TOKEN_BUDGET, max_size=SCORE_BATCH_MAX_SIZE):
+    """
+    Score many resumes with as few requests as the token budget allows.
+
+    The processed job description and rubric are sent once per group instead of once per resume.
+
+    Args:
+        key_aspects (dict): Key-aspect summaries keyed by resume name.
+        job_description (str): The processed job description.
+        token_budget (int, optional): Maximum prompt tokens per request.
+        max_size (int, optional): Maximum resumes per request.
+
+    Returns:
+        dict: Score strings keyed by resume name.
+    """
+    fixed_tokens = rate_limiter.estimate_tokens(utils.TEMPLATES["score_batch"] + job_description)
+    groups = plan_batches(key_aspects, fixed_tokens, token_budget, max_size)
+    results = await asyncio.gather(*[score_group(group, key_aspects, job_description) for group in groups])
+    scores = {}
+    for result in results:
+        scores.update(result)
+    return scores
+
+
+class ScoreBatcher:
+    """
+    Collect resumes arriving one at a time from the pipeline into multi-resume requests.
+
+    A group is sent when it reaches the token budget or size cap, or when no new resume has
+    joined it for `linger_seconds`. Each caller awaits only its own score.
+    """
+
+    def __init__(self, job_description, token_budget=SCORE_BATCH_TOKEN_BUDGET, max_size=SCORE_BATCH_MAX_SIZE,
+                 linger_seconds=SCORE_BATCH_LINGER_SECONDS):
+        # The job description may be a task that resolves to the processed JD
+        self.job_description = job_description
+        self.token_budget = token_budget
+        self.max_size = max_size
+        self.linger_seconds = linger_seconds
+        self._pending = {}
+        self._futures = {}
+        self._pending_tokens = 0
+        self._timer = None
+        # Groups in flight, kept referenced until they finish so they are neither collected nor lost
+        self._tasks = set()
+        # Template plus job description tokens, known once the job description is resolved
+        self._fixed_tokens = None
+
+    async def _resolve_job_description(self):
+        if asyncio.isfuture(self.job_description):
+            self.job_description = await self.job_description
+        if self._fixed_tokens is None:
+            # Every request carries the template and the job description, as in score_resumes_batched
+            self._fixed_tokens = rate_limiter.estimate_tokens(utils.TEMPLATES["score_batch"] + self.job_description)
+        return self.job_description
+
+    async def score(self, name, key_aspect):
+        """
+        Queue one resume for multi-resume scoring and wait for its score.
+
+        Args:
+            name (str): Resume name, unique within the upload.
+            key_aspect (str): The resume's key-aspect summary.
+
+        Returns:
+            str: The score as a string.
+        """
+        # Groups are sized against the job description, so it is needed before the resume can join one
+        await self._resolve_job_description()
+        tokens = rate_limiter.estimate_tokens(key_aspect or "") + OUTPUT_TOKENS_PER_RESUME
+        if self._pending and self._fixed_tokens + self._pending_tokens + tokens > self.token_budget:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[name] = key_aspect or ""
+        self._futures[name] = future
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        else:
+            # Restart the linger timer each time a resume joins the group
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = asyncio.get_running_loop().call_later(self.linger_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, futures = self._pending, self._futures
+        self._pending, self._futures, self._pending_tokens = {}, {}, 0
+        task = asyncio.ensure_future(self._score_pending(pending, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Multi-resume scoring group failed: {task.exception()}")
+
+    async def finish(self):
+        """Send the group still collecting and wait for every group in flight."""
+        self._flush()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self):
+        """Cancel the group still collecting and every group in flight, e.g. when the upload fails."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for future in self._futures.values():
+            future.cancel()
+        self._pending, self._futures, self._pending_tokens = {}, {}, 0
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _score_pending(self, pending, futures):
+        try:
+            job_description = await self._resolve_job_description()
+            scores = await score_group(list(pending), pending, job_description)
+            for name, future in futures.items():
+                if not future.done():
+                    future.set_result(scores.get(name, ""))
+        except Exception as e:
+            # Only a failed job description gets here; score_group keeps resume failures to their resume
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        except asyncio.CancelledError:
+            # Nobody is left to score these resumes; release their callers
+            for future in futures.values():
+                future.cancel()
+            raise
@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import time
+import random
+import utils
+
+
+# Benchmark settings, overridable through the environment
+BENCHMARK_TEXT_MB = float(os.getenv("BENCHMARK_TEXT_MB", "4"))
+BENCHMARK_REPEAT = int(os.getenv("BENCHMARK_REPEAT", "5"))
+
+_WORDS = ("Python developer with 5+ years of experience in AWS, Docker and Kubernetes. Led a team of 8 "
+          "engineers; reduced costs by 30%. Skills: C++, C#, Node.js, SQL. Email: jane.doe@example.com "
+          "Résumé – Bengaluru • Phone: +91-98765-43210").split()
+_EXTRAS = ["<b>", "</b>", "<br/>", "https://www.linkedin.com/in/jane-doe-12345", "http://github.com/jdoe?tab=repos",
+           "\n", "\n\n", "\t", "(", ")", "|"]
+
+
+def clean_text_reference(text):
+    """The multi-pass implementation clean_text replaced; the benchmark checks both give the same output."""
+    text = re.sub(r'<[^>]*?>', ' ', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', ' ', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', ' ', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+def make_text(megabytes, seed=0):
+    """
+    Build resume-like text with HTML tags, URLs, punctuation and non-ASCII characters.
+
+    Args:
+        megabytes (float): Approximate size of the text.
+        seed (int, optional): Random seed, so runs are comparable.
+
+    Returns:
+        str: The text.
+    """
+    generator = random.Random(seed)
+    parts, size = [], 0
+    while size < megabytes * 2 ** 20:
+        part = generator.choice(_EXTRAS) if generator.random() < 0.1 else generator.choice(_WORDS)
+        parts.append(part)
+        size += len(part) + 1
+    return " ".join(parts)
+
+
+def time_function(function, text, repeat=BENCHMARK_REPEAT):
+    # Fastest of `repeat` runs, in seconds
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function(text)
+        seconds = time.perf_counter() - started_at
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run_benchmark(megabytes=BENCHMARK_TEXT_MB, repeat=BENCHMARK_REPEAT):
+    """
+    Time the reference and the single-pass clean_text on one large text and on many resume-sized texts.
+
+    Returns:
+        dict: Throughput per implementation and case, the speedups, and whether the outputs match.
+    """
+    large_text = make_text(megabytes)
+    resumes = [make_text(0.01, seed) for seed in range(200)]
+    megabytes_of_resumes = sum(len(resume) for resume in resumes) / 2 ** 20
+    implementations = {
+        "reference": clean_text_reference,
+        "single_pass": utils.clean_text,
+        "single_pass_keep_tech_tokens": lambda text: utils.clean_text(text, keep_tech_tokens=True),
+    }
+
+    report = {"identical_output": clean_text_reference(large_text) == utils.clean_text(large_text) and all(
+        clean_text_reference(resume) == utils.clean_text(resume) for resume in resumes
+    )}
+    for name, function in implementations.items():
+        large_seconds = time_function(function, large_text, repeat)
+        resume_seconds = time_function(lambda texts: [function(text) for text in texts], resumes, repeat)
+        report[name] = {
+            "large_text_mb_per_second": round(len(large_text) / 2 ** 20 / large_seconds, 1),
+            "resumes_mb_per_second": round(megabytes_of_resumes / resume_seconds, 1),
+        }
+    for name in ["single_pass", "single_pass_keep_tech_tokens"]:
+        report[name]["speedup_large_text"] = round(
+            report[name]["large_text_mb_per_second"] / report["reference"]["large_text_mb_per_second"], 2
+        )
+        report[name]["speedup_resumes"] = round(
+            report[name]["resumes_mb_per_second"] / report["reference"]["resumes_mb_per_second"], 2
+        )
+    return report
+
+
+def main():
+    report = run_benchmark()
+    print(f"Identical output: {report.pop('identical_output')}")
+    for name, figures in report.items():
+        print(f"\n{name}:")
+        for key, value in figures.items():
+            print(f"    {key}: {value}")
+
+
+if __name__ == "__main__":
+    # python benchmark_clean_text.py
+    if len(sys.argv) > 1:
+        print("Usage: python benchmark_clean_text.py")
+    else:
+        main()
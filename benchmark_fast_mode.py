@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import asyncio
+import utils
+import llm_cache
+import resume_compaction
+from prompt_registry import prompt_registry
+
+
+# Benchmark settings, overridable through the environment
+BENCHMARK_MODEL = os.getenv("BENCHMARK_MODEL", "gpt-4o-mini")
+BENCHMARK_CONCURRENCY = int(os.getenv("BENCHMARK_CONCURRENCY", "8"))
+# Scores within this many points of each other count as agreeing
+AGREEMENT_TOLERANCE = int(os.getenv("AGREEMENT_TOLERANCE", "5"))
+
+# Templates billed to each mode; the job description is processed once and shared by both
+TWO_STAGE_TEMPLATES = ["resume", "score_json"]
+FAST_MODE_TEMPLATES = ["extract_and_score"]
+
+
+def read_resume(file_path):
+    """
+    Read a resume the way the upload endpoint does.
+
+    Args:
+        file_path (str): Path of a .pdf, .docx or .txt file.
+
+    Returns:
+        str or None: Cleaned, compacted text sent to the LLM, or None for unsupported files.
+    """
+    extension = file_path.rsplit(".", 1)[-1].lower()
+    if extension not in ("pdf", "docx", "txt"):
+        return None
+    with open(file_path, "rb") as file:
+        raw_text = utils.TEXT_EXTRACTORS[extension](file)
+    return utils.prepare_resume_text(raw_text, resume_compaction.RESUME_TOKEN_BUDGET)["llm_content"]
+
+
+def _usage(template_names):
+    # Prompt and completion tokens billed so far to the given templates
+    prompt_tokens = completion_tokens = 0
+    for name in template_names:
+        stats = prompt_registry.get(name).stats()
+        prompt_tokens += stats["prompt_tokens"]
+        completion_tokens += stats["completion_tokens"]
+    return prompt_tokens, completion_tokens
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def _ranks(values):
+    # Average ranks, so ties share a rank
+    order = sorted(range(len(values)), key=lambda index: values[index])
+    ranks = [0.0] * len(values)
+    position = 0
+    while position < len(order):
+        end = position
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[position]]:
+            end += 1
+        for index in order[position:end + 1]:
+            ranks[index] = (position + end) / 2 + 1
+        position = end + 1
+    return ranks
+
+
+def spearman(first, second):
+    """
+    Spearman rank correlation of two equally long score lists.
+
+    Returns:
+        float: Correlation from -1 to 1, 0.0 when either list is constant or too short.
+    """
+    if len(first) < 2:
+        return 0.0
+    first_ranks, second_ranks = _ranks(first), _ranks(second)
+    mean = (len(first) + 1) / 2
+    covariance = sum((a - mean) * (b - mean) for a, b in zip(first_ranks, second_ranks))
+    first_spread = sum((a - mean) ** 2 for a in first_ranks) ** 0.5
+    second_spread = sum((b - mean) ** 2 for b in second_ranks) ** 0.5
+    if not first_spread or not second_spread:
+        return 0.0
+    return covariance / (first_spread * second_spread)
+
+
+async def run_benchmark(job_description, resumes, model=BENCHMARK_MODEL, concurrency=BENCHMARK_CONCURRENCY):
+    """
+    Score the same resumes with the two-stage path and with fast mode, without the response cache.
+
+    Args:
+        job_description (str): Raw job description.
+        resumes (dict): Cleaned resume text keyed by name.
+        model (str, optional): The OpenAI model name.
+        concurrency (int, optional): Resumes in flight at once in each mode.
+
+    Returns:
+        dict: Latency, token, cost and agreement figures for both modes.
+    """
+    conversation_jd = utils.get_conversation_openai_async(utils.TEMPLATES["job_description"], model=model)
+    conversation_resume = utils.get_conversation_openai_async(utils.TEMPLATES["resume"], model=model, use_cache=False)
+    conversation_score = utils.get_conversation_openai_async(
+        utils.TEMPLATES["score_json"], model=model, max_tokens=utils.SCORE_MAX_TOKENS, use_cache=False,
+        response_format=utils.SCORE_RESPONSE_FORMAT
+    )
+    conversation_fast = utils.get_conversation_openai_async(
+        utils.TEMPLATES["extract_and_score"], model=model, max_tokens=utils.EXTRACT_AND_SCORE_MAX_TOKENS,
+        use_cache=False, response_format=utils.EXTRACT_AND_SCORE_RESPONSE_FORMAT
+    )
+    processed_jd = await conversation_jd({"job_description_text": job_description})
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def two_stage(resume_text):
+        key_aspect = await conversation_resume({"resume_text": resume_text})
+        output = await conversation_score({"resume_text": key_aspect, "job_description": processed_jd})
+        return utils.parse_score_output(output)["total"]
+
+    async def fast(resume_text):
+        output = await conversation_fast({"resume_text": resume_text, "job_description": processed_jd})
+        return utils.parse_extract_and_score_output(output)[1]["total"]
+
+    async def timed(score, name, resume_text):
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                total = await score(resume_text)
+            except Exception as e:
+                print(f"{name}: {type(e).__name__}: {e}")
+                total = None
+            return name, total, time.perf_counter() - started_at
+
+    report = {}
+    totals = {}
+    for mode, score, template_names in [("two_stage", two_stage, TWO_STAGE_TEMPLATES),
+                                        ("fast_mode", fast, FAST_MODE_TEMPLATES)]:
+        prompt_before, completion_before = _usage(template_names)
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*[timed(score, name, text) for name, text in resumes.items()])
+        wall_seconds = time.perf_counter() - started_at
+        prompt_after, completion_after = _usage(template_names)
+        prompt_tokens, completion_tokens = prompt_after - prompt_before, completion_after - completion_before
+
+        latencies = [seconds for _, _, seconds in results]
+        totals[mode] = {name: total for name, total, _ in results}
+        report[mode] = {
+            "resumes": len(results),
+            "failed": sum(1 for _, total, _ in results if total is None),
+            "wall_seconds": round(wall_seconds, 2),
+            "latency_p50_seconds": round(_percentile(latencies, 50), 2),
+            "latency_p95_seconds": round(_percentile(latencies, 95), 2),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated_cost_usd": round(llm_cache.estimate_cost(model, prompt_tokens, completion_tokens), 6),
+        }
+
+    both = [name for name in resumes if totals["two_stage"].get(name) is not None
+            and totals["fast_mode"].get(name) is not None]
+    two_stage_scores = [totals["two_stage"][name] for name in both]
+    fast_scores = [totals["fast_mode"][name] for name in both]
+    differences = [abs(a - b) for a, b in zip(two_stage_scores, fast_scores)]
+    report["agreement"] = {
+        "compared": len(both),
+        "mean_absolute_difference": round(sum(differences) / len(differences), 2) if differences else 0.0,
+        f"within_{AGREEMENT_TOLERANCE}_points": round(
+            sum(1 for difference in differences if difference <= AGREEMENT_TOLERANCE) / len(differences), 4
+        ) if differences else 0.0,
+        "spearman": round(spearman(two_stage_scores, fast_scores), 4),
+    }
+    report["scores"] = {name: {"two_stage": totals["two_stage"].get(name), "fast_mode": totals["fast_mode"].get(name)}
+                        for name in resumes}
+    await utils.close_openai_session()
+    return report
+
+
+def main(job_description_path, resume_folder, limit=None):
+    with open(job_description_path, encoding="utf-8") as file:
+        job_description = file.read()
+
+    resumes = {}
+    for file_name in sorted(os.listdir(resume_folder)):
+        if limit is not None and len(resumes) >= limit:
+            break
+        text = read_resume(os.path.join(resume_folder, file_name))
+        if text:
+            resumes[file_name] = text
+    print(f"Benchmarking {len(resumes)} resumes with {BENCHMARK_MODEL}")
+
+    report = asyncio.run(run_benchmark(job_description, resumes))
+    for name, scores in report["scores"].items():
+        print(f"{name}: two-stage {scores['two_stage']}, fast mode {scores['fast_mode']}")
+    for section in ["two_stage", "fast_mode", "agreement"]:
+        print(f"\n{section}:")
+        for key, value in report[section].items():
+            print(f"    {key}: {value}")
+
+
+if __name__ == "__main__":
+    # python benchmark_fast_mode.py <job_description.txt> <resume_folder> [limit]
+    if len(sys.argv) < 3:
+        print("Usage: python benchmark_fast_mode.py <job_description.txt> <resume_folder> [limit]")
+    else:
+        main(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None)
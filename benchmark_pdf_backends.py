@@ -0,0 +1,135 @@
+import io
+import os
+import sys
+import time
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pdf_backends
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; only the Python heap peak is reported there
+    resource = None
+
+
+# Benchmark settings, overridable through the environment
+BENCHMARK_REPEAT = int(os.getenv("BENCHMARK_REPEAT", "3"))
+
+
+def load_corpus(folder, limit=None):
+    """
+    Read the PDFs of a folder into memory, so disk reads are not timed.
+
+    Args:
+        folder (str): Folder of .pdf files.
+        limit (int, optional): Read at most this many files.
+
+    Returns:
+        dict: PDF bytes keyed by file name.
+    """
+    corpus = {}
+    for file_name in sorted(os.listdir(folder)):
+        if limit is not None and len(corpus) >= limit:
+            break
+        if file_name.lower().endswith(".pdf"):
+            with open(os.path.join(folder, file_name), "rb") as file:
+                corpus[file_name] = file.read()
+    return corpus
+
+
+def _extract_corpus(backend, corpus, max_pages):
+    # One pass over the corpus; returns (pages, characters, failed)
+    pages = characters = failed = 0
+    for data in corpus.values():
+        try:
+            for text in pdf_backends.iter_pdf_pages(io.BytesIO(data), backend=backend, max_pages=max_pages):
+                pages += 1
+                characters += len(text)
+        except Exception:
+            failed += 1
+    return pages, characters, failed
+
+
+def run_backend(backend, corpus, repeat=BENCHMARK_REPEAT, max_pages=None):
+    """
+    Extract every PDF of the corpus with one backend and measure it. Runs in its own process.
+
+    The timed passes run without tracemalloc, which slows allocation-heavy pure-Python backends
+    far more than native ones; the Python heap peak is measured in one extra, untimed pass.
+
+    Args:
+        backend (str): Backend name.
+        corpus (dict): PDF bytes keyed by file name.
+        repeat (int, optional): Passes over the corpus; the fastest pass is reported.
+        max_pages (int, optional): Page cap per PDF. Defaults to PDF_MAX_PAGES.
+
+    Returns:
+        dict: Pages, characters, failures, throughput and memory figures.
+    """
+    best_seconds = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        pages, characters, failed = _extract_corpus(backend, corpus, max_pages)
+        seconds = time.perf_counter() - started_at
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+
+    tracemalloc.start()
+    _extract_corpus(backend, corpus, max_pages)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "files": len(corpus),
+        "failed": failed,
+        "pages": pages,
+        "characters": characters,
+        "seconds": round(best_seconds, 3),
+        "pages_per_second": round(pages / best_seconds, 1) if best_seconds else 0.0,
+        "python_peak_mb": round(python_peak / 2 ** 20, 1),
+    }
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["max_rss_mb"] = round(max_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    return report
+
+
+def run_benchmark(corpus, backends=None, repeat=BENCHMARK_REPEAT, max_pages=None):
+    """
+    Benchmark each backend on the same corpus, each in a fresh process so memory figures do not mix.
+
+    Args:
+        corpus (dict): PDF bytes keyed by file name.
+        backends (list[str], optional): Backends to run. Defaults to every installed backend.
+        repeat (int, optional): Passes over the corpus per backend.
+        max_pages (int, optional): Page cap per PDF.
+
+    Returns:
+        dict: Report per backend name.
+    """
+    report = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in backends or pdf_backends.available_backends():
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            report[backend] = executor.submit(run_backend, backend, corpus, repeat, max_pages).result()
+    return report
+
+
+def main(folder, limit=None):
+    corpus = load_corpus(folder, limit)
+    print(f"Benchmarking {len(corpus)} PDFs with {', '.join(pdf_backends.available_backends())}")
+    report = run_benchmark(corpus)
+    for backend, figures in report.items():
+        print(f"\n{backend}:")
+        for key, value in figures.items():
+            print(f"    {key}: {value}")
+
+
+if __name__ == "__main__":
+    # python benchmark_pdf_backends.py <pdf_folder> [limit]
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_pdf_backends.py <pdf_folder> [limit]")
+    else:
+        main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None)
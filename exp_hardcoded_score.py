@@ -3,12 +3,12 @@ import PyPDF2
 import pandas as pd
 import docx
 import win32com.client as win32
-import time
 import tkinter as tk
 from tkinter import filedialog
 # from dotenv import load_dotenv
 import google.generativeai as genai
 from datetime import datetime
+import rate_limiter
 from tkinter import simpledialog
 from dotenv import load_dotenv
 
@@ -162,7 +162,11 @@ def call_genai(template, variables):
     """
     prompt = template.format(**variables)
     try:
-        response = model.generate_content(prompt)
+        # Wait on the shared Gemini budget instead of a fixed sleep
+        response = rate_limiter.get_rate_limiter("gemini-1.5-flash").call(
+            lambda: model.generate_content(prompt),
+            rate_limiter.estimate_tokens(prompt) + rate_limiter.DEFAULT_COMPLETION_TOKENS
+        )
         # print(response.text)
         
         # response = genai.generate_message(messages=[{"content": prompt}], model="chat-bison-001")
@@ -183,8 +187,6 @@ def process_resumes(resume_df, job_description):
         resume_summary = call_genai(TEMPLATES["resume"], {"resume_text": resume_text})
         resume_df.loc[i, "resume_key_aspect"] = resume_summary
         
-        time.sleep(3)  # Avoid API rate limits
-        
         # Score resume
         score = call_genai(TEMPLATES["score"], {
             "resume_text": resume_text,
@@ -194,7 +196,6 @@ def process_resumes(resume_df, job_description):
 
         print("Processing - ", resume_df.loc[i, "resume_file_name"])
 
-        time.sleep(3)  # Avoid API rate limits
     return resume_df
 
 # def save_results(resume_df):
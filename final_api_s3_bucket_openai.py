@@ -1,11 +1,9 @@
 from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from PyPDF2 import PdfReader
 from docx import Document
-import win32com.client
 import os
 import openai
-import io
 import zipfile
 import pandas as pd
 import time
@@ -16,7 +14,26 @@ import asyncio
 import re
 import psycopg2
 import shutil
+import hashlib
+import collections
+import json
 import utils
+import llm_cache
+import rate_limiter
+import llm_retry
+import llm_providers
+import llm_hedging
+import resume_pipeline
+import prompt_registry
+import resume_compaction
+import batch_scoring
+import model_cascade
+import lexical_ranker
+import vector_index
+import near_duplicates
+import parse_pool
+import upload_buffers
+import numpy as np
 import boto3
 from botocore.exceptions import NoCredentialsError, ClientError
 import os
@@ -169,6 +186,32 @@ def upload_to_s3(local_file_path, bucket_name='yash-soni-db', s3_folder='resume_
         print(f"An error occurred: {e}")
         return False
 
+def upload_buffer_to_s3(buffer, filename, bucket_name='yash-soni-db', s3_folder='resume_files/'):
+    """
+    Upload an in-memory file to an S3 bucket, without writing it to disk first
+    
+    :param buffer: upload_buffers.UploadBuffer holding the file
+    :param filename: Name of the object within the folder
+    :param bucket_name: Name of the S3 bucket
+    :param s3_folder: Folder path within the bucket (include trailing '/')
+    :return: True if file was uploaded, else False
+    """
+    s3 = create_s3_client()
+    s3_key = os.path.join(s3_folder, filename)
+    try:
+        # Streams from the same buffer the hash and the parser read
+        s3.upload_fileobj(buffer.open(), bucket_name, s3_key)
+        print(f"Successfully uploaded {filename} to {bucket_name}/{s3_key}")
+        return True
+
+    except NoCredentialsError:
+        print("Credentials not available")
+        return False
+
+    except ClientError as e:
+        print(f"An error occurred: {e}")
+        return False
+
 def download_from_s3(filename, bucket_name='yash-soni-db', s3_folder='resume_files/', 
                      local_dir='extracted_files/'):
     """
@@ -229,320 +272,941 @@ def upload_resume_file(filename, directory_path='extracted_files'):
     return upload_to_s3(file_path)
 
 
-conversation_resume = utils.get_conversation_openai(utils.TEMPLATES["resume"])
-conversation_score = utils.get_conversation_openai(utils.TEMPLATES["score"])
+# Every conversation is routed over the configured providers (see llm_providers.LLM_PROVIDERS)
+conversation_jd = llm_providers.get_conversation_async(utils.TEMPLATES["job_description"])
+conversation_resume = llm_providers.get_conversation_async(utils.TEMPLATES["resume"])
+# Scores come back as strict JSON with the marks of each rubric section
+conversation_score = llm_providers.get_conversation_async(
+    utils.TEMPLATES["score_json"], max_tokens=utils.SCORE_MAX_TOKENS,
+    response_format=utils.SCORE_RESPONSE_FORMAT, validate=utils.parse_score_output
+)
+# Fast mode: key aspects and score from a single call per resume
+conversation_extract_and_score = llm_providers.get_conversation_async(
+    utils.TEMPLATES["extract_and_score"], max_tokens=utils.EXTRACT_AND_SCORE_MAX_TOKENS,
+    response_format=utils.EXTRACT_AND_SCORE_RESPONSE_FORMAT, validate=utils.parse_extract_and_score_output
+)
 
-async def run_in_executor(func, *args, **kwargs):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, func, *args, **kwargs)
+# Processed job descriptions keyed by the hash of their normalized text
+JD_CACHE_TTL_SECONDS = int(os.getenv("JD_CACHE_TTL_SECONDS", "3600"))
+_processed_jd_cache = {}
+_processed_jd_inflight = {}
 
-async def async_key_aspect_extractor(filename, data):
-    try:
-        print(f"Extracting key aspects for: {filename} - START")
-        # Assuming conversation_resume is synchronous
-        result = await run_in_executor(conversation_resume, {"resume_text": data["content"]})
-        return filename, result
-    except Exception as e:
-        print(f"Error in key aspect extraction for {filename}: {e}")
-        return filename, None
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release the pooled connections used by the async OpenAI client
+    await utils.close_openai_session()
+    parse_pool.shutdown()
 
-async def async_resume_scorer(filename, key_aspect, job_description):
-    try:
-        print(f"Scoring resume: {filename} - START")
-        # Assuming conversation_score is synchronous
-        result = await run_in_executor(conversation_score, {
-            "resume_text": key_aspect,
-            "job_description": job_description
-        })
-        return filename, result
-    except Exception as e:
-        print(f"Error in scoring for {filename}: {e}")
-        return filename, None
+PARSED_EXTENSIONS = parse_pool.PARSED_EXTENSIONS
 
-async def process_resumes_async(response_data, job_description):
-    # Create async tasks for key aspect extraction
-    key_aspect_tasks = [
-        asyncio.create_task(async_key_aspect_extractor(filename, data)) 
-        for filename, data in response_data.items()
-    ]
-    
-    # Wait for all key aspect extraction tasks to complete
-    key_aspects = await asyncio.gather(*key_aspect_tasks, return_exceptions=True)
-    key_aspects_dict = {filename: result for filename, result in key_aspects if result is not None}
-    
-    # Create async tasks for scoring
-    scoring_tasks = [
-        asyncio.create_task(async_resume_scorer(filename, key_aspects_dict.get(filename, ""), job_description)) 
-        for filename in response_data.keys()
-    ]
-    
-    # Wait for all scoring tasks to complete concurrently
-    scores = await asyncio.gather(*scoring_tasks, return_exceptions=True)
-    scores_dict = {filename: result for filename, result in scores if result is not None}
-    
-    # Update response_data with results
-    for filename in response_data.keys():
-        response_data[filename]['key_feature'] = utils.clean_text(key_aspects_dict.get(filename, ""))
-        response_data[filename]['score'] = utils.clean_text(scores_dict.get(filename, ""))
-    
-    return response_data
+def start_parsing(file_name, buffer):
+    """
+    Start extracting a resume's text in the shared parsing process pool.
 
-@app.post("/upload-files/")
-async def upload_files(job_description: str, files: list[UploadFile] = File(...)):
-    response_data = {}
+    :param file_name: Name of a .pdf, .txt, .docx or .doc file; its extension selects the reader
+    :param buffer: upload_buffers.UploadBuffer holding the file
+    :return: Task that resolves to the full text, the compacted LLM text and the compaction report
+    """
+    task = asyncio.ensure_future(parse_pool.parse_buffer(
+        file_name, buffer, token_budget=resume_compaction.RESUME_TOKEN_BUDGET
+    ))
+    # Retrieve the error of a task that is never awaited because its upload failed first
+    task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+    return task
+
+async def parsed_resume(parse_task):
+    """
+    Wait for a resume's text and record how much its LLM copy was compacted.
 
-    conversation_jd = utils.get_conversation_openai(utils.TEMPLATES["job_description"])
-    jd_response = conversation_jd({"job_description_text": job_description})
-    processed_jd = jd_response
-    print("Processing the Job Description...\n")
+    :param parse_task: Task returned by start_parsing
+    :return: Resume data with the full "content", the compacted "llm_content" and the "compaction" report
+    """
+    parsed = await parse_task
+    if parsed["compaction"] is not None:
+        resume_compaction.record_compaction(parsed["compaction"])
+    return parsed
 
-    # Create extracted_files directory if it doesn't exist
-    extract_path = "extracted_files"
-    
-    # Clean the extracted_files directory before processing
-    if os.path.exists(extract_path):
-        shutil.rmtree(extract_path)
-    
-    os.makedirs(extract_path, exist_ok=True)
+def lookup_processed_resume(cur, file_hash):
+    """
+    Find a previously processed resume with the same file content.
 
-    try:
-        conn = psycopg2.connect(
-        host=hostname,
-        user=username,
-        password=password,
-        dbname=database,
-        port=port_id
-        )
+    :param cur: Open database cursor
+    :param file_hash: SHA-256 digest of the uploaded file
+    :return: (resume_content, resume_key_aspect) of the latest match, or None
+    """
+    cur.execute(
+        """
+        SELECT resume_content, resume_key_aspect FROM resume_table
+        WHERE file_hash = %s AND resume_key_aspect IS NOT NULL AND resume_key_aspect <> ''
+        ORDER BY unique_id DESC LIMIT 1
+        """,
+        (file_hash,)
+    )
+    return cur.fetchone()
 
-        cur = conn.cursor()
+def lookup_near_duplicate(cur, signature, unique_id):
+    """
+    Find a previously processed resume that is a near-duplicate of a new one.
 
-        cur.execute("""
-                CREATE TABLE IF NOT EXISTS resume_table (
-                    unique_id NUMERIC PRIMARY KEY,
-                    resume_name VARCHAR(100) ,
-                    resume_content TEXT ,
-                    resume_key_aspect TEXT ,
-                    score INTEGER
-                )
-            """)
-        conn.commit()
+    Candidates share at least one LSH bucket with the signature and are confirmed by their
+    estimated similarity.
 
-    except (Exception, psycopg2.Error) as error:
-        print("Error while connecting to PostgreSQL", error)
+    :param cur: Open database cursor
+    :param signature: MinHash signature of the new resume
+    :param unique_id: Id of the new resume, which is left out
+    :return: (unique_id, resume_key_aspect, similarity) of the closest match, or None
+    """
+    cur.execute(
+        """
+        SELECT unique_id, minhash, resume_key_aspect FROM resume_table
+        WHERE unique_id IN (SELECT unique_id FROM resume_lsh WHERE bucket = ANY(%s))
+          AND unique_id <> %s AND resume_key_aspect IS NOT NULL AND resume_key_aspect <> ''
+        LIMIT 50
+        """,
+        ([bucket for _, bucket in near_duplicates.band_keys(signature)], unique_id)
+    )
+    best = None
+    for stored_id, minhash, key_aspect in cur.fetchall():
+        if minhash is None:
+            continue
+        stored_similarity = near_duplicates.similarity(signature, np.frombuffer(bytes(minhash), dtype=np.uint32))
+        if stored_similarity < near_duplicates.NEAR_DUPLICATE_THRESHOLD:
+            continue
+        if best is None or stored_similarity > best[2]:
+            best = (str(stored_id), key_aspect, stored_similarity)
+    return best
+
+def store_minhash(cur, unique_id, signature):
+    """
+    Store a resume's MinHash signature and its LSH buckets for later near-duplicate lookups.
 
-    for file in files:
-        try:
-            # Fallback to file extension if MIME type is not reliable
-            file_extension = file.filename.split(".")[-1].lower()
-
-            # Generate a unique file name using a timestamp
-            time.sleep(0.001)
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            file_name = file.filename
-            unique_filename = f"{timestamp}_{file_name}"
-            file_path = os.path.join(extract_path, unique_filename)
-
-            if file.content_type == "application/zip" or file_extension == "zip":
-                zip_data = await file.read()
-                zip_file = io.BytesIO(zip_data)
-                extracted_files = []
-                with zipfile.ZipFile(zip_file, 'r') as z:
-                    # Extract files
-                    file_name_list = z.namelist()
-                    for original_file_name in file_name_list:
-                        # Generate a unique file name for each file in the ZIP
-                        time.sleep(0.001)
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-                        unique_file_name = f"{timestamp}_{original_file_name}"
-                        z.extract(original_file_name, extract_path)
-                        # Rename the extracted file to its unique name
-                        os.rename(os.path.join(extract_path, original_file_name),
-                                  os.path.join(extract_path, unique_file_name))
-                        extracted_files.append(unique_file_name)
-
-                pdf_contents = {}
-                i = 0
-                for file_name in extracted_files:
-                    original_name = file_name_list[i]
-                    i += 1
-                    print(f"Reading file: {original_name}")
-                    file_path = os.path.join(extract_path, file_name)
-                    unique_id = re.match(r'^\d+', file_name).group()
-                    resume_name = original_name
-                    resume_content = None
-                    
-
-                    if file_name.endswith(".pdf"):
-                        with open(file_path, "rb") as pdf_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_pdf(pdf_file)
-                            response_data[original_name] = {"content": resume_content, "file_path": file_name}
-                    
-                    # Process TXT files
-                    elif file_name.endswith(".txt"):
-                        with open(file_path, "rb") as txt_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_txt(txt_file)
-                            response_data[original_name] = {"content": resume_content, "file_path": file_name}
-
-                    elif file_name.endswith(".docx"):
-                        try:
-                            with open(file_path, "rb") as docx_file:
-                                # Now read for text extraction
-                                resume_content = utils.read_docx(docx_file)
-                                response_data[original_name] = {"content": resume_content, "file_path": file_name}
-                        except Exception as e:
-                            response_data[original_name] = {"content": f"Error reading DOCX file: {str(e)}", "file_path": file_name}
+    :param cur: Open database cursor
+    :param unique_id: Id of the resume
+    :param signature: MinHash signature of the resume
+    """
+    cur.execute("UPDATE resume_table SET minhash = %s WHERE unique_id = %s",
+                (psycopg2.Binary(signature.tobytes()), unique_id))
+    cur.executemany("INSERT INTO resume_lsh (band, bucket, unique_id) VALUES (%s, %s, %s)",
+                    [(band, bucket, unique_id) for band, bucket in near_duplicates.band_keys(signature)])
 
-                    # Process DOC files
-                    elif file_name.endswith(".doc"):
-                        resume_content, _ = utils.read_doc(file_path)
-                        response_data[original_name] = {"content": resume_content, "file_path": file_name}
-                
-                    if resume_content is not None:
-                        try:
-                            # Insert the data into the database
-                            cur.execute("""
-                                INSERT INTO resume_table (unique_id, resume_name, resume_content, resume_key_aspect, score)
-                                VALUES (%s, %s, %s, %s, %s)
-                            """, (unique_id, resume_name, resume_content, None, None))
-                            conn.commit()
-                            print(f"Successfully stored {resume_name} in database")
-                        except Exception as e:
-                            print(f"Error storing {resume_name} in database: {str(e)}")
-                            conn.rollback()
-                    else:
-                        print(f"Skipping {resume_name} - No content or blob data available")
+def reuse_near_duplicate(cur, conn, filename, data, signature):
+    """
+    Reuse the key aspects of a stored near-duplicate, then store this resume's signature.
 
-                    upload_resume_file(filename=file_name, directory_path='extracted_files')
-                    print("Uploaded to S3 Bucket")
+    :param cur: Open database cursor
+    :param conn: Open database connection
+    :param filename: Name of the resume
+    :param data: Resume data with "file_path"
+    :param signature: MinHash signature of the resume
+    """
+    match = re.match(r"^\d{20}", data.get("file_path") or "")
+    if match is None:
+        return
+    try:
+        if not data.get("key_feature"):
+            stored = lookup_near_duplicate(cur, signature, match.group())
+            if stored is not None:
+                data["key_feature"] = stored[1]
+                data["near_duplicate_of"] = stored[0]
+                print(f"Reusing key aspects of near-duplicate {stored[0]} for: {filename}")
+        store_minhash(cur, match.group(), signature)
+        conn.commit()
+    except Exception as e:
+        print(f"Error checking near-duplicates of {filename}: {str(e)}")
+        conn.rollback()
 
+def normalize_job_description(job_description):
+    """
+    Collapse whitespace so that re-pasted copies of the same opening share a cache entry.
+    Only the cache key is normalized; the LLM still reads the text as it was pasted.
 
-                    # Clean up the extracted file
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                        except Exception as e:
-                            print(f"Error removing temporary file {file_path}: {str(e)}")
+    :param job_description: Raw job description text
+    :return: Normalized job description text
+    """
+    return " ".join(job_description.split())
 
-            else:
-                unique_id = timestamp
-                resume_name = file_name
-                resume_content = None
+async def get_processed_jd(job_description):
+    """
+    Return the processed job description, served from a TTL cache when possible.
 
-                # Save individual file to extracted_files directory
-                file_content = await file.read()
-                
-                with open(file_path, "wb") as f:
-                    f.write(file_content)
-
-                print(f"Reading file: {file_name}")
-                # Process based on file type
-                if file_extension == "pdf":
-                    with open(file_path, "rb") as pdf_file:
-                        # Now read for text extraction
-                        resume_content = utils.read_pdf(pdf_file)
-                        response_data[file_name] = {"content": resume_content}
-                
-                elif file_extension == "txt":
-                    with open(file_path, "rb") as txt_file:
-                        # Now read for text extraction
-                        resume_content = utils.read_txt(txt_file)
-                        response_data[file_name] = {"content": resume_content}
-                        
-                
-                elif file_extension == "docx":
-                    try:
-                        with open(file_path, "rb") as docx_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_docx(docx_file)
-                            response_data[file_name] = {"content": resume_content}
-                            
-                    except Exception as e:
-                        response_data[file_name] = {"content": str(e)}
-                
-                elif file_extension == "doc":
-                    resume_content, _ = utils.read_doc(file_path)
-                    response_data[file_name] = {"content": resume_content}
-                
-                else:
-                    # response_data[file_name] = {
-                    #     "error": "Unsupported file type. Supported formats: .pdf, .d ocx, .doc, .txt, .zip, .rar"
-                    # }
-                    pass
-                # Add file path to the response data
-                response_data[file_name]["file_path"] = f"{unique_id}_{resume_name}"
-
-                upload_resume_file(filename = f"{unique_id}_{resume_name}", directory_path='extracted_files')
-                print("Uploaded to S3 Bucket")
-            
-                # SQL query to insert data into the database. 
-                cur.execute( 
-                        "INSERT INTO resume_table(unique_id,resume_name,resume_content) "
-                        "VALUES(%s,%s,%s)", (unique_id, resume_name, resume_content)
-                        )
+    Concurrent requests for the same opening share a single in-flight LLM call.
 
-                conn.commit()
+    :param job_description: Raw job description text
+    :return: Processed job description from the job_description template
+    """
+    jd_hash = hashlib.sha256(normalize_job_description(job_description).encode("utf-8")).hexdigest()
+
+    cached = _processed_jd_cache.get(jd_hash)
+    if cached is not None and time.time() - cached[0] <= JD_CACHE_TTL_SECONDS:
+        print("Reusing the processed Job Description...\n")
+        return cached[1]
+
+    inflight = _processed_jd_inflight.get(jd_hash)
+    if inflight is None:
+        print("Processing the Job Description...\n")
+        inflight = asyncio.ensure_future(conversation_jd({"job_description_text": job_description}))
+        _processed_jd_inflight[jd_hash] = inflight
+        inflight.add_done_callback(lambda _: _processed_jd_inflight.pop(jd_hash, None))
+    # Shield the shared call so one cancelled request does not cancel it for the others
+    processed_jd = await asyncio.shield(inflight)
+
+    # Store the result and drop expired entries
+    now = time.time()
+    _processed_jd_cache[jd_hash] = (now, processed_jd)
+    for key in [key for key, (created_at, _) in _processed_jd_cache.items() if now - created_at > JD_CACHE_TTL_SECONDS]:
+        del _processed_jd_cache[key]
+    return processed_jd
 
-                
+async def async_key_aspect_extractor(filename, data):
+    try:
+        print(f"Extracting key aspects for: {filename} - START")
+        result = await llm_hedging.hedged("extract", lambda: conversation_resume({"resume_text": data.get("llm_content") or data["content"]}))
+        return filename, result
+    except Exception as e:
+        print(f"Error in key aspect extraction for {filename}: {e}")
+        return filename, None
 
-                # Clean up the extracted file
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        print(f"Error removing temporary file {file_path}: {str(e)}")
+async def async_resume_scorer(filename, key_aspect, job_description):
+    """
+    Score one resume, re-requesting only this resume when its output is malformed.
 
+    :param filename: Name of the resume
+    :param key_aspect: Key aspects extracted from the resume
+    :param job_description: Processed job description
+    :return: (filename, marks per rubric section and total) or (filename, None) on failure
+    """
+    for attempt in range(utils.SCORE_PARSE_ATTEMPTS):
+        try:
+            print(f"Scoring resume: {filename} - START")
+            result = await llm_hedging.hedged("score", lambda: conversation_score({
+                "resume_text": key_aspect,
+                "job_description": job_description
+            }))
+            return filename, utils.parse_score_output(result)
+        except ValueError as e:
+            # Malformed responses are never cached, so the next attempt is a fresh call
+            print(f"Malformed score for {filename} (attempt {attempt + 1}): {e}")
         except Exception as e:
-            response_data[file.filename] = {
-                "error": str(e)
-            }
-        
-    print("\n")       
-    response_data = await process_resumes_async(response_data, processed_jd)
+            print(f"Error in scoring for {filename}: {e}")
+            return filename, None
+    return filename, None
 
-    for key, value in response_data.items():
-        resume_key_aspect = value["key_feature"]
-        score = value["score"]
-        unique_id = value["file_path"]
-        unique_id = re.match(r"^\d{20}", unique_id).group()
+async def async_resume_extractor_scorer(filename, data, job_description):
+    """
+    Extract key aspects and score one resume in a single call, re-requesting it only when the output is malformed.
 
+    :param filename: Name of the resume
+    :param data: Resume data with the parsed "content"
+    :param job_description: Processed job description
+    :return: (filename, key aspects, marks per rubric section and total); the last two are None on failure
+    """
+    for attempt in range(utils.SCORE_PARSE_ATTEMPTS):
+        try:
+            print(f"Extracting and scoring resume: {filename} - START")
+            result = await llm_hedging.hedged("extract_and_score", lambda: conversation_extract_and_score({
+                "resume_text": data.get("llm_content") or data["content"],
+                "job_description": job_description
+            }))
+            key_aspect, scores = utils.parse_extract_and_score_output(result)
+            return filename, key_aspect, scores
+        except ValueError as e:
+            print(f"Malformed extract-and-score output for {filename} (attempt {attempt + 1}): {e}")
+        except Exception as e:
+            print(f"Error in extract-and-score for {filename}: {e}")
+            return filename, None, None
+    return filename, None, None
 
-        cur.execute(
+async def extract_key_aspects_stage(filename, data):
+    # Resumes whose key aspects were reused from the database skip the LLM call
+    if not data.get("key_feature"):
+        _, key_aspect = await async_key_aspect_extractor(filename, data)
+        data["key_feature"] = key_aspect or ""
+
+def make_score_stage(processed_jd, batcher=None, cascade=None):
+    """
+    Build the scoring stage for one job description.
+
+    :param processed_jd: Processed job description, or a task that resolves to it
+    :param batcher: Optional batch_scoring.ScoreBatcher to score several resumes per request
+    :param cascade: Optional model_cascade.ModelCascade to escalate only borderline resumes to the strong model
+    :return: Pipeline stage function
+    """
+    async def score_stage(filename, data):
+        if batcher is not None:
+            score = await batcher.score(filename, data.get("key_feature", ""))
+        elif cascade is not None:
+            job_description = await processed_jd if asyncio.isfuture(processed_jd) else processed_jd
+            scores, escalated = await cascade.score(filename, data.get("key_feature", ""), job_description)
+            score = str(scores["total"]) if scores else ""
+            data["score_breakdown"] = scores or {}
+            data["score_model"] = cascade.strong_model if escalated else cascade.cheap_model
+        else:
+            # Scoring waits for the job description only when the first resume gets here
+            job_description = await processed_jd if asyncio.isfuture(processed_jd) else processed_jd
+            _, scores = await async_resume_scorer(filename, data.get("key_feature", ""), job_description)
+            score = str(scores["total"]) if scores else ""
+            data["score_breakdown"] = scores or {}
+        data["key_feature"] = utils.clean_text(data.get("key_feature") or "")
+        data["score"] = score or ""
+    return score_stage
+
+def make_extract_and_score_stage(processed_jd):
+    """
+    Build the fast-mode stage that extracts key aspects and scores each resume in one call.
+
+    :param processed_jd: Processed job description, or a task that resolves to it
+    :return: Pipeline stage function
+    """
+    score_stage = make_score_stage(processed_jd)
+
+    async def extract_and_score_stage(filename, data):
+        # Resumes whose key aspects were reused from the database only need scoring
+        if data.get("key_feature"):
+            await score_stage(filename, data)
+            return
+        job_description = await processed_jd if asyncio.isfuture(processed_jd) else processed_jd
+        _, key_aspect, scores = await async_resume_extractor_scorer(filename, data, job_description)
+        data["key_feature"] = utils.clean_text(key_aspect or "")
+        data["score"] = str(scores["total"]) if scores else ""
+        data["score_breakdown"] = scores or {}
+    return extract_and_score_stage
+
+def make_persist_stage(cur, conn, on_persisted=None):
+    """
+    Build the stage that writes each scored resume back to resume_table.
+
+    :param cur: Open database cursor
+    :param conn: Open database connection
+    :param on_persisted: Optional callback(filename, data) run once a resume has left the pipeline
+    :return: Pipeline stage function
+    """
+    def persist_stage(filename, data):
+        try:
+            unique_id = re.match(r"^\d{20}", data["file_path"]).group()
+            cur.execute(
                 """
                 UPDATE resume_table 
                 SET resume_key_aspect = %s, 
                     score = %s 
                 WHERE unique_id = %s
                 """, 
-                (resume_key_aspect, score, unique_id)
+                (data["key_feature"], data["score"] or None, unique_id)
             )
+            conn.commit()
+        except Exception as e:
+            print(f"Error storing scores for {filename}: {str(e)}")
+            conn.rollback()
+        finally:
+            if on_persisted is not None:
+                on_persisted(filename, data)
+    return persist_stage
+
+async def process_resumes_async(response_data, job_description, persist=None):
+    """
+    Extract key aspects, score and optionally persist already-parsed resumes.
 
-            # Commit the changes
-        conn.commit()
+    Each resume moves through the stages on its own; see resume_pipeline.ResumePipeline.
 
-    resume_df = pd.DataFrame(columns=['Resume Name', 'Score'])
-    i = 0
-    for key, value in response_data.items():
-        resume_df.loc[i, "Resume Name"] = key
-        resume_df.loc[i, "Score"] = value["score"]
-        i += 1
+    :param response_data: Resume data keyed by filename
+    :param job_description: Processed job description, or a task that resolves to it
+    :param persist: Optional persist stage function
+    :return: response_data with key_feature and score filled in
+    """
+    return await resume_pipeline.run_pipeline(
+        response_data, extract_key_aspects_stage, make_score_stage(job_description), persist
+    )
 
-    resume_df.sort_values(by='Score', ascending=False, inplace=True)
-    file_path = os.path.join("extracted_files", f'R_Resume_Scorecard.xlsx')
+# Seconds between keep-alive comments on the upload event stream
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
 
-        # Save the scorecard to an Excel file
-    resume_df.to_excel(file_path, index=False)
+def format_sse(event, payload):
+    """
+    Format one server-sent event.
 
-    if cur is not None:
-        cur.close()
-        print('Cursor closed.')
+    :param event: Event name
+    :param payload: JSON-serializable event data
+    :return: The event as text
+    """
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
 
-    if conn is not None:
-        conn.close()
-        print('Database connection closed.')
+def resume_event_payload(filename, data):
+    """
+    Select the fields of a processed resume sent to the client; the parsed text is left out.
+
+    :param filename: Name of the resume
+    :param data: Resume data
+    :return: Event data
+    """
+    payload = {"name": filename}
+    for field in ("score", "score_breakdown", "score_model", "lexical_score", "duplicate_of", "key_feature",
+                  "file_path", "error"):
+        if field in data:
+            payload[field] = data[field]
+    return payload
+
+def vector_index_item(data):
+    """
+    Return the vector index entry of a parsed resume.
+
+    :param data: Resume data with "content" and "file_path"
+    :return: (unique_id, content) pair, or None if the resume has no id or content
+    """
+    match = re.match(r"^\d{20}", data.get("file_path") or "")
+    if match is None or not data.get("content"):
+        return None
+    return match.group(), data["content"]
+
+async def index_resumes(items):
+    """
+    Add the parsed resumes of an upload to the vector index of the resume pool in one batch.
+
+    A single add embeds the batch together and flushes the index files once.
+
+    :param items: (unique_id, content) pairs
+    """
+    if not items:
+        return
+    try:
+        # Embedding may call a remote API, so keep it off the event loop
+        await asyncio.to_thread(vector_index.get_vector_index().add, items)
+    except Exception as e:
+        print(f"Error indexing {len(items)} resumes: {str(e)}")
+
+async def submit_preranked(resumes, processed_jd, pipeline, persist_stage):
+    """
+    Rank parsed resumes lexically against the job description and send only the best to the LLM stages.
+
+    The others are stored with their lexical score and no LLM score.
+
+    :param resumes: Parsed resume data keyed by name
+    :param processed_jd: Processed job description, or a task that resolves to it
+    :param pipeline: Started resume_pipeline.ResumePipeline
+    :param persist_stage: Stage function that stores a resume
+    """
+    job_description = await processed_jd if asyncio.isfuture(processed_jd) else processed_jd
+    selected, lexical_scores = lexical_ranker.rank_resumes(
+        job_description, {name: data.get("content") or "" for name, data in resumes.items()}
+    )
+    for name, data in resumes.items():
+        data["lexical_score"] = lexical_scores[name]
+    for name in selected:
+        await pipeline.submit(name, resumes[name])
+    for name in resumes.keys() - set(selected):
+        data = resumes[name]
+        data.setdefault("key_feature", "")
+        data["score"] = ""
+        data["score_model"] = "lexical"
+        persist_stage(name, data)
+
+@app.post("/upload-files/")
+async def upload_files(job_description: str, files: list[UploadFile] = File(...), multi_resume_scoring: bool = False,
+                       fast_mode: bool = False, cascade: bool = False, prerank: bool = False,
+                       deduplicate: bool = True):
+    """
+    Parse, score and store uploaded resumes against a job description.
+
+    :param job_description: Raw job description
+    :param files: Resume files or zip archives
+    :param multi_resume_scoring: Score several resumes per LLM request, sharing one copy of the job description
+    :param fast_mode: Extract key aspects and score each resume in one LLM call instead of two; takes precedence
+                      over multi_resume_scoring and cascade
+    :param cascade: Give every resume a quick score from the cheap model and re-score only those near the
+                    shortlist cutoff with the strong model; takes precedence over multi_resume_scoring
+    :param prerank: Rank the whole upload lexically first and send only the best matches to the LLM; the
+                    others keep just their lexical score (see lexical_ranker)
+    :param deduplicate: Score each group of near-duplicate resumes once and report the result for every member,
+                        and reuse the key aspects of near-duplicates already stored (see near_duplicates)
+    :return: Resume data keyed by name; the Excel scorecard is written for /download-scorecard
+    """
+    scoring_cascade = model_cascade.ModelCascade() if cascade else None
+    return await process_upload(job_description, files, multi_resume_scoring, fast_mode, cascade=scoring_cascade,
+                                prerank=prerank, deduplicate=deduplicate)
+
+
+@app.post("/upload-files-stream/")
+async def upload_files_stream(job_description: str, files: list[UploadFile] = File(...),
+                              multi_resume_scoring: bool = False, fast_mode: bool = False, cascade: bool = False,
+                              prerank: bool = False, deduplicate: bool = True):
+    """
+    Streaming variant of /upload-files/ that reports each resume as server-sent events.
+
+    A "resume" event carries a resume's score and key aspects as soon as it is stored, an "error" event
+    a file that could not be processed, and a final "summary" event the totals, and the cascade's
+    escalations and savings when it is used, once the scorecard is written. Comment lines are sent while waiting so proxies do not time the request out.
+
+    :param job_description: Raw job description
+    :param files: Resume files or zip archives
+    :param multi_resume_scoring: See /upload-files/
+    :param fast_mode: See /upload-files/
+    :param cascade: See /upload-files/
+    :param prerank: See /upload-files/
+    :param deduplicate: See /upload-files/
+    :return: text/event-stream response
+    """
+    # The uploaded files are closed once this function returns, before the stream is consumed, so each is
+    # read once into the buffer that process_upload parses, hashes and uploads
+    buffered_files = [await upload_buffers.from_upload(file) for file in files]
+    scoring_cascade = model_cascade.ModelCascade() if cascade else None
+    events = asyncio.Queue()
+
+    def on_resume_done(filename, data):
+        event = "error" if "error" in data else "resume"
+        events.put_nowait((event, resume_event_payload(filename, data)))
+
+    async def stream():
+        started_at = time.perf_counter()
+        # Processing keeps going if the client disconnects, so the database and scorecard stay complete
+        task = asyncio.create_task(process_upload(
+            job_description, buffered_files, multi_resume_scoring, fast_mode, on_resume_done=on_resume_done,
+            cascade=scoring_cascade, prerank=prerank, deduplicate=deduplicate
+        ))
+        # Release the archives and any buffer that process_upload did not close, even if the client left
+        task.add_done_callback(lambda finished: [buffer.close() for buffer in buffered_files])
+        # Wait for the next event or the end of processing, whichever comes first, so the summary
+        # goes out as soon as the upload is done rather than after the keep-alive timeout
+        next_event = None
+        try:
+            while not (task.done() and events.empty() and next_event is None):
+                if next_event is None:
+                    next_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({task, next_event}, timeout=SSE_KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    event, payload = next_event.result()
+                    next_event = None
+                    yield format_sse(event, payload)
+                elif not done:
+                    yield ": keep-alive\n\n"
+                elif events.empty():
+                    break
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+
+        try:
+            response_data = task.result()
+        except Exception as e:
+            yield format_sse("error", {"error": str(e)})
+            return
+        summary = {
+            "resumes": len(response_data),
+            "scored": sum(1 for data in response_data.values() if data.get("score")),
+            "errors": sum(1 for data in response_data.values() if "error" in data),
+            "elapsed_seconds": round(time.perf_counter() - started_at, 2),
+            "scorecard": "/download-scorecard",
+        }
+        if scoring_cascade is not None and not fast_mode:
+            summary["cascade"] = scoring_cascade.stats()
+        yield format_sse("summary", summary)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def process_upload(job_description, files, multi_resume_scoring=False, fast_mode=False, on_resume_done=None,
+                         cascade=None, prerank=False, deduplicate=True):
+    """
+    Parse, score and store uploaded resumes, and write the Excel scorecard.
+
+    :param job_description: Raw job description
+    :param files: Resume files or zip archives, as UploadFiles or upload_buffers.UploadBuffers
+    :param multi_resume_scoring: See /upload-files/
+    :param fast_mode: See /upload-files/
+    :param on_resume_done: Optional callback(filename, data) run as each resume is stored or fails
+    :param cascade: Optional model_cascade.ModelCascade used to score the resumes
+    :param prerank: See /upload-files/
+    :param deduplicate: See /upload-files/
+    :return: Resume data keyed by name
+    """
+    response_data = {}
+
+    # Process the job description concurrently with file ingestion
+    jd_task = asyncio.create_task(get_processed_jd(job_description))
+    # A failed JD call is reported through the stages; retrieve it here too in case none awaits it
+    jd_task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+    pipeline = None
+    batcher = None
+    try:
+        # Create extracted_files directory if it doesn't exist
+        extract_path = "extracted_files"
+    
+        # Clean the extracted_files directory before processing
+        if os.path.exists(extract_path):
+            shutil.rmtree(extract_path)
+    
+        os.makedirs(extract_path, exist_ok=True)
+
+        try:
+            conn = psycopg2.connect(
+            host=hostname,
+            user=username,
+            password=password,
+            dbname=database,
+            port=port_id
+            )
+
+            cur = conn.cursor()
+
+            cur.execute("""
+                    CREATE TABLE IF NOT EXISTS resume_table (
+                        unique_id NUMERIC PRIMARY KEY,
+                        resume_name VARCHAR(100) ,
+                        resume_content TEXT ,
+                        resume_key_aspect TEXT ,
+                        score INTEGER
+                    )
+                """)
+            # Content fingerprint used to reuse parsing and key aspects on repeat uploads
+            cur.execute("ALTER TABLE resume_table ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_table_file_hash ON resume_table (file_hash)")
+            # MinHash signatures and their LSH buckets, used to find near-duplicate resumes
+            cur.execute("ALTER TABLE resume_table ADD COLUMN IF NOT EXISTS minhash BYTEA")
+            cur.execute("""
+                    CREATE TABLE IF NOT EXISTS resume_lsh (
+                        band SMALLINT,
+                        bucket BIGINT,
+                        unique_id NUMERIC
+                    )
+                """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_resume_lsh_bucket ON resume_lsh (bucket)")
+            conn.commit()
+
+        except (Exception, psycopg2.Error) as error:
+            print("Error while connecting to PostgreSQL", error)
+
+        persist_stage = make_persist_stage(cur, conn, on_resume_done)
+        # Each resume enters extraction as soon as it is parsed and stored
+        if fast_mode:
+            # A single call per resume; there is no separate scoring stage
+            pipeline = resume_pipeline.ResumePipeline(
+                make_extract_and_score_stage(jd_task), None, persist_stage
+            ).start()
+        else:
+            score_concurrency = resume_pipeline.SCORE_CONCURRENCY
+            if cascade is not None:
+                multi_resume_scoring = False
+            if multi_resume_scoring:
+                batcher = batch_scoring.ScoreBatcher(jd_task)
+                # Enough scoring workers to fill a whole group while earlier groups are in flight
+                score_concurrency = max(score_concurrency, 2 * batcher.max_size)
+            pipeline = resume_pipeline.ResumePipeline(
+                extract_key_aspects_stage, make_score_stage(jd_task, batcher, cascade), persist_stage,
+                score_concurrency=score_concurrency
+            ).start()
+
+        # With pre-ranking, parsed resumes wait until the whole upload can be ranked
+        deferred = {}
+        # Near-duplicates of a resume earlier in this upload wait for its result instead of being scored
+        grouper = near_duplicates.DuplicateGrouper()
+        duplicates = {}
+
+        # Parsed resumes are added to the vector index together once the upload is processed
+        index_items = []
+
+        async def submit(name, data):
+            index_item = vector_index_item(data)
+            if index_item is not None:
+                index_items.append(index_item)
+            if deduplicate:
+                signature = near_duplicates.minhash_signature(data.get("content") or "")
+                if signature is not None:
+                    representative = grouper.add(name, signature)
+                    reuse_near_duplicate(cur, conn, name, data, signature)
+                    if representative is not None:
+                        print(f"{name} is a near-duplicate of {representative}")
+                        data["duplicate_of"] = representative
+                        duplicates[name] = data
+                        return
+            if prerank:
+                deferred[name] = data
+            else:
+                await pipeline.submit(name, data)
+
+        # Buffer every individual file in memory, hashing it on the way, and start parsing it right away, so
+        # the files of this upload parse in parallel in the process pool; the loop below picks up each result
+        # in turn. The same buffer later streams to S3, so resumes are never written to disk.
+        staged_files = {}
+        for file in files:
+            if file.content_type == "application/zip" or file.filename.split(".")[-1].lower() == "zip":
+                continue
+            buffer = None
+            try:
+                time.sleep(0.001)
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+                # Files buffered by the streaming endpoint are used as they are
+                buffer = file if isinstance(file, upload_buffers.UploadBuffer) else await upload_buffers.from_upload(file)
+                cached_resume = lookup_processed_resume(cur, buffer.sha256)
+                parse_task = None
+                if cached_resume is None and file.filename.split(".")[-1].lower() in PARSED_EXTENSIONS:
+                    parse_task = start_parsing(file.filename, buffer)
+                staged_files[id(file)] = (timestamp, buffer, cached_resume, parse_task)
+            except Exception as e:
+                if buffer is not None:
+                    buffer.close()
+                staged_files[id(file)] = e
+
+        for file in files:
+            try:
+                # Fallback to file extension if MIME type is not reliable
+                file_extension = file.filename.split(".")[-1].lower()
+
+                # Generate a unique file name using a timestamp
+                time.sleep(0.001)
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+                file_name = file.filename
+
+                if file.content_type == "application/zip" or file_extension == "zip":
+                    # The upload is already a seekable spooled file, so the archive is read in place
+                    with zipfile.ZipFile(file.file, 'r') as z:
+                        def stage_member(original_file_name):
+                            # Decompress one file into its own buffer, hashing it on the way, look it up and start parsing it
+                            time.sleep(0.001)
+                            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+                            unique_file_name = f"{timestamp}_{original_file_name}"
+                            buffer = upload_buffers.from_zip_member(z, original_file_name)
+                            try:
+                                cached_resume = lookup_processed_resume(cur, buffer.sha256)
+                                parse_task = None
+                                if cached_resume is None and unique_file_name.endswith(tuple(f".{extension}" for extension in PARSED_EXTENSIONS)):
+                                    parse_task = start_parsing(unique_file_name, buffer)
+                            except Exception:
+                                buffer.close()
+                                raise
+                            return original_file_name, unique_file_name, buffer, cached_resume, parse_task
+
+                        def stage_next():
+                            # Stage the next member that can be read; a corrupt member or a failed lookup is
+                            # recorded on its own so the rest of the archive is still processed
+                            for original_file_name in pending_names:
+                                try:
+                                    return stage_member(original_file_name)
+                                except Exception as e:
+                                    print(f"Error reading {original_file_name}: {str(e)}")
+                                    response_data[original_file_name] = {"error": str(e)}
+                                    if on_resume_done is not None:
+                                        on_resume_done(original_file_name, response_data[original_file_name])
+                            return None
+
+                        # Folders have no content. Only as many files as the pool has workers are decompressed
+                        # and parsing at a time; the next one is staged as each file is released, so memory
+                        # stays bounded however large the archive is.
+                        pending_names = iter([name for name in z.namelist() if not name.endswith("/")])
+                        staged_members = collections.deque()
+                        try:
+                            for _ in range(parse_pool.PARSE_WORKERS):
+                                staged_member = stage_next()
+                                if staged_member is None:
+                                    break
+                                staged_members.append(staged_member)
+                            while staged_members:
+                                # The member stays staged until it is released, so a failure below releases it too
+                                original_name, file_name, buffer, cached_resume, parse_task = staged_members[0]
+                                file_hash = buffer.sha256
+                                print(f"Reading file: {original_name}")
+                                unique_id = re.match(r'^\d+', file_name).group()
+                                resume_name = original_name
+                                resume_content = None
+                                resume_key_aspect = None
+
+                                # Reuse the stored content and key aspects of an identical file
+                                if cached_resume is not None:
+                                    resume_content, resume_key_aspect = cached_resume
+                                    response_data[original_name] = {"content": resume_content, "file_path": file_name,
+                                                                    "key_feature": resume_key_aspect}
+                                    print(f"Reusing stored key aspects for: {original_name}")
+
+                                elif file_name.endswith(".pdf") or file_name.endswith(".txt") or file_name.endswith(".doc"):
+                                    # Text extraction runs in the parsing pool; a file that fails or times out
+                                    # is recorded on its own so the rest of the archive is still processed
+                                    try:
+                                        parsed = await parsed_resume(parse_task)
+                                        resume_content = parsed["content"]
+                                        response_data[original_name] = {**parsed, "file_path": file_name}
+                                    except Exception as e:
+                                        response_data[original_name] = {"error": str(e), "file_path": file_name}
+
+                                elif file_name.endswith(".docx"):
+                                    try:
+                                        parsed = await parsed_resume(parse_task)
+                                        resume_content = parsed["content"]
+                                        response_data[original_name] = {**parsed, "file_path": file_name}
+                                    except Exception as e:
+                                        response_data[original_name] = {"content": f"Error reading DOCX file: {str(e)}", "file_path": file_name}
+                
+                                if resume_content is not None:
+                                    try:
+                                        # Insert the data into the database
+                                        cur.execute("""
+                                            INSERT INTO resume_table (unique_id, resume_name, resume_content, resume_key_aspect, score, file_hash)
+                                            VALUES (%s, %s, %s, %s, %s, %s)
+                                        """, (unique_id, resume_name, resume_content, resume_key_aspect, None, file_hash))
+                                        conn.commit()
+                                        print(f"Successfully stored {resume_name} in database")
+                                    except Exception as e:
+                                        print(f"Error storing {resume_name} in database: {str(e)}")
+                                        conn.rollback()
+                                else:
+                                    print(f"Skipping {resume_name} - No content or blob data available")
+
+                                if "error" in response_data.get(original_name, {}):
+                                    if on_resume_done is not None:
+                                        on_resume_done(original_name, response_data[original_name])
+                                elif original_name in response_data:
+                                    await submit(original_name, response_data[original_name])
+
+                                upload_buffer_to_s3(buffer, os.path.basename(file_name))
+                                print("Uploaded to S3 Bucket")
+
+                                # Release the file's buffer and decompress the next one in its place
+                                buffer.close()
+                                staged_members.popleft()
+                                staged_member = stage_next()
+                                if staged_member is not None:
+                                    staged_members.append(staged_member)
+                        finally:
+                            # A member that failed the whole archive leaves the others unprocessed; release them
+                            for _, _, buffer, _, parse_task in staged_members:
+                                buffer.close()
+                                if parse_task is not None:
+                                    parse_task.cancel()
+
+                else:
+                    # The file was buffered, looked up and sent for parsing before this loop
+                    staged = staged_files[id(file)]
+                    if isinstance(staged, Exception):
+                        raise staged
+                    timestamp, buffer, cached_resume, parse_task = staged
+                    file_hash = buffer.sha256
+                    unique_id = timestamp
+                    resume_name = file_name
+                    resume_content = None
+                    resume_key_aspect = None
+
+                    print(f"Reading file: {file_name}")
+                    # Reuse the stored content and key aspects of an identical file
+                    if cached_resume is not None:
+                        resume_content, resume_key_aspect = cached_resume
+                        response_data[file_name] = {"content": resume_content, "key_feature": resume_key_aspect}
+                        print(f"Reusing stored key aspects for: {file_name}")
+
+                    # Process based on file type
+                    elif file_extension in ("pdf", "txt", "doc"):
+                        # Text extraction runs in the parsing pool
+                        parsed = await parsed_resume(parse_task)
+                        resume_content = parsed["content"]
+                        response_data[file_name] = parsed
+                
+                    elif file_extension == "docx":
+                        try:
+                            parsed = await parsed_resume(parse_task)
+                            resume_content = parsed["content"]
+                            response_data[file_name] = parsed
+                        except Exception as e:
+                            response_data[file_name] = {"content": str(e)}
+                
+                    else:
+                        # response_data[file_name] = {
+                        #     "error": "Unsupported file type. Supported formats: .pdf, .d ocx, .doc, .txt, .zip, .rar"
+                        # }
+                        pass
+                    # Add file path to the response data
+                    response_data[file_name]["file_path"] = f"{unique_id}_{resume_name}"
+
+                    upload_buffer_to_s3(buffer, f"{unique_id}_{resume_name}")
+                    print("Uploaded to S3 Bucket")
+            
+                    # SQL query to insert data into the database. 
+                    cur.execute( 
+                            "INSERT INTO resume_table(unique_id,resume_name,resume_content,resume_key_aspect,file_hash) "
+                            "VALUES(%s,%s,%s,%s,%s)", (unique_id, resume_name, resume_content, resume_key_aspect, file_hash)
+                            )
+
+                    conn.commit()
+
+                    await submit(file_name, response_data[file_name])
+
+                    # Release the file's buffer
+                    buffer.close()
+
+            except Exception as e:
+                staged = staged_files.get(id(file))
+                if isinstance(staged, tuple):
+                    staged[1].close()
+                response_data[file.filename] = {
+                    "error": str(e)
+                }
+                if on_resume_done is not None:
+                    on_resume_done(file.filename, response_data[file.filename])
+        
+        print("\n")       
+        if prerank:
+            await submit_preranked(deferred, jd_task, pipeline, persist_stage)
+        # Wait for the resumes still moving through extraction, scoring and persistence
+        await pipeline.finish()
+        if batcher is not None:
+            await batcher.finish()
+        await index_resumes(index_items)
+        # Every member of a near-duplicate group gets the result of the one that was scored
+        for name, data in duplicates.items():
+            source = response_data[data["duplicate_of"]]
+            for field in ("key_feature", "score", "score_breakdown", "score_model", "lexical_score"):
+                if field in source:
+                    data[field] = source[field]
+            persist_stage(name, data)
+        if deduplicate:
+            print(f"Near-duplicates: {grouper.stats()}")
+        if cascade is not None and not fast_mode:
+            print(f"Model cascade: {cascade.stats()}")
+
+        # Files that failed before reaching the pipeline get an empty score
+        for value in response_data.values():
+            value.setdefault("key_feature", "")
+            value.setdefault("score", "")
+            # The compacted LLM input duplicates the content, so it is not returned
+            value.pop("llm_content", None)
+
+        resume_df = pd.DataFrame(columns=['Resume Name', 'Score'])
+        i = 0
+        for key, value in response_data.items():
+            resume_df.loc[i, "Resume Name"] = key
+            resume_df.loc[i, "Score"] = value["score"]
+            if value.get("duplicate_of"):
+                resume_df.loc[i, "Duplicate Of"] = value["duplicate_of"]
+            # Section marks, when the resume was scored with the structured output
+            for section, mark in value.get("score_breakdown", {}).items():
+                if section != "total":
+                    resume_df.loc[i, section] = mark
+            i += 1
+
+        # Sort numerically so that 100 ranks above 99 and 9
+        resume_df["Score"] = pd.to_numeric(resume_df["Score"], errors="coerce")
+        if prerank:
+            # Resumes kept out of the LLM stages follow the scored ones, ordered by their lexical score
+            resume_df["Lexical Score"] = [response_data[name].get("lexical_score") for name in resume_df["Resume Name"]]
+            resume_df.sort_values(by=['Score', 'Lexical Score'], ascending=False, inplace=True)
+        else:
+            resume_df.sort_values(by='Score', ascending=False, inplace=True)
+        file_path = os.path.join("extracted_files", f'R_Resume_Scorecard.xlsx')
+
+            # Save the scorecard to an Excel file
+        resume_df.to_excel(file_path, index=False)
+
+        if cur is not None:
+            cur.close()
+            print('Cursor closed.')
+
+        if conn is not None:
+            conn.close()
+            print('Database connection closed.')
 
-    return response_data
+        return response_data
+    finally:
+        # Stop the stage workers, scoring groups and the JD call if the upload failed before the pipeline finished
+        if pipeline is not None:
+            pipeline.cancel()
+        if batcher is not None:
+            batcher.cancel()
+        jd_task.cancel()
 
 
 @app.post("/download-resume/{file_path}")
@@ -558,6 +1222,136 @@ def download_file(file_path: str):
         return JSONResponse(content={"message": "File not found."}, status_code=404)
         
 
+@app.post("/match-candidates/")
+async def match_candidates(job_description: str, k: int = 200, score: bool = False):
+    """
+    Find the stored resumes closest to a job description in the vector index, without re-uploading them.
+
+    :param job_description: Raw job description
+    :param k: Number of candidates to return
+    :param score: Also score the candidates against the job description, reusing their stored key aspects
+    :return: Candidates with their similarity, and their scores when requested, best first
+    """
+    started_at = time.perf_counter()
+    matches = await asyncio.to_thread(vector_index.get_vector_index().search, job_description, k)
+    search_ms = round((time.perf_counter() - started_at) * 1000, 1)
+    if not matches:
+        return {"candidates": [], "search_ms": search_ms}
+
+    conn = psycopg2.connect(host=hostname, user=username, password=password, dbname=database, port=port_id)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT unique_id, resume_name, resume_content, resume_key_aspect FROM resume_table "
+            "WHERE unique_id = ANY(%s::numeric[])",
+            ([unique_id for unique_id, _ in matches],)
+        )
+        rows = {str(row[0]): row for row in cur.fetchall()}
+        cur.close()
+    finally:
+        conn.close()
+
+    candidates = {}
+    for unique_id, similarity in matches:
+        row = rows.get(unique_id)
+        if row is None:
+            continue
+        candidates[f"{unique_id}_{row[1]}"] = {"content": row[2], "key_feature": row[3] or "",
+                                                "file_path": f"{unique_id}_{row[1]}", "similarity": similarity}
+    if score:
+        await process_resumes_async(candidates, asyncio.create_task(get_processed_jd(job_description)))
+
+    results = [{"file_path": data["file_path"], "similarity": data["similarity"], "score": data.get("score"),
+                "score_breakdown": data.get("score_breakdown")} for data in candidates.values()]
+    if score:
+        results.sort(key=lambda result: int(result["score"] or -1), reverse=True)
+    return {"candidates": results, "search_ms": search_ms}
+
+
+@app.post("/vector-index/rebuild")
+async def rebuild_vector_index():
+    """Endpoint to add every stored resume missing from the vector index."""
+    def backfill():
+        conn = psycopg2.connect(host=hostname, user=username, password=password, dbname=database, port=port_id)
+        added = 0
+        try:
+            # A named cursor streams the table instead of loading it at once
+            cur = conn.cursor(name="vector_index_backfill")
+            cur.execute("SELECT unique_id, resume_content FROM resume_table WHERE resume_content IS NOT NULL")
+            while True:
+                rows = cur.fetchmany(500)
+                if not rows:
+                    break
+                added += vector_index.get_vector_index().add([(str(unique_id), content) for unique_id, content in rows])
+            cur.close()
+        finally:
+            conn.close()
+        return added
+
+    added = await asyncio.to_thread(backfill)
+    return {"added": added, **vector_index.get_vector_index().stats()}
+
+
+@app.get("/vector-index-stats")
+def vector_index_stats():
+    """Endpoint to report the size and layout of the resume vector index."""
+    return vector_index.get_vector_index().stats()
+
+
+@app.get("/parse-pool-stats")
+def parse_pool_stats():
+    """Endpoint to report the parsing process pool size, tasks, timeouts and restarts."""
+    return parse_pool.get_parse_pool().stats()
+
+
+@app.get("/llm-cache-stats")
+def llm_cache_stats():
+    """Endpoint to report LLM response cache hits, misses and estimated savings."""
+    cache = llm_cache.get_response_cache()
+    if cache is None:
+        return JSONResponse(content={"message": "LLM response cache is disabled."}, status_code=404)
+    return cache.stats()
+
+
+@app.get("/resume-compaction-stats")
+def resume_compaction_stats():
+    """Endpoint to report how many resume tokens compaction removed before the LLM calls."""
+    return resume_compaction.compaction_stats()
+
+
+@app.get("/prompt-cache-stats")
+def prompt_cache_stats():
+    """Endpoint to report cached vs uncached prompt tokens per prompt template."""
+    return prompt_registry.prompt_registry.stats()
+
+
+@app.get("/llm-rate-limits")
+def llm_rate_limits():
+    """Endpoint to report the shared LLM rate-limit budgets, throttling and circuit breaker states."""
+    return {
+        "rate_limits": rate_limiter.rate_limiter_stats(),
+        "circuit_breakers": llm_retry.circuit_breaker_stats()
+    }
+
+
+@app.get("/llm-latency")
+def llm_latency():
+    """Endpoint to report per-stage LLM tail latency with and without hedging, and the hedges sent."""
+    return llm_hedging.latency_stats()
+
+
+@app.get("/llm-providers")
+def llm_provider_stats():
+    """Endpoint to report each LLM provider's routing weight, health and failovers."""
+    return llm_providers.get_router().stats()
+
+
+@app.get("/llm-cascade-stats")
+def llm_cascade_stats():
+    """Endpoint to report how many resumes the model cascade escalated and the estimated savings."""
+    return model_cascade.cascade_stats()
+
+
 @app.post("/download-scorecard")
 def download_file():
     """Endpoint to download the excel file containing resume scores."""
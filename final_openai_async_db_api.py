@@ -2,7 +2,6 @@ from fastapi import FastAPI, File, UploadFile
 from fastapi.responses import JSONResponse, FileResponse
 from PyPDF2 import PdfReader
 from docx import Document
-import win32com.client
 import os
 import openai
 import io
@@ -17,6 +16,7 @@ import re
 import psycopg2
 import shutil
 import utils
+import parse_pool
 
 # Load API Key
 load_dotenv()
@@ -247,7 +247,7 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                             # Reset file pointer to start
                             pdf_file.seek(0)
                             # Now read for text extraction
-                            resume_content = utils.read_pdf(pdf_file)
+                            resume_content = await parse_pool.parse_file(file_path)
                             response_data[original_name] = {"content": resume_content, "file_path": unique_id}
                     
                     # Process TXT files
@@ -260,7 +260,7 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                             # Reset file pointer to start
                             txt_file.seek(0)
                             # Now read for text extraction
-                            resume_content = utils.read_txt(txt_file)
+                            resume_content = await parse_pool.parse_file(file_path)
                             response_data[original_name] = {"content": resume_content, "file_path": unique_id}
 
                     elif file_name.endswith(".docx"):
@@ -273,14 +273,14 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                                 # Reset file pointer to start
                                 docx_file.seek(0)
                                 # Now read for text extraction
-                                resume_content = utils.read_docx(docx_file)
+                                resume_content = await parse_pool.parse_file(file_path)
                                 response_data[original_name] = {"content": resume_content, "file_path": unique_id}
                         except Exception as e:
                             response_data[original_name] = {"content": f"Error reading DOCX file: {str(e)}", "file_path": unique_id}
 
                     # Process DOC files
                     elif file_name.endswith(".doc"):
-                        resume_content, blob_data = utils.read_doc(file_path)
+                        resume_content, blob_data = await parse_pool.parse_file(file_path), None
                         response_data[original_name] = {"content": resume_content, "file_path": unique_id}
                 
                     if resume_content is not None and blob_data is not None:
@@ -328,7 +328,7 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                         # Reset file pointer to start
                         pdf_file.seek(0)
                         # Now read for text extraction
-                        resume_content = utils.read_pdf(pdf_file)
+                        resume_content = await parse_pool.parse_file(file_path)
                         response_data[file_name] = {"content": resume_content}
                 
                 elif file_extension == "txt":
@@ -340,7 +340,7 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                         # Reset file pointer to start
                         txt_file.seek(0)
                         # Now read for text extraction
-                        resume_content = utils.read_txt(txt_file)
+                        resume_content = await parse_pool.parse_file(file_path)
                         response_data[file_name] = {"content": resume_content}
                         
                 
@@ -354,14 +354,14 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                             # Reset file pointer to start
                             docx_file.seek(0)
                             # Now read for text extraction
-                            resume_content = utils.read_docx(docx_file)
+                            resume_content = await parse_pool.parse_file(file_path)
                             response_data[file_name] = {"content": resume_content}
                             
                     except Exception as e:
                         response_data[file_name] = {"content": str(e)}
                 
                 elif file_extension == "doc":
-                    resume_content, blob_data = utils.read_doc(file_path)
+                    resume_content, blob_data = await parse_pool.parse_file(file_path), None
                     response_data[file_name] = {"content": resume_content}
                 
                 else:
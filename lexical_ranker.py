@@ -0,0 +1,149 @@
+import os
+import time
+import string
+from collections import Counter
+import numpy as np
+from scipy import sparse
+
+
+# Pre-ranking settings, overridable through the environment
+# Resumes sent on to the LLM stages: the best LEXICAL_TOP_K, plus any at or above LEXICAL_MIN_SCORE
+LEXICAL_TOP_K = int(os.getenv("LEXICAL_TOP_K", "100"))
+LEXICAL_MIN_SCORE = float(os.getenv("LEXICAL_MIN_SCORE")) if os.getenv("LEXICAL_MIN_SCORE") else None
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Punctuation becomes a word break, except the characters of terms such as c++, c# and node.js
+_PUNCTUATION_TABLE = str.maketrans({char: " " for char in string.punctuation if char not in "+#."})
+_STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or our that the their this to was
+    were will with you your we they he she who which what when where how all any can must should
+    may also other such into over more than years year experience etc
+""".split())
+
+
+def tokenize(text):
+    """
+    Split a text into lowercase terms in order, dropping stopwords.
+
+    Args:
+        text (str): Resume or job description text.
+
+    Returns:
+        list[str]: The terms.
+    """
+    terms = []
+    for token in (text or "").lower().translate(_PUNCTUATION_TABLE).split():
+        term = token.strip(".")
+        if term and term not in _STOPWORDS:
+            terms.append(term)
+    return terms
+
+
+def term_counts(text):
+    """
+    Count the lowercase terms of a text, dropping stopwords.
+
+    Args:
+        text (str): Resume or job description text.
+
+    Returns:
+        collections.Counter: Occurrences keyed by term.
+    """
+    # Splitting on whitespace and counting run in C; only distinct tokens are cleaned up in Python
+    raw_counts = Counter((text or "").lower().translate(_PUNCTUATION_TABLE).split())
+    counts = Counter()
+    for token, count in raw_counts.items():
+        # Sentence-final dots are not part of the term
+        term = token.strip(".")
+        if term and term not in _STOPWORDS:
+            counts[term] += count
+    return counts
+
+
+def _term_matrix(documents, vocabulary):
+    # Sparse document x term count matrix; vocabulary is filled in as new terms appear
+    rows, cols, data = [], [], []
+    for row, document in enumerate(documents):
+        counts = term_counts(document)
+        rows.extend([row] * len(counts))
+        cols.extend(vocabulary.setdefault(term, len(vocabulary)) for term in counts)
+        data.extend(counts.values())
+    return sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), (rows, cols)), shape=(len(documents), len(vocabulary))
+    )
+
+
+def bm25_scores(query, documents, k1=BM25_K1, b=BM25_B):
+    """
+    Score documents against a query with BM25 over a sparse term matrix.
+
+    Args:
+        query (str): Query text, e.g. the processed job description.
+        documents (list[str]): Texts to score.
+        k1 (float, optional): Term-frequency saturation.
+        b (float, optional): Document-length normalization.
+
+    Returns:
+        numpy.ndarray: One score per document; higher is a better match.
+    """
+    if not documents:
+        return np.zeros(0, dtype=np.float32)
+    vocabulary = {}
+    counts = _term_matrix(documents, vocabulary)
+    document_count = counts.shape[0]
+
+    lengths = np.asarray(counts.sum(axis=1)).ravel()
+    average_length = lengths.mean() or 1.0
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log1p((document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    # Saturate every stored term count in place, then weight it by the term's idf
+    row_of_entry = np.repeat(np.arange(document_count), np.diff(counts.indptr))
+    norms = k1 * (1 - b + b * lengths[row_of_entry] / average_length)
+    weights = counts.copy()
+    weights.data = (counts.data * (k1 + 1) / (counts.data + norms) * idf[counts.indices]).astype(np.float32)
+
+    # Query terms unseen in the batch cannot match and are left out
+    query_vector = np.zeros(counts.shape[1], dtype=np.float32)
+    for term, count in term_counts(query).items():
+        if term in vocabulary:
+            query_vector[vocabulary[term]] = count
+    return weights @ query_vector
+
+
+def rank_resumes(query, resumes, top_k=LEXICAL_TOP_K, min_score=LEXICAL_MIN_SCORE):
+    """
+    Rank a batch of resumes lexically and choose the ones worth sending to the LLM.
+
+    Lexical scores are BM25 scores rescaled so that the best resume in the batch gets 100.
+
+    Args:
+        query (str): The processed job description.
+        resumes (dict): Resume text keyed by name.
+        top_k (int, optional): Send at most this many best-ranked resumes; None to not cap by rank.
+        min_score (float, optional): Also send every resume with at least this lexical score.
+
+    Returns:
+        tuple: (selected, lexical_scores) where selected lists the chosen names best first and
+               lexical_scores maps every name to its 0-100 score.
+    """
+    started_at = time.perf_counter()
+    names = list(resumes)
+    scores = bm25_scores(query, [resumes[name] for name in names])
+    best = float(scores.max()) if len(scores) else 0.0
+    scaled = np.round(100 * scores / best) if best > 0 else np.zeros(len(names))
+    lexical_scores = {name: int(score) for name, score in zip(names, scaled)}
+
+    order = np.argsort(-scores, kind="stable")
+    if top_k is None and min_score is None:
+        selected = [names[index] for index in order]
+    else:
+        selected = [
+            names[index] for rank, index in enumerate(order)
+            if (top_k is not None and rank < top_k) or (min_score is not None and scaled[index] >= min_score)
+        ]
+    print(f"Lexical pre-ranking: {len(selected)} of {len(names)} resumes sent to the LLM "
+          f"({(time.perf_counter() - started_at) * 1000:.1f} ms)")
+    return selected, lexical_scores
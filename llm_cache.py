@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Cache settings, overridable through the environment
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_response_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+
+# USD price per 1M tokens as (input, output), used to estimate the savings of cache hits
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def template_version(template):
+    """
+    Return a short, stable version tag for a prompt template.
+
+    Any edit to the template text produces a new version, so cached responses
+    for the old wording are never served for the new one.
+
+    Args:
+        template (str): The prompt template text.
+
+    Returns:
+        str: The first 16 hex characters of the SHA-256 of the template.
+    """
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(template, inputs, model, temperature, max_tokens=None, response_format=None):
+    """
+    Build the content-addressed key for one LLM call.
+
+    Args:
+        template (str): The prompt template text.
+        inputs (dict): The values used to render the template.
+        model (str): The model name.
+        temperature (float): The sampling temperature.
+        max_tokens (int, optional): The completion cap; a capped answer may be cut short.
+        response_format (dict, optional): The requested output format, so a free-text answer is
+                                          never served to a caller that asked for strict JSON.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the call.
+    """
+    payload = json.dumps(
+        {
+            "template_version": template_version(template),
+            "inputs": inputs,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimate the USD cost of a call from its token usage.
+
+    Args:
+        model (str): The model name.
+        prompt_tokens (int): Number of prompt tokens.
+        completion_tokens (int): Number of completion tokens.
+
+    Returns:
+        float: Estimated cost in USD, 0.0 for unknown models.
+    """
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+
+    A small in-process LRU sits in front of a SQLite file on disk. The disk store is
+    bounded by both a TTL and a maximum number of entries, evicting the least recently
+    used rows first. Hit/miss counters and the tokens and dollars saved are kept so
+    the savings can be reported.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 ttl_seconds=LLM_CACHE_TTL_SECONDS, memory_entries=LLM_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "saved_prompt_tokens": 0,
+            "saved_completion_tokens": 0,
+            "saved_cost_usd": 0.0,
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    def _remember(self, key, entry):
+        # Insert into the in-process LRU and drop the oldest entry when it is full
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, tier, entry):
+        model, _, prompt_tokens, completion_tokens, _ = entry
+        self._stats[tier] += 1
+        self._stats["saved_prompt_tokens"] += prompt_tokens
+        self._stats["saved_completion_tokens"] += completion_tokens
+        self._stats["saved_cost_usd"] += estimate_cost(model, prompt_tokens, completion_tokens)
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Key built with `make_cache_key`.
+
+        Returns:
+            str or None: The cached response, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[4] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._record_hit("memory_hits", entry)
+                return entry[1]
+
+            row = self._conn.execute(
+                "SELECT model, response, prompt_tokens, completion_tokens, created_at "
+                "FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[4] > self.ttl_seconds:
+                self._memory.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row)
+            self._record_hit("disk_hits", row)
+            return row[1]
+
+    def set(self, key, response, model, prompt_tokens=0, completion_tokens=0):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): Key built with `make_cache_key`.
+            response (str): The model output to cache.
+            model (str): The model that produced the response.
+            prompt_tokens (int, optional): Prompt tokens the call consumed.
+            completion_tokens (int, optional): Completion tokens the call consumed.
+        """
+        now = time.time()
+        entry = (model, response, prompt_tokens, completion_tokens, now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(cache_key, model, response, prompt_tokens, completion_tokens, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, prompt_tokens, completion_tokens, now, now)
+            )
+            self._conn.commit()
+            self._remember(key, entry)
+
+            # Evict in batches so the common path stays a single insert
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= 100:
+                self._evict()
+                self._writes_since_eviction = 0
+
+    def _evict(self):
+        # Drop expired rows first, then the least recently used rows above the size bound
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM llm_cache WHERE cache_key IN (
+                SELECT cache_key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        self._conn.commit()
+
+    def evict(self):
+        """Run TTL and size eviction on the disk store immediately."""
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        """Remove every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Return hit/miss counters and estimated savings.
+
+        Returns:
+            dict: Counters for both tiers, the hit rate, the disk entry count,
+                  and the tokens and USD saved by cache hits.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["saved_cost_usd"] = round(stats["saved_cost_usd"], 6)
+        return stats
+
+
+def get_response_cache():
+    """
+    Return the process-wide response cache, or None when caching is disabled.
+
+    Returns:
+        ResponseCache or None: The shared cache instance.
+    """
+    global _response_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,231 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+# Hedging settings, overridable through the environment
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+# A duplicate is sent once a call has been running longer than this percentile of its stage
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Latency samples a stage needs before its percentile is trusted
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "1.0"))
+# Extra spend cap: hedges may add at most this share of the primary calls, with a small burst
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", "5"))
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "500"))
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percentile of a list of numbers.
+
+    Args:
+        values (list[float]): Samples.
+        percent (float): Percentile from 0 to 100.
+
+    Returns:
+        float or None: The percentile, or None without samples.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class HedgeBudget:
+    """
+    Cap hedged calls to a share of primary calls.
+
+    Every primary call earns `ratio` of a hedge, up to `burst` saved hedges, and every hedge
+    spends one. Extra spend therefore stays under `ratio` of the normal spend in the long run.
+    """
+
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._balance = burst
+        self._lock = threading.Lock()
+
+    def earn(self):
+        """Credit one primary call."""
+        with self._lock:
+            self._balance = min(self.burst, self._balance + self.ratio)
+
+    def try_spend(self):
+        """
+        Take one hedge from the budget.
+
+        Returns:
+            bool: True if a hedge may be sent.
+        """
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class StageLatency:
+    """
+    Latency samples and hedging counters for one pipeline stage.
+
+    `primary` holds how long each first request took on its own, i.e. the latency without
+    hedging. `observed` holds how long the caller actually waited, i.e. with hedging.
+    """
+
+    def __init__(self, name, window=LATENCY_WINDOW):
+        self.name = name
+        self.primary = deque(maxlen=window)
+        self.observed = deque(maxlen=window)
+        self.calls = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_denied = 0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, percent=HEDGE_PERCENTILE):
+        """
+        Return how long to wait before hedging a call of this stage.
+
+        Returns:
+            float or None: Seconds, or None while there are too few samples to hedge.
+        """
+        with self._lock:
+            if len(self.primary) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = list(self.primary)
+        return max(HEDGE_MIN_DELAY_SECONDS, percentile(samples, percent))
+
+    def record_primary(self, seconds):
+        with self._lock:
+            self.primary.append(seconds)
+
+    def record_observed(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.observed.append(seconds)
+
+    def snapshot(self):
+        """
+        Return tail latencies with and without hedging, and the hedging counters.
+
+        Returns:
+            dict: p50/p95/p99 per sample set plus hedge counts.
+        """
+        with self._lock:
+            primary, observed = list(self.primary), list(self.observed)
+            counters = {
+                "calls": self.calls,
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+                "hedges_denied": self.hedges_denied,
+            }
+
+        def tails(samples):
+            return {f"p{p}": round(percentile(samples, p), 3) if samples else None for p in (50, 95, 99)}
+
+        return {"without_hedging": tails(primary), "with_hedging": tails(observed), **counters}
+
+
+_budget = HedgeBudget()
+
+
+def get_stage_latency(stage):
+    """
+    Return the shared latency tracker of a stage.
+
+    Args:
+        stage (str): Stage name, e.g. "extract" or "score".
+
+    Returns:
+        StageLatency: The shared tracker.
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(stage)
+        if tracker is None:
+            tracker = StageLatency(stage)
+            _trackers[stage] = tracker
+        return tracker
+
+
+def latency_stats():
+    """
+    Return the latency and hedging figures of every stage.
+
+    Returns:
+        dict: Snapshots keyed by stage name.
+    """
+    with _trackers_lock:
+        trackers = list(_trackers.items())
+    return {stage: tracker.snapshot() for stage, tracker in trackers}
+
+
+async def hedged(stage, call, enabled=None):
+    """
+    Await an LLM call, sending a duplicate if it runs past the stage's latency percentile.
+
+    The first answer wins. A hedge that loses is cancelled. A primary that loses keeps running
+    in the background, so its latency is still recorded as the latency without hedging.
+
+    Args:
+        stage (str): Stage name used for latency tracking.
+        call (Callable): Zero-argument function returning a new awaitable for the call.
+        enabled (bool, optional): Overrides LLM_HEDGING_ENABLED.
+
+    Returns:
+        The result of whichever request finished first.
+    """
+    tracker = get_stage_latency(stage)
+    started_at = time.perf_counter()
+
+    def record_primary(task):
+        if not task.cancelled() and task.exception() is None:
+            tracker.record_primary(time.perf_counter() - started_at)
+
+    primary = asyncio.ensure_future(call())
+    primary.add_done_callback(record_primary)
+    _budget.earn()
+
+    delay = tracker.hedge_delay() if (LLM_HEDGING_ENABLED if enabled is None else enabled) else None
+    if delay is not None:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if not done:
+            if _budget.try_spend():
+                hedge = asyncio.ensure_future(call())
+                # Retrieve the error of a hedge that fails after losing, so it is not reported as unhandled
+                hedge.add_done_callback(lambda task: task.cancelled() or task.exception())
+                result = await _race(tracker, primary, hedge)
+                tracker.record_observed(time.perf_counter() - started_at)
+                return result
+            tracker.hedges_denied += 1
+
+    result = await primary
+    tracker.record_observed(time.perf_counter() - started_at)
+    return result
+
+
+async def _race(tracker, primary, hedge):
+    # Take the first successful answer; fall back to the other request if the first one failed
+    tracker.hedges_sent += 1
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                error = task.exception()
+                continue
+            if task is hedge:
+                tracker.hedges_won += 1
+            elif not hedge.done():
+                hedge.cancel()
+            return task.result()
+    raise error
@@ -0,0 +1,507 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from langchain_core.messages import AIMessage
+import utils
+import llm_retry
+import rate_limiter
+from prompt_registry import prompt_registry
+
+
+# Providers as "kind:model:weight" entries, overridable through the environment
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "openai:gpt-4o-mini:3,gemini:gemini-1.5-flash:1")
+# Weight of the most recent call in the moving averages of latency and error rate
+HEALTH_EWMA_ALPHA = float(os.getenv("HEALTH_EWMA_ALPHA", "0.2"))
+# A provider that just failed is only tried after the healthy ones for this long
+PROVIDER_COOLDOWN_SECONDS = float(os.getenv("PROVIDER_COOLDOWN_SECONDS", "10"))
+# Floor so a provider with a bad streak still gets the occasional call and can prove it recovered
+MIN_ROUTING_WEIGHT = 0.01
+
+# Cache key model for routed calls, so an answer from any provider is reused
+ROUTED_CACHE_MODEL = "routed"
+
+_router = None
+_router_lock = threading.Lock()
+
+
+class ProviderHealth:
+    """Moving averages of latency and error rate, plus counters, for one provider."""
+
+    def __init__(self):
+        self.latency_seconds = None
+        self.error_rate = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.failed_over = 0
+        self.last_failure_at = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency_seconds):
+        """Fold a successful call into the averages."""
+        with self._lock:
+            self.successes += 1
+            self.error_rate *= 1 - HEALTH_EWMA_ALPHA
+            if self.latency_seconds is None:
+                self.latency_seconds = latency_seconds
+            else:
+                self.latency_seconds += HEALTH_EWMA_ALPHA * (latency_seconds - self.latency_seconds)
+
+    def record_failure(self, rate_limited=False):
+        """Fold a failed call into the error rate and start the cooldown."""
+        with self._lock:
+            self.failures += 1
+            self.rate_limited += int(rate_limited)
+            self.error_rate += HEALTH_EWMA_ALPHA * (1 - self.error_rate)
+            self.last_failure_at = time.monotonic()
+
+    def cooling_down(self):
+        """Return True shortly after a failure."""
+        with self._lock:
+            return time.monotonic() - self.last_failure_at < PROVIDER_COOLDOWN_SECONDS
+
+    def snapshot(self):
+        """
+        Return the health figures.
+
+        Returns:
+            dict: Latency and error-rate averages and call counters.
+        """
+        with self._lock:
+            return {
+                "latency_seconds": round(self.latency_seconds, 3) if self.latency_seconds is not None else None,
+                "error_rate": round(self.error_rate, 3),
+                "successes": self.successes,
+                "failures": self.failures,
+                "rate_limited": self.rate_limited,
+                "failed_over": self.failed_over,
+            }
+
+
+class Provider:
+    """
+    One LLM provider and model behind a common completion interface.
+
+    Every provider goes through the shared rate limiter and circuit breaker of its model. The
+    router decides how many attempts a 429 gets: it is raised at once while another healthy
+    provider can take the call, and backed off like a direct call otherwise.
+    """
+
+    kind = ""
+    api_key_env = ""
+    # Whether the provider honours OpenAI's `response_format`; the router keeps other calls off it
+    supports_response_format = False
+
+    def __init__(self, model, weight=1.0):
+        self.model = model
+        self.weight = weight
+        self.name = f"{self.kind}:{model}"
+        self.limiter = rate_limiter.get_rate_limiter(model)
+        self.breaker = llm_retry.get_circuit_breaker(model)
+        self.health = ProviderHealth()
+
+    def available(self):
+        """Return True when the provider's API key is configured."""
+        return bool(os.getenv(self.api_key_env))
+
+    def healthy(self):
+        """Return True unless the provider is paused by a 429, its breaker is open, or it just failed."""
+        return (not self.breaker.is_open() and self.limiter.throttled_seconds() == 0
+                and not self.health.cooling_down())
+
+    def routing_weight(self):
+        """Configured weight, scaled down while the provider throttles us or fails."""
+        return max(MIN_ROUTING_WEIGHT, self.weight * self.limiter.rate_scale * (1 - self.health.error_rate))
+
+    def complete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                 rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        """
+        Run one blocking completion.
+
+        Args:
+            rate_limit_attempts (int, optional): Attempts on 429 before the error is raised; 1 raises
+                                                 at once so the router can fail over.
+
+        Returns:
+            tuple: (content, usage) with usage in OpenAI form (prompt_tokens, completion_tokens, ...).
+        """
+        raise NotImplementedError
+
+    async def acomplete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                        rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        """Async counterpart of `complete`."""
+        raise NotImplementedError
+
+    def snapshot(self):
+        """
+        Return the provider's routing state.
+
+        Returns:
+            dict: Weight, health, breaker state and remaining rate-limit pause.
+        """
+        return {
+            "weight": self.weight,
+            "routing_weight": round(self.routing_weight(), 3),
+            "healthy": self.healthy(),
+            "circuit": self.breaker.snapshot()["state"],
+            "throttled_seconds": round(self.limiter.throttled_seconds(), 2),
+            **self.health.snapshot(),
+        }
+
+
+class OpenAIProvider(Provider):
+    """OpenAI Chat Completions through the shared helpers in utils."""
+
+    kind = "openai"
+    api_key_env = "OPENAI_API_KEY"
+    supports_response_format = True
+
+    def _request(self, prompt, temperature, max_tokens, response_format):
+        request = {
+            # Read the key per call, as `available` does: scripts load .env after openai read its key at import
+            "api_key": os.getenv(self.api_key_env),
+            "messages": [{"role": "system", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_format is not None:
+            request["response_format"] = response_format
+        return request
+
+    def complete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                 rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        response = utils.create_chat_completion(
+            self.model, utils.estimate_call_tokens(prompt, max_tokens), rate_limit_attempts=rate_limit_attempts,
+            **self._request(prompt, temperature, max_tokens, response_format)
+        )
+        return response["choices"][0]["message"]["content"], response.get("usage") or {}
+
+    async def acomplete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                        rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        response = await utils.acreate_chat_completion(
+            self.model, utils.estimate_call_tokens(prompt, max_tokens), rate_limit_attempts=rate_limit_attempts,
+            **self._request(prompt, temperature, max_tokens, response_format)
+        )
+        return response["choices"][0]["message"]["content"], response.get("usage") or {}
+
+
+class GeminiProvider(Provider):
+    """
+    Google Gemini through langchain_google_genai.
+
+    Gemini has no equivalent of OpenAI's strict `response_format`, so the router only sends it
+    calls without one and it rejects the rest.
+    """
+
+    kind = "gemini"
+    api_key_env = "GOOGLE_API_KEY"
+
+    def __init__(self, model, weight=1.0):
+        super().__init__(model, weight)
+        self._clients = {}
+
+    def _client(self, temperature, max_tokens):
+        # One client per sampling setting; retries are handled here, not by the client
+        key = (temperature, max_tokens)
+        if key not in self._clients:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            self._clients[key] = ChatGoogleGenerativeAI(
+                model=self.model, temperature=temperature, max_tokens=max_tokens,
+                timeout=llm_retry.LLM_REQUEST_TIMEOUT_SECONDS, max_retries=0
+            )
+        return self._clients[key]
+
+    @staticmethod
+    def _usage(message):
+        # Translate LangChain usage metadata into the OpenAI usage shape
+        usage = getattr(message, "usage_metadata", None) or {}
+        return {
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+
+    @staticmethod
+    def _check_request(response_format):
+        if response_format is not None:
+            raise ValueError("Gemini does not support response_format")
+
+    def complete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                 rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        self._check_request(response_format)
+        client = self._client(temperature, max_tokens)
+        message = llm_retry.call_with_retry(
+            lambda: self.limiter.call(
+                lambda: client.invoke(prompt), utils.estimate_call_tokens(prompt, max_tokens),
+                max_attempts=rate_limit_attempts
+            ),
+            self.breaker
+        )
+        return message.content, self._usage(message)
+
+    async def acomplete(self, prompt, temperature=0.1, max_tokens=None, response_format=None,
+                        rate_limit_attempts=utils.RATE_LIMIT_MAX_ATTEMPTS):
+        self._check_request(response_format)
+        client = self._client(temperature, max_tokens)
+        message = await llm_retry.call_with_retry_async(
+            lambda: self.limiter.call_async(
+                lambda: asyncio.wait_for(client.ainvoke(prompt), timeout=llm_retry.LLM_REQUEST_TIMEOUT_SECONDS),
+                utils.estimate_call_tokens(prompt, max_tokens), max_attempts=rate_limit_attempts
+            ),
+            self.breaker
+        )
+        return message.content, self._usage(message)
+
+
+PROVIDER_TYPES = {provider.kind: provider for provider in (OpenAIProvider, GeminiProvider)}
+
+
+def parse_provider_spec(spec):
+    """
+    Build providers from a "kind:model:weight" list such as "openai:gpt-4o-mini:3,gemini:gemini-1.5-flash:1".
+
+    Args:
+        spec (str): Comma-separated provider entries; the weight defaults to 1.
+
+    Returns:
+        list[Provider]: The configured providers.
+    """
+    providers = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        parts = entry.split(":")
+        if parts[0] not in PROVIDER_TYPES or len(parts) < 2:
+            raise ValueError(f"Invalid LLM provider entry: {entry!r}")
+        weight = float(parts[2]) if len(parts) > 2 else 1.0
+        providers.append(PROVIDER_TYPES[parts[0]](parts[1], weight))
+    return providers
+
+
+class ProviderRouter:
+    """
+    Spread calls over several providers by weight and fail over when one misbehaves.
+
+    Healthy providers are tried in a weighted random order, so each gets a share of the traffic
+    proportional to its weight, shrunk while it throttles us or fails. A provider paused by a
+    429, with an open circuit breaker, or in its cooldown after a failure, is only tried once
+    every healthy provider has failed. A failed call moves straight on to the next provider,
+    so one provider throttling us shifts throughput to the others instead of stalling; a 429
+    is only backed off when no other healthy provider is left to take the call. Calls with a
+    `response_format` only go to providers that support it.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+
+    def candidates(self, response_format=None):
+        """
+        Return the available providers in the order they should be tried for the next call.
+
+        Args:
+            response_format (dict, optional): The call's response format; providers without support are left out.
+
+        Returns:
+            list[Provider]: Healthy providers in weighted random order, then the rest.
+        """
+        available = [provider for provider in self.providers if provider.available()
+                     and (response_format is None or provider.supports_response_format)]
+        healthy = [provider for provider in available if provider.healthy()]
+        # Weighted sampling without replacement: sort by u ** (1 / weight)
+        healthy.sort(key=lambda provider: random.random() ** (1 / provider.routing_weight()), reverse=True)
+        unhealthy = sorted(
+            (provider for provider in available if provider not in healthy),
+            key=lambda provider: provider.limiter.throttled_seconds()
+        )
+        return healthy + unhealthy
+
+    def _record_failure(self, provider, error):
+        rate_limited = rate_limiter.is_rate_limit_error(error)
+        provider.health.record_failure(rate_limited=rate_limited)
+        print(f"LLM provider {provider.name} failed ({type(error).__name__}: {error}); failing over")
+
+    @staticmethod
+    def _rate_limit_attempts(candidates, position):
+        # Fail over on the first 429 while a later healthy provider can take the call, else back off
+        if any(provider.healthy() for provider in candidates[position + 1:]):
+            return 1
+        return utils.RATE_LIMIT_MAX_ATTEMPTS
+
+    def complete(self, prompt, **kwargs):
+        """
+        Run a blocking completion on the first provider that succeeds.
+
+        Args:
+            prompt (str): The rendered prompt.
+            **kwargs: temperature, max_tokens and response_format.
+
+        Returns:
+            tuple: (provider, content, usage).
+
+        Raises:
+            RuntimeError: If no provider is configured with an API key, or none supports the response format.
+            Exception: The last provider's error when every provider failed.
+        """
+        last_error = None
+        candidates = self.candidates(kwargs.get("response_format"))
+        for position, provider in enumerate(candidates):
+            if last_error is not None:
+                provider.health.failed_over += 1
+            started_at = time.perf_counter()
+            try:
+                content, usage = provider.complete(
+                    prompt, rate_limit_attempts=self._rate_limit_attempts(candidates, position), **kwargs
+                )
+            except Exception as e:
+                self._record_failure(provider, e)
+                last_error = e
+                continue
+            provider.health.record_success(time.perf_counter() - started_at)
+            return provider, content, usage
+        raise last_error or RuntimeError("No configured LLM provider supports this request")
+
+    async def acomplete(self, prompt, **kwargs):
+        """Async counterpart of `complete`."""
+        last_error = None
+        candidates = self.candidates(kwargs.get("response_format"))
+        for position, provider in enumerate(candidates):
+            if last_error is not None:
+                provider.health.failed_over += 1
+            started_at = time.perf_counter()
+            try:
+                content, usage = await provider.acomplete(
+                    prompt, rate_limit_attempts=self._rate_limit_attempts(candidates, position), **kwargs
+                )
+            except Exception as e:
+                self._record_failure(provider, e)
+                last_error = e
+                continue
+            provider.health.record_success(time.perf_counter() - started_at)
+            return provider, content, usage
+        raise last_error or RuntimeError("No configured LLM provider supports this request")
+
+    def stats(self):
+        """
+        Return the routing state of every provider.
+
+        Returns:
+            dict: Snapshots keyed by provider name, with an "available" flag.
+        """
+        return {
+            provider.name: {"available": provider.available(), **provider.snapshot()}
+            for provider in self.providers
+        }
+
+
+def get_router():
+    """
+    Return the shared router built from LLM_PROVIDERS.
+
+    Returns:
+        ProviderRouter: The shared router.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter(parse_provider_spec(LLM_PROVIDERS))
+        return _router
+
+
+class RoutedConversation:
+    """
+    A prompt template bound to the shared router.
+
+    Call it like the OpenAI conversations in utils (`conversation(inputs)` returns the text),
+    await `acall(inputs)` from async code, or use `invoke(inputs)` where a LangChain chain was
+    used before; it returns a message with `.content`.
+
+    With `with_usage`, calls return (content, usage) instead, where usage is the billed token
+    usage plus the "model" that answered, or None for a cache hit.
+    """
+
+    def __init__(self, template, temperature=0.1, max_tokens=None, use_cache=True,
+                 response_format=None, validate=None, router=None, with_usage=False):
+        self.template = template
+        self.compiled_prompt = prompt_registry.get(template)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.use_cache = use_cache
+        self.response_format = response_format
+        self.validate = validate
+        self.router = router or get_router()
+        self.with_usage = with_usage
+
+    def _request(self):
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens,
+                "response_format": self.response_format}
+
+    def _check(self, content, usage):
+        # Record usage and validate a fresh answer before it is cached
+        response = {"usage": usage}
+        self.compiled_prompt.record_usage(response)
+        if self.validate is not None:
+            self.validate(content)
+        return response
+
+    def _result(self, content, provider=None, usage=None):
+        if not self.with_usage:
+            return content
+        return content, ({**usage, "model": provider.model} if provider is not None else None)
+
+    def _cache_args(self, inputs):
+        return (self.use_cache, self.template, inputs, ROUTED_CACHE_MODEL, self.temperature, self.max_tokens,
+                self.response_format)
+
+    def __call__(self, inputs):
+        cache, cache_key, cached = utils.cache_lookup(*self._cache_args(inputs))
+        if cached is not None:
+            return self._result(cached)
+        provider, content, usage = self.router.complete(self.compiled_prompt.format(**inputs), **self._request())
+        utils.cache_store(cache, cache_key, content, provider.model, self._check(content, usage))
+        return self._result(content, provider, usage)
+
+    async def acall(self, inputs):
+        """Async counterpart of calling the conversation."""
+        cache, cache_key, cached = await utils.cache_lookup_async(*self._cache_args(inputs))
+        if cached is not None:
+            return self._result(cached)
+        provider, content, usage = await self.router.acomplete(
+            self.compiled_prompt.format(**inputs), **self._request()
+        )
+        await utils.cache_store_async(cache, cache_key, content, provider.model, self._check(content, usage))
+        return self._result(content, provider, usage)
+
+    def invoke(self, inputs):
+        """LangChain-style call returning a message with `.content`."""
+        content = self(inputs)
+        return AIMessage(content=content[0] if self.with_usage else content)
+
+
+def get_conversation(template, **kwargs):
+    """
+    Create a blocking conversation routed over the configured providers.
+
+    Args:
+        template (str): The prompt template.
+        **kwargs: See RoutedConversation.
+
+    Returns:
+        RoutedConversation: Callable conversation with `invoke` and `acall`.
+    """
+    return RoutedConversation(template, **kwargs)
+
+
+def get_conversation_async(template, **kwargs):
+    """
+    Create an async conversation routed over the configured providers.
+
+    This is a drop-in for utils.get_conversation_openai_async.
+
+    Args:
+        template (str): The prompt template.
+        **kwargs: See RoutedConversation.
+
+    Returns:
+        function: A coroutine function that takes a dictionary of inputs and returns the response text.
+    """
+    return RoutedConversation(template, **kwargs).acall
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+
+# Retry and circuit breaker settings, overridable through the environment
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+
+# Transient failures worth retrying. Rate limits (429) are retried by the rate limiter instead.
+RETRYABLE_ERROR_NAMES = {
+    "Timeout", "TimeoutError", "APIError", "APIConnectionError", "ServiceUnavailableError",
+    "TryAgain", "InternalServerError", "ServiceUnavailable", "DeadlineExceeded",
+    "ClientConnectionError", "ServerDisconnectedError",
+}
+RETRYABLE_STATUS_CODES = {408, 500, 502, 503, 504}
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+def is_retryable_error(error):
+    """
+    Check whether an LLM call failed for a transient reason worth retrying.
+
+    Args:
+        error (Exception): The raised exception.
+
+    Returns:
+        bool: True for timeouts, connection errors and 5xx responses.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = getattr(error, "http_status", None) or getattr(error, "code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    if isinstance(status, int) and 400 <= status < 500:
+        return False
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt, base=LLM_BACKOFF_BASE_SECONDS, maximum=LLM_BACKOFF_MAX_SECONDS):
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Zero-based number of the attempt that just failed.
+        base (float, optional): Delay cap for the first retry, in seconds.
+        maximum (float, optional): Upper bound for any delay, in seconds.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a provider is down.
+
+    After `failure_threshold` consecutive transient failures the breaker opens and every
+    call is rejected with CircuitOpenError for `recovery_timeout` seconds. It then lets a
+    single trial call through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, recovery_timeout=CIRCUIT_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Reject the call if the breaker is open.
+
+        Raises:
+            CircuitOpenError: While the provider is considered down.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    raise CircuitOpenError(f"Circuit for {self.name} is open; failing fast")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open; trial call in flight")
+                self._trial_in_flight = True
+
+    def is_open(self):
+        """
+        Check, without changing state, whether calls are currently being rejected.
+
+        Returns:
+            bool: True while the breaker is open and its recovery timeout has not passed.
+        """
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.recovery_timeout
+
+    def record_success(self):
+        """Close the breaker after a successful call."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another half-open trial through after one ended with neither success nor failure, e.g. cancelled."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a transient failure and open the breaker once the threshold is reached."""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        """
+        Return the breaker state.
+
+        Returns:
+            dict: State and consecutive failure count.
+        """
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures}
+
+
+def get_circuit_breaker(name):
+    """
+    Return the shared circuit breaker for a provider/model.
+
+    Args:
+        name (str): Breaker name, usually the model name.
+
+    Returns:
+        CircuitBreaker: The shared breaker.
+    """
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _circuit_breakers[name] = breaker
+        return breaker
+
+
+def circuit_breaker_stats():
+    """
+    Return the state of every shared circuit breaker.
+
+    Returns:
+        dict: Snapshots keyed by breaker name.
+    """
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.items())
+    return {name: breaker.snapshot() for name, breaker in breakers}
+
+
+def _settle_failure(breaker, error, attempt, max_attempts):
+    # Record the failure and decide whether another attempt is allowed
+    retryable = is_retryable_error(error)
+    if retryable:
+        breaker.record_failure()
+    else:
+        # The provider answered; the failure is about this request, not the provider's health
+        breaker.record_success()
+    return retryable and attempt < max_attempts - 1
+
+
+def call_with_retry(func, breaker, max_attempts=LLM_MAX_ATTEMPTS):
+    """
+    Run a blocking LLM call with bounded, jittered exponential-backoff retries.
+
+    Args:
+        func (Callable): Zero-argument function performing the call.
+        breaker (CircuitBreaker): Breaker guarding the provider.
+        max_attempts (int, optional): Total attempts, including the first one.
+
+    Returns:
+        The value returned by `func`.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+        Exception: The last error once retries are exhausted or for non-retryable errors.
+    """
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            if not _settle_failure(breaker, e, attempt, max_attempts):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # Interrupted: the provider's health is unknown, but a half-open trial must not stay taken
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def call_with_retry_async(func, breaker, max_attempts=LLM_MAX_ATTEMPTS, timeout=None):
+    """
+    Async counterpart of `call_with_retry`, with an optional hard per-attempt timeout.
+
+    Args:
+        func (Callable): Zero-argument function returning the awaitable call.
+        breaker (CircuitBreaker): Breaker guarding the provider.
+        max_attempts (int, optional): Total attempts, including the first one.
+        timeout (float, optional): Seconds allowed per attempt. Defaults to None (no limit).
+
+    Returns:
+        The awaited result of `func()`.
+    """
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            result = await asyncio.wait_for(func(), timeout=timeout)
+        except Exception as e:
+            if not _settle_failure(breaker, e, attempt, max_attempts):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelled, e.g. a losing hedge: the provider's health is unknown, but a half-open
+            # trial must not stay taken or every later call would be rejected
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
@@ -0,0 +1,238 @@
+import os
+import threading
+import utils
+import llm_cache
+import llm_hedging
+import llm_providers
+import resume_compaction
+from prompt_registry import prompt_registry
+
+
+# Cascade settings, overridable through the environment
+# Providers of the cheap first pass, as "kind:model:weight" entries (see llm_providers.LLM_PROVIDERS).
+# Escalations use the regular scoring providers, so the cheap pass only pays off on a cheaper model.
+CASCADE_CHEAP_PROVIDERS = os.getenv("CASCADE_CHEAP_PROVIDERS", "openai:gpt-4o-mini:1")
+# Shortlist cutoff on the 0-100 scale; quick scores within the band around it are re-scored
+CASCADE_CUTOFF_SCORE = int(os.getenv("CASCADE_CUTOFF_SCORE", "70"))
+CASCADE_BAND_POINTS = int(os.getenv("CASCADE_BAND_POINTS", "15"))
+
+_COUNTERS = ["resumes", "escalated", "quick_failed", "strong_failed", "cached_calls",
+             "cost_usd", "default_cost_usd", "strong_calls", "strong_completion_tokens"]
+
+_totals = dict.fromkeys(_COUNTERS, 0)
+_totals_lock = threading.Lock()
+
+_cheap_router = None
+_cheap_router_lock = threading.Lock()
+
+
+def get_cheap_router():
+    """
+    Return the shared router of the cheap first pass, built from CASCADE_CHEAP_PROVIDERS.
+
+    Returns:
+        llm_providers.ProviderRouter: The shared router.
+    """
+    global _cheap_router
+    with _cheap_router_lock:
+        if _cheap_router is None:
+            _cheap_router = llm_providers.ProviderRouter(llm_providers.parse_provider_spec(CASCADE_CHEAP_PROVIDERS))
+        return _cheap_router
+
+
+def _primary_model(router):
+    # The model that takes most of a router's traffic
+    return max(router.providers, key=lambda provider: provider.weight).model
+
+
+def _usage_cost(usage):
+    # Price a billed call from the token usage and model the router reported
+    return llm_cache.estimate_cost(usage["model"], usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+
+def _estimate_call_cost(model, template_name, inputs, completion_tokens):
+    # Price a call that was not sent from its rendered prompt and an expected completion size
+    prompt = prompt_registry.get(template_name).format(**inputs)
+    return llm_cache.estimate_cost(model, resume_compaction.count_tokens(prompt), completion_tokens)
+
+
+def _report(counters):
+    # Escalation and savings figures from raw counters; savings are negative when the cascade costs more
+    resumes = counters["resumes"]
+    savings = counters["default_cost_usd"] - counters["cost_usd"]
+    return {
+        "resumes": resumes,
+        "escalated": counters["escalated"],
+        "escalation_rate": round(counters["escalated"] / resumes, 4) if resumes else 0.0,
+        "strong_calls_avoided": resumes - counters["escalated"],
+        "quick_failed": counters["quick_failed"],
+        "strong_failed": counters["strong_failed"],
+        "cached_calls": counters["cached_calls"],
+        "cost_usd": round(counters["cost_usd"], 6),
+        "estimated_default_cost_usd": round(counters["default_cost_usd"], 6),
+        "estimated_savings_usd": round(savings, 6),
+        "savings_ratio": round(savings / counters["default_cost_usd"], 4) if counters["default_cost_usd"] else 0.0,
+    }
+
+
+def cascade_stats():
+    """
+    Return the escalation and savings totals of every cascade run by this process.
+
+    Returns:
+        dict: Counters, billed cost and estimated savings against the regular scoring path.
+    """
+    with _totals_lock:
+        return _report(_totals)
+
+
+class ModelCascade:
+    """
+    Score resumes with a cheap first pass and escalate only the borderline ones.
+
+    Every resume gets a quick overall score from the cheap providers. Resumes whose quick score
+    lands within `band` points of the shortlist `cutoff`, or whose quick score could not be read,
+    are scored again exactly as without the cascade: the full rubric on the regular scoring
+    providers. Clear matches and clear misses keep their quick score. Both passes go through the
+    provider router and request hedging, like every other scoring call.
+
+    The cascade's cost is priced from the token usage of the calls it actually sent; answers
+    served from the response cache cost nothing. It is compared with an estimate of the regular
+    scoring path, which scores every resume with the full rubric: escalated resumes count their
+    real call, the others their rendered prompt plus the average completion size of the
+    escalations seen so far (the completion cap until there is one), priced at the regular
+    path's primary model. A resume whose quick score came from the cache is assumed to have a
+    cached regular score too, and adds nothing to either side.
+    """
+
+    def __init__(self, cheap_router=None, strong_router=None,
+                 cutoff=CASCADE_CUTOFF_SCORE, band=CASCADE_BAND_POINTS):
+        cheap_router = cheap_router or get_cheap_router()
+        strong_router = strong_router or llm_providers.get_router()
+        self.cheap_model = _primary_model(cheap_router)
+        self.strong_model = _primary_model(strong_router)
+        self.cutoff = cutoff
+        self.band = band
+        self._quick = llm_providers.get_conversation_async(
+            utils.TEMPLATES["score_quick"], max_tokens=utils.QUICK_SCORE_MAX_TOKENS,
+            response_format=utils.QUICK_SCORE_RESPONSE_FORMAT, validate=utils.parse_quick_score_output,
+            router=cheap_router, with_usage=True
+        )
+        # The same request as the regular scoring stage, so escalations share its cached answers
+        self._strong = llm_providers.get_conversation_async(
+            utils.TEMPLATES["score_json"], max_tokens=utils.SCORE_MAX_TOKENS,
+            response_format=utils.SCORE_RESPONSE_FORMAT, validate=utils.parse_score_output,
+            router=strong_router, with_usage=True
+        )
+        self._counters = dict.fromkeys(_COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def is_borderline(self, score):
+        """
+        Tell whether a quick score is too close to the cutoff to trust.
+
+        Args:
+            score (int): Quick score from 0 to 100.
+
+        Returns:
+            bool: True if the resume should be escalated.
+        """
+        return abs(score - self.cutoff) <= self.band
+
+    async def _call(self, stage, conversation, parse, inputs):
+        # Re-request malformed output; malformed responses are never cached.
+        # Returns (result, usage) where usage is None for a cache hit or a failed call
+        for attempt in range(utils.SCORE_PARSE_ATTEMPTS):
+            try:
+                content, usage = await llm_hedging.hedged(stage, lambda: conversation(inputs))
+                return parse(content), usage
+            except ValueError as e:
+                print(f"Malformed cascade output (attempt {attempt + 1}): {e}")
+        return None, None
+
+    def _expected_strong_completion_tokens(self):
+        # Average completion size of the strong calls so far, or the cap before the first one
+        with self._lock:
+            if self._counters["strong_calls"]:
+                return self._counters["strong_completion_tokens"] / self._counters["strong_calls"]
+        return utils.SCORE_MAX_TOKENS
+
+    async def score(self, name, key_aspect, job_description):
+        """
+        Score one resume through the cascade.
+
+        Args:
+            name (str): Name of the resume, for logging.
+            key_aspect (str): Key aspects extracted from the resume.
+            job_description (str): Processed job description.
+
+        Returns:
+            tuple: (scores, escalated) where scores holds "total" and, for escalated resumes,
+                   the marks of each rubric section; scores is None if both passes failed.
+        """
+        inputs = {"resume_text": key_aspect, "job_description": job_description}
+        try:
+            quick_score, quick_usage = await self._call("score_quick", self._quick, utils.parse_quick_score_output, inputs)
+        except Exception as e:
+            print(f"Error in quick scoring for {name}: {e}")
+            quick_score, quick_usage = None, None
+        quick_cached = quick_score is not None and quick_usage is None
+        cost = _usage_cost(quick_usage) if quick_usage else 0.0
+
+        escalated = quick_score is None or self.is_borderline(quick_score)
+        scores = {"total": quick_score} if quick_score is not None else None
+        strong_failed = False
+        strong_usage = None
+        strong_cached = False
+        if escalated:
+            print(f"Escalating {name} to {self.strong_model} (quick score {quick_score})")
+            try:
+                strong_scores, strong_usage = await self._call("score", self._strong, utils.parse_score_output, inputs)
+            except Exception as e:
+                print(f"Error in strong scoring for {name}: {e}")
+                strong_scores = None
+            # Keep the quick score when the strong model cannot score the resume either
+            strong_failed = strong_scores is None
+            strong_cached = strong_scores is not None and strong_usage is None
+            scores = strong_scores or scores
+
+        # What the regular scoring path would have paid for this resume
+        if strong_usage:
+            default_cost = _usage_cost(strong_usage)
+            cost += default_cost
+        elif strong_cached or (quick_cached and not escalated):
+            default_cost = 0.0
+        else:
+            default_cost = _estimate_call_cost(self.strong_model, "score_json", inputs,
+                                               self._expected_strong_completion_tokens())
+
+        self._record({
+            "resumes": 1,
+            "escalated": int(escalated),
+            "quick_failed": int(quick_score is None),
+            "strong_failed": int(strong_failed),
+            "cached_calls": int(quick_cached) + int(strong_cached),
+            "cost_usd": cost,
+            "default_cost_usd": default_cost,
+            "strong_calls": int(bool(strong_usage)),
+            "strong_completion_tokens": strong_usage.get("completion_tokens", 0) if strong_usage else 0,
+        })
+        return scores, escalated
+
+    def _record(self, deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._counters[key] += value
+        with _totals_lock:
+            for key, value in deltas.items():
+                _totals[key] += value
+
+    def stats(self):
+        """
+        Return the escalation and savings figures of this cascade.
+
+        Returns:
+            dict: Counters, billed cost and estimated savings against the regular scoring path.
+        """
+        with self._lock:
+            return _report(self._counters)
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, File, UploadFile
 from io import BytesIO
 import os
-import time
 from typing import List
 from PyPDF2 import PdfReader
 from docx import Document
@@ -20,13 +19,11 @@ import PyPDF2
 import pandas as pd
 import docx
 import win32com.client as win32
-import time
 import tkinter as tk
 from tkinter import filedialog
 from dotenv import load_dotenv
 import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+import llm_providers
 from datetime import datetime
 
 # Load API Key
@@ -205,17 +202,10 @@ app = FastAPI()
 
 def get_conversation(template: str):
     """
-    Initializes a conversation using a template and LangChain's LLM integration.
+    Initializes a conversation for a template, routed over the configured LLM providers.
     """
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.1,
-        max_tokens=None,
-        timeout=None,
-        max_retries=3
-    )
-    prompt = PromptTemplate.from_template(template)
-    return prompt | llm
+    # Weighted OpenAI/Gemini routing with failover, see llm_providers.LLM_PROVIDERS
+    return llm_providers.get_conversation(template)
 
 def read_pdf(file: BytesIO) -> str:
     """Extract text from a PDF file."""
@@ -308,16 +298,12 @@ async def score_resumes(response_data: dict, job_description: str) -> dict:
 
     for filename, file_data in response_data.items():
         resume_response = conversation_resume.invoke({"resume_text": file_data["content"]})
-        time.sleep(3)  # Introducing delay to avoid rate limiting
-
         file_data["key_feature"] = resume_response.content
 
         score_response = conversation_score.invoke({
             "resume_text": resume_response.content,
             "job_description": job_description
         })
-        time.sleep(3)  # Introducing delay to avoid rate limiting
-
         file_data["score"] = score_response.content
         print(f"{filename}: {score_response.content}")
 
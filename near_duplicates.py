@@ -0,0 +1,140 @@
+import os
+import zlib
+import hashlib
+import numpy as np
+import lexical_ranker
+
+
+# Near-duplicate settings, overridable through the environment
+# Estimated Jaccard similarity of word shingles from which two resumes count as the same
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+SHINGLE_SIZE = int(os.getenv("SHINGLE_SIZE", "5"))
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a band, pairs below ~0.4 rarely do
+LSH_BANDS = 16
+LSH_ROWS = 8
+MINHASH_PERMUTATIONS = LSH_BANDS * LSH_ROWS
+
+# Universal hashing (a * x + b) mod p with the Mersenne prime 2^31 - 1 keeps products inside 64 bits
+_PRIME = np.uint64((1 << 31) - 1)
+_generator = np.random.default_rng(20240101)
+_A = _generator.integers(1, int(_PRIME), MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _generator.integers(0, int(_PRIME), MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Return the distinct word shingles of a text.
+
+    Args:
+        text (str): Resume text.
+        size (int, optional): Words per shingle.
+
+    Returns:
+        set[str]: Shingles; a text shorter than `size` words is one shingle.
+    """
+    terms = lexical_ranker.tokenize(text)
+    if len(terms) < size:
+        return {" ".join(terms)} if terms else set()
+    return {" ".join(terms[index:index + size]) for index in range(len(terms) - size + 1)}
+
+
+def minhash_signature(text):
+    """
+    Compute the MinHash signature of a text.
+
+    Args:
+        text (str): Resume text.
+
+    Returns:
+        numpy.ndarray or None: MINHASH_PERMUTATIONS uint32 values, or None for a text without words.
+    """
+    text_shingles = shingles(text)
+    if not text_shingles:
+        return None
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in text_shingles),
+                         dtype=np.uint64, count=len(text_shingles)) % _PRIME
+    # One row per permutation, one column per shingle; keep the minimum of each row
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(first, second):
+    """
+    Estimate the Jaccard similarity of two texts from their signatures.
+
+    Returns:
+        float: Share of equal signature values, from 0 to 1.
+    """
+    return float(np.mean(first == second))
+
+
+def band_keys(signature):
+    """
+    Return the LSH bucket of each band of a signature.
+
+    Args:
+        signature (numpy.ndarray): MinHash signature.
+
+    Returns:
+        list[tuple]: (band, bucket) pairs; buckets are signed 64-bit ints so they fit a BIGINT column,
+                     and include the band so equal rows in different bands do not collide.
+    """
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = bytes([band]) + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "big", signed=True)
+        keys.append((band, bucket))
+    return keys
+
+
+class DuplicateGrouper:
+    """
+    Group near-duplicate resumes of one upload as they arrive.
+
+    The first resume of a group is its representative; later resumes whose estimated
+    similarity to it reaches the threshold join the group instead of being scored again.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = {}
+        self._signatures = {}
+        self.groups = {}
+
+    def add(self, name, signature):
+        """
+        Add a resume and return the representative it duplicates, if any.
+
+        Args:
+            name (str): Name of the resume.
+            signature (numpy.ndarray): Its MinHash signature.
+
+        Returns:
+            str or None: Name of the representative, or None if the resume starts a new group.
+        """
+        keys = band_keys(signature)
+        candidates = {representative for key in keys for representative in self._buckets.get(key, ())}
+        best, best_similarity = None, self.threshold
+        for representative in candidates:
+            candidate_similarity = similarity(signature, self._signatures[representative])
+            if candidate_similarity >= best_similarity:
+                best, best_similarity = representative, candidate_similarity
+        if best is not None:
+            self.groups[best].append(name)
+            return best
+
+        self._signatures[name] = signature
+        self.groups[name] = [name]
+        for key in keys:
+            self._buckets.setdefault(key, []).append(name)
+        return None
+
+    def stats(self):
+        """
+        Return how many resumes were grouped as near-duplicates.
+
+        Returns:
+            dict: Resumes seen, groups, and duplicates that were not scored again.
+        """
+        resumes = sum(len(members) for members in self.groups.values())
+        return {"resumes": resumes, "groups": len(self.groups), "duplicates": resumes - len(self.groups)}
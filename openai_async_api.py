@@ -214,6 +214,9 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
 
     """
  
+    # Parse the template once instead of on every call
+    prompt_template = PromptTemplate.from_template(template)
+
     # Define a nested function to handle API interaction
     def call_openai_model(inputs):
         """
@@ -226,7 +229,7 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
             str: The content of the response generated by the OpenAI model.
         """
         # Generate the prompt by formatting the template with the provided inputs
-        prompt = PromptTemplate.from_template(template).format(**inputs)
+        prompt = prompt_template.format(**inputs)
         # Call the OpenAI Chat API to generate a response
         response = openai.ChatCompletion.create(
             model=model,
@@ -34,6 +34,7 @@ import tkinter as tk
 from tkinter import filedialog
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
+import rate_limiter
 from datetime import datetime
 
 
@@ -353,17 +354,24 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
     Returns:
         Callable: Configured conversation object.
     """
+    # Parse the template once instead of on every call
+    prompt_template = PromptTemplate.from_template(template)
+
     # Initialize the OpenAI model
     def call_openai_model(inputs):
         """
         Invokes the OpenAI model using the provided inputs.
         """
-        prompt = PromptTemplate.from_template(template).format(**inputs)
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[{"role": "system", "content": prompt}],
-            temperature=temperature,
-            max_tokens=max_tokens
+        prompt = prompt_template.format(**inputs)
+        # Call the OpenAI Chat API, waiting on the shared rate-limit budget for the model
+        response = rate_limiter.get_rate_limiter(model).call(
+            lambda: openai.ChatCompletion.create(
+                model=model,
+                messages=[{"role": "system", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            rate_limiter.estimate_tokens(prompt) + (max_tokens or rate_limiter.DEFAULT_COMPLETION_TOKENS)
         )
         return response["choices"][0]["message"]["content"]
     
@@ -518,8 +526,6 @@ def process_resumes(resume_df, job_description):
         resume_response = conversation_resume({"resume_text": resume_text})
         resume_df.loc[i, "resume_key_aspect"] = resume_response
         
-        # time.sleep(3)  # Avoid API rate limits
-        
         # Score resume
         score_response = conversation_score({
             "resume_text": resume_text,
@@ -529,7 +535,6 @@ def process_resumes(resume_df, job_description):
 
         print(f"{i+1}. Working on - ",resume_df["resume_file_name"][i])
 
-        # time.sleep(3)  # Avoid API rate limits
     return resume_df
 
 def save_results(resume_df):
@@ -0,0 +1,268 @@
+import io
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import utils
+
+
+# Parsing pool settings, overridable through the environment
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "60"))
+# Workers are replaced after this many files, releasing memory held by the parsers
+PARSE_MAX_TASKS_PER_CHILD = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "50"))
+
+# Extensions with a text reader
+PARSED_EXTENSIONS = ("pdf", "docx", "doc", "txt")
+_READERS = {"pdf": utils.read_pdf, "docx": utils.read_docx, "txt": utils.read_txt}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _read(extension, file):
+    # read_doc also returns the (unused) blob data
+    if extension == "doc":
+        text, _ = utils.read_doc(file)
+        return text
+    return _READERS[extension](file)
+
+
+def read_document(file_path):
+    """
+    Extract the text of a resume file with the reader for its extension. Runs in a pool worker.
+
+    Args:
+        file_path (str): Path of a .pdf, .docx, .doc or .txt file.
+
+    Returns:
+        str or None: The cleaned text, or None for unsupported extensions.
+    """
+    extension = file_path.rsplit(".", 1)[-1].lower()
+    if extension not in PARSED_EXTENSIONS:
+        return None
+    with open(file_path, "rb") as file:
+        return _read(extension, file)
+
+
+def read_document_bytes(file_name, data, token_budget=None):
+    """
+    Extract the text of a resume from its bytes, with the extractor for its extension. Runs in a pool worker.
+
+    The bytes reach the worker through the pool's pipe, so the file never touches the disk.
+
+    Args:
+        file_name (str): Name of a .pdf, .docx, .doc or .txt file; only its extension is used.
+        data (bytes): Contents of the file.
+        token_budget (int, optional): Also compact a copy of the text to this many tokens for the LLM.
+
+    Returns:
+        dict or None: The full text, the LLM text and the compaction report, as returned by
+                      utils.prepare_resume_text, or None for unsupported extensions.
+    """
+    extension = file_name.rsplit(".", 1)[-1].lower()
+    if extension not in PARSED_EXTENSIONS:
+        return None
+    try:
+        raw_text = utils.TEXT_EXTRACTORS[extension](io.BytesIO(data))
+    except Exception as e:
+        # Like read_doc and read_txt, keep unreadable DOC and TXT files as their error message
+        if extension == "doc":
+            raw_text = f"Error reading DOC file: {str(e)}"
+        elif extension == "txt":
+            raw_text = f"Error processing TXT file: {str(e)}"
+        else:
+            raise
+    return utils.prepare_resume_text(raw_text, token_budget)
+
+
+class ParsePool:
+    """
+    Process pool that parses resume files off the event loop.
+
+    PDF and DOCX extraction is CPU-bound Python, so it runs in separate processes: files of one
+    upload and of concurrent uploads parse in parallel on every core while the event loop keeps
+    serving requests. Files wait their turn on the event loop, so no more files are handed to
+    the pool than it has workers and the timeout covers parsing rather than queueing. A file
+    that parses longer than `timeout` fails with TimeoutError; its worker cannot be interrupted,
+    so the pool is replaced and the stuck processes are killed. Other files that were running in
+    the replaced pool are retried once in the new one.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS, timeout=PARSE_TIMEOUT_SECONDS,
+                 max_tasks_per_child=PARSE_MAX_TASKS_PER_CHILD):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Worker recycling needs fresh interpreters rather than forked copies of the server
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._executor
+
+    def _restart(self, executor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        # The executor has no public way to stop a running task; kill its workers instead
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def slot(self):
+        """
+        Return the semaphore that admits one file per worker.
+
+        Hold it around `run_in_slot` to prepare a call's arguments only once a worker is free.
+
+        Returns:
+            asyncio.Semaphore: The pool's slots.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    async def run(self, func, *args):
+        """
+        Run a picklable function in the pool.
+
+        Args:
+            func (Callable): Module-level function to run.
+            *args: Its arguments.
+
+        Returns:
+            The function's result.
+
+        Raises:
+            TimeoutError: If the call runs longer than the pool timeout.
+        """
+        async with self.slot():
+            return await self.run_in_slot(func, *args)
+
+    async def run_in_slot(self, func, *args):
+        """Run a picklable function in the pool while the caller holds a slot; see `run`."""
+        loop = asyncio.get_running_loop()
+        self.tasks += 1
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._restart(executor)
+                raise TimeoutError(f"Parsing took longer than {self.timeout:g} s")
+            except BrokenProcessPool:
+                # Killed along with a stuck neighbour, or the worker crashed; try once more
+                self._restart(executor)
+                if attempt:
+                    raise
+
+    def shutdown(self):
+        """Stop the worker processes. Call this once when the application shuts down."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """
+        Return the pool size and its task, timeout and restart counters.
+
+        Returns:
+            dict: Pool settings and counters.
+        """
+        return {
+            "workers": self.workers,
+            "timeout_seconds": self.timeout,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "tasks": self.tasks,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+
+def get_parse_pool():
+    """
+    Return the shared parsing pool, shared by every request of the process.
+
+    Returns:
+        ParsePool: The shared pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+        return _pool
+
+
+async def parse_file(file_path):
+    """
+    Extract the text of a resume file in the shared parsing pool.
+
+    Args:
+        file_path (str): Path of a .pdf, .docx, .doc or .txt file.
+
+    Returns:
+        str or None: The cleaned text, or None for unsupported extensions.
+    """
+    return await get_parse_pool().run(read_document, file_path)
+
+
+async def parse_bytes(file_name, data, token_budget=None):
+    """
+    Extract the text of an in-memory resume file in the shared parsing pool.
+
+    Args:
+        file_name (str): Name of a .pdf, .docx, .doc or .txt file.
+        data (bytes): Contents of the file.
+        token_budget (int, optional): Also compact a copy of the text to this many tokens for the LLM.
+
+    Returns:
+        dict or None: The full text, the LLM text and the compaction report, or None for
+                      unsupported extensions; see read_document_bytes.
+    """
+    return await get_parse_pool().run(read_document_bytes, file_name, data, token_budget)
+
+
+async def parse_buffer(file_name, buffer, token_budget=None):
+    """
+    Extract the text of a buffered resume file in the shared parsing pool.
+
+    The bytes are only read from the buffer once a worker is free, so files waiting their turn
+    hold no copy of their content.
+
+    Args:
+        file_name (str): Name of a .pdf, .docx, .doc or .txt file.
+        buffer (upload_buffers.UploadBuffer): Buffer holding the file.
+        token_budget (int, optional): Also compact a copy of the text to this many tokens for the LLM.
+
+    Returns:
+        dict or None: See parse_bytes.
+    """
+    pool = get_parse_pool()
+    async with pool.slot():
+        return await pool.run_in_slot(read_document_bytes, file_name, buffer.getvalue(), token_budget)
+
+
+def shutdown():
+    """Stop the shared parsing pool, if it was started."""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,141 @@
+import os
+from PyPDF2 import PdfReader
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+except ImportError:
+    extract_pages = None
+
+
+# PDF extraction settings, overridable through the environment
+# "pypdf2" (default), "pypdfium2" or "pdfminer"; an engine that is not installed falls back to PyPDF2
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pypdf2")
+# Pages read per PDF; 0 reads every page. A capped read logs the pages it leaves out
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+
+# Backends already reported as missing, so the fallback is logged once per process
+_missing_backends = set()
+
+
+def _page_count(total, max_pages):
+    # Pages to read out of `total`, logging when the cap leaves some out
+    if max_pages is None or total <= max_pages:
+        return total
+    print(f"PDF has {total} pages; reading the first {max_pages} (PDF_MAX_PAGES)")
+    return max_pages
+
+
+class PyPDF2Backend:
+    """Pure-Python extraction with PyPDF2; always available."""
+
+    name = "pypdf2"
+
+    @staticmethod
+    def available():
+        return True
+
+    def iter_pages(self, file, max_pages):
+        reader = PdfReader(file)
+        for index in range(_page_count(len(reader.pages), max_pages)):
+            yield reader.pages[index].extract_text() or ""
+
+
+class PdfiumBackend:
+    """Extraction with PDFium through pypdfium2; native code, usually the fastest."""
+
+    name = "pypdfium2"
+
+    @staticmethod
+    def available():
+        return pypdfium2 is not None
+
+    def iter_pages(self, file, max_pages):
+        document = pypdfium2.PdfDocument(file.read())
+        try:
+            for index in range(_page_count(len(document), max_pages)):
+                page = document[index]
+                text_page = page.get_textpage()
+                try:
+                    # PDFium ends lines with CRLF
+                    yield text_page.get_text_range().replace("\r\n", "\n")
+                finally:
+                    text_page.close()
+                    page.close()
+        finally:
+            document.close()
+
+
+class PdfminerBackend:
+    """Extraction with pdfminer.six; pure Python, better at multi-column layouts."""
+
+    name = "pdfminer"
+
+    @staticmethod
+    def available():
+        return extract_pages is not None
+
+    def iter_pages(self, file, max_pages):
+        # pdfminer does not count pages up front; read one past the cap to tell whether it truncated
+        for index, layout in enumerate(extract_pages(file, maxpages=max_pages + 1 if max_pages else 0)):
+            if max_pages is not None and index >= max_pages:
+                print(f"PDF has more than {max_pages} pages; reading the first {max_pages} (PDF_MAX_PAGES)")
+                break
+            yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+
+BACKENDS = {backend.name: backend for backend in (PyPDF2Backend, PdfiumBackend, PdfminerBackend)}
+
+
+def available_backends():
+    """
+    Return the names of the PDF backends that can run in this environment.
+
+    Returns:
+        list[str]: Backend names, PyPDF2 first.
+    """
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name=None):
+    """
+    Return a PDF backend by name, falling back to PyPDF2 if it is unknown or not installed.
+
+    Args:
+        name (str, optional): Backend name. Defaults to PDF_BACKEND.
+
+    Returns:
+        A backend with `name` and `iter_pages(file, max_pages)`.
+    """
+    name = name or PDF_BACKEND
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available():
+        if name not in _missing_backends:
+            _missing_backends.add(name)
+            print(f"PDF backend '{name}' is not available; using PyPDF2")
+        backend = PyPDF2Backend
+    return backend()
+
+
+def iter_pdf_pages(file, backend=None, max_pages=None):
+    """
+    Yield the text of each page of a PDF, one page at a time.
+
+    Pages are extracted lazily, so a caller can stop early and only the pages it reads are
+    parsed (PyPDF2 and pypdfium2 load pages on demand).
+
+    Args:
+        file (file-like): Binary PDF data.
+        backend (str, optional): Backend name. Defaults to PDF_BACKEND.
+        max_pages (int, optional): Stop after this many pages; 0 reads every page. Defaults to PDF_MAX_PAGES.
+
+    Yields:
+        str: Text of the next page.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    yield from get_backend(backend).iter_pages(file, max_pages or None)
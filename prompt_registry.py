@@ -0,0 +1,156 @@
+import threading
+from langchain_core.prompts import PromptTemplate
+import llm_cache
+
+
+class CompiledPrompt:
+    """
+    A prompt template parsed once and reused for every call.
+
+    Attributes:
+        name (str): Registry name, or the template version for unnamed templates.
+        template (str): The template text.
+        version (str): Stable version tag of the template text.
+        prompt (PromptTemplate): The parsed template.
+    """
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self.version = llm_cache.template_version(template)
+        self.prompt = PromptTemplate.from_template(template)
+        # Token usage reported by the provider, including prompt tokens served from its prompt cache
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def format(self, **inputs):
+        """
+        Render the prompt.
+
+        Args:
+            **inputs: Values for the template placeholders.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        return self.prompt.format(**inputs)
+
+    def record_usage(self, response):
+        """
+        Record cached vs uncached prompt tokens, and completion tokens, reported by the provider for one call.
+
+        Args:
+            response (dict): The raw chat completion response.
+
+        Returns:
+            tuple: (prompt_tokens, cached_tokens) of this call.
+        """
+        usage = response.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += usage.get("completion_tokens", 0) or 0
+        print(f"Prompt '{self.name}': {prompt_tokens} prompt tokens, "
+              f"{cached_tokens} cached, {prompt_tokens - cached_tokens} uncached")
+        return prompt_tokens, cached_tokens
+
+    def stats(self):
+        """
+        Return the prompt token counters.
+
+        Returns:
+            dict: Calls, prompt tokens, cached and uncached tokens, the cached share and completion tokens.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+                "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+class PromptRegistry:
+    """
+    Compile prompt templates once and hand out the compiled form by name or by text.
+
+    Templates registered at startup are compiled immediately. Templates looked up by text that
+    were never registered (e.g. ad-hoc templates of the experiment scripts) are compiled on first
+    use and kept, so no template is parsed more than once per process.
+    """
+
+    def __init__(self):
+        self._by_name = {}
+        self._by_text = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, template):
+        """
+        Compile and register a template under a name.
+
+        Args:
+            name (str): Registry name, e.g. "score".
+            template (str): The template text.
+
+        Returns:
+            CompiledPrompt: The compiled template.
+        """
+        with self._lock:
+            compiled = self._by_text.get(template)
+            if compiled is None:
+                compiled = CompiledPrompt(name, template)
+                self._by_text[template] = compiled
+            self._by_name[name] = compiled
+            return compiled
+
+    def register_all(self, templates):
+        """
+        Compile and register every template of a name -> text mapping.
+
+        Args:
+            templates (dict): Template texts keyed by name.
+        """
+        for name, template in templates.items():
+            self.register(name, template)
+
+    def get(self, template):
+        """
+        Return the compiled form of a template, given its registry name or its text.
+
+        Args:
+            template (str): Registry name or template text.
+
+        Returns:
+            CompiledPrompt: The compiled template.
+        """
+        compiled = self._by_name.get(template) or self._by_text.get(template)
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            compiled = self._by_text.get(template)
+            if compiled is None:
+                compiled = CompiledPrompt(llm_cache.template_version(template), template)
+                self._by_text[template] = compiled
+            return compiled
+
+    def stats(self):
+        """
+        Return the prompt token counters of every compiled template that has been called.
+
+        Returns:
+            dict: Per-template counters keyed by name.
+        """
+        with self._lock:
+            compiled_prompts = list(self._by_text.values())
+        return {compiled.name: compiled.stats() for compiled in compiled_prompts if compiled.calls}
+
+
+prompt_registry = PromptRegistry()
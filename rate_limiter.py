@@ -0,0 +1,410 @@
+import os
+import re
+import time
+import asyncio
+import threading
+import contextvars
+
+
+# Default budgets per provider, overridable through the environment
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+
+# Completion size assumed when a call does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+# AIMD tuning: halve the budget on a 429, win back 5% of it per successful call
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.05
+MIN_RATE_SCALE = 0.05
+DEFAULT_RETRY_AFTER_SECONDS = 5.0
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+# The limiter of the call currently in flight, so HTTP response hooks know where to report headers
+current_rate_limiter = contextvars.ContextVar("current_rate_limiter", default=None)
+
+
+def estimate_tokens(text):
+    """
+    Roughly estimate the number of tokens in a text (about 4 characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Estimated token count, at least 1.
+    """
+    return max(1, len(text) // 4)
+
+
+def parse_reset_duration(value):
+    """
+    Parse a rate-limit reset duration such as "1s", "120ms" or "6m0s" into seconds.
+
+    Args:
+        value (str): Header value.
+
+    Returns:
+        float or None: Duration in seconds, or None if it cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def is_rate_limit_error(error):
+    """
+    Check whether an exception raised by an LLM client is a rate-limit (429) error.
+
+    Works for the OpenAI SDK (RateLimitError) and Google clients (ResourceExhausted).
+
+    Args:
+        error (Exception): The raised exception.
+
+    Returns:
+        bool: True if the provider throttled the call.
+    """
+    if getattr(error, "http_status", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    return type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def retry_after_from_error(error):
+    """
+    Read the Retry-After delay from a rate-limit error, if the provider sent one.
+
+    Args:
+        error (Exception): The raised exception.
+
+    Returns:
+        float or None: Seconds to wait, or None if not available.
+    """
+    headers = getattr(error, "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is not None:
+            seconds = parse_reset_duration(value)
+            if seconds is not None:
+                return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def response_total_tokens(response):
+    """
+    Read the total token usage from an LLM response.
+
+    Supports OpenAI responses (`usage.total_tokens`) and LangChain messages (`usage_metadata`).
+
+    Args:
+        response: The provider response.
+
+    Returns:
+        int: Total tokens used, 0 when the response does not report usage.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata:
+        return usage_metadata.get("total_tokens", 0)
+    try:
+        return response.get("usage", {}).get("total_tokens", 0)
+    except AttributeError:
+        return 0
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter enforcing both a requests/min and a tokens/min budget.
+
+    Callers reserve capacity before each LLM call and wait only as long as the budget
+    requires, instead of sleeping a fixed time. The budget follows the provider's
+    rate-limit headers when they are available, is cut multiplicatively on every 429
+    and grows back additively on successful calls. One instance is shared by every
+    thread and coroutine that uses the same provider and model.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, name="default"):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.rate_scale = 1.0
+        self._request_level = float(requests_per_minute)
+        self._token_level = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "tokens": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    def _refill(self, now):
+        # Top up both buckets for the time elapsed since the last update
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        request_capacity = self.requests_per_minute * self.rate_scale
+        token_capacity = self.tokens_per_minute * self.rate_scale
+        self._request_level = min(request_capacity, self._request_level + elapsed * request_capacity / 60.0)
+        self._token_level = min(token_capacity, self._token_level + elapsed * token_capacity / 60.0)
+
+    def _reserve(self, tokens):
+        # Take capacity now (the buckets may go negative) and return how long the caller must wait
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            tokens = min(tokens, self.tokens_per_minute)
+            self._request_level -= 1
+            self._token_level -= tokens
+            request_rate = self.requests_per_minute * self.rate_scale / 60.0
+            token_rate = self.tokens_per_minute * self.rate_scale / 60.0
+            wait = max(
+                -self._request_level / request_rate if self._request_level < 0 else 0.0,
+                -self._token_level / token_rate if self._token_level < 0 else 0.0,
+                self._blocked_until - now,
+            )
+            self.stats["requests"] += 1
+            self.stats["tokens"] += tokens
+            self.stats["waited_seconds"] += max(0.0, wait)
+            return max(0.0, wait)
+
+    def acquire(self, tokens=1):
+        """
+        Block the calling thread until the budget allows a call of `tokens` tokens.
+
+        Args:
+            tokens (int, optional): Estimated prompt plus completion tokens for the call.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """
+        Wait without blocking the event loop until the budget allows a call of `tokens` tokens.
+
+        Args:
+            tokens (int, optional): Estimated prompt plus completion tokens for the call.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once the real usage of a call is known.
+
+        Args:
+            estimated_tokens (int): Tokens reserved before the call.
+            actual_tokens (int): Tokens the provider reported for the call.
+        """
+        if not actual_tokens:
+            return
+        with self._lock:
+            self._token_level += estimated_tokens - actual_tokens
+
+    def update_from_headers(self, headers):
+        """
+        Align the budget with the provider's x-ratelimit-* response headers.
+
+        Args:
+            headers (Mapping): Response headers of an LLM call.
+        """
+        if not headers:
+            return
+        with self._lock:
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if limit_requests and str(limit_requests).isdigit():
+                self.requests_per_minute = int(limit_requests)
+            if limit_tokens and str(limit_tokens).isdigit():
+                self.tokens_per_minute = int(limit_tokens)
+            # Never believe we have more left than the provider says we do
+            if remaining_requests and str(remaining_requests).isdigit():
+                self._request_level = min(self._request_level, float(remaining_requests))
+            if remaining_tokens and str(remaining_tokens).isdigit():
+                self._token_level = min(self._token_level, float(remaining_tokens))
+
+    def on_success(self):
+        """Additively restore the budget after a successful call."""
+        with self._lock:
+            self.rate_scale = min(1.0, self.rate_scale + RECOVERY_STEP)
+
+    def on_rate_limited(self, retry_after=None):
+        """
+        Multiplicatively cut the budget after a 429 and pause every caller.
+
+        Args:
+            retry_after (float, optional): Seconds the provider asked us to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.rate_scale = max(MIN_RATE_SCALE, self.rate_scale * BACKOFF_FACTOR)
+            delay = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_SECONDS
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._request_level = min(self._request_level, 0.0)
+            self.stats["rate_limited"] += 1
+
+    def call(self, func, estimated_tokens, max_attempts=5):
+        """
+        Run a blocking LLM call within the budget, backing off and retrying on 429s.
+
+        Args:
+            func (Callable): Zero-argument function performing the call.
+            estimated_tokens (int): Tokens to reserve for the call.
+            max_attempts (int, optional): Attempts before a 429 is re-raised. Defaults to 5.
+
+        Returns:
+            The value returned by `func`.
+        """
+        for attempt in range(max_attempts):
+            self.acquire(estimated_tokens)
+            try:
+                response = func()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                # Slow every caller down even when this caller gives up, e.g. to fail over
+                self.on_rate_limited(retry_after_from_error(e))
+                if attempt == max_attempts - 1:
+                    raise
+                continue
+            self.record_usage(estimated_tokens, response_total_tokens(response))
+            self.on_success()
+            return response
+
+    async def call_async(self, func, estimated_tokens, max_attempts=5):
+        """
+        Async counterpart of `call`.
+
+        Args:
+            func (Callable): Zero-argument function returning the awaitable call.
+            estimated_tokens (int): Tokens to reserve for the call.
+            max_attempts (int, optional): Attempts before a 429 is re-raised. Defaults to 5.
+
+        Returns:
+            The awaited result of `func()`.
+        """
+        for attempt in range(max_attempts):
+            await self.acquire_async(estimated_tokens)
+            try:
+                response = await func()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                # Slow every caller down even when this caller gives up, e.g. to fail over
+                self.on_rate_limited(retry_after_from_error(e))
+                if attempt == max_attempts - 1:
+                    raise
+                continue
+            self.record_usage(estimated_tokens, response_total_tokens(response))
+            self.on_success()
+            return response
+
+    def throttled_seconds(self):
+        """
+        Return how long new calls would still be paused after a 429.
+
+        Returns:
+            float: Seconds until the provider's Retry-After pause ends, 0.0 if not paused.
+        """
+        with self._lock:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+    def snapshot(self):
+        """
+        Return the current budget and counters.
+
+        Returns:
+            dict: Limits, scale, and request/token/wait statistics.
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "rate_scale": round(self.rate_scale, 3),
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in self.stats.items()},
+            }
+
+
+def get_rate_limiter(model):
+    """
+    Return the shared limiter for a model, creating it with the provider's default budget.
+
+    Args:
+        model (str): Model name, e.g. "gpt-4o-mini" or "gemini-1.5-flash".
+
+    Returns:
+        RateLimiter: The limiter shared by every call to that model.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(model)
+        if limiter is None:
+            if model.startswith("gemini"):
+                limiter = RateLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE, name=model)
+            else:
+                limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE, name=model)
+            _rate_limiters[model] = limiter
+        return limiter
+
+
+def rate_limiter_stats():
+    """
+    Return a snapshot of every shared limiter.
+
+    Returns:
+        dict: Snapshots keyed by model name.
+    """
+    with _rate_limiters_lock:
+        limiters = list(_rate_limiters.items())
+    return {model: limiter.snapshot() for model, limiter in limiters}
+
+
+def report_response_headers(headers):
+    """
+    Forward response headers to the limiter of the call in flight.
+
+    Installed as an HTTP response hook, so every call reports the provider's remaining budget.
+
+    Args:
+        headers (Mapping): Response headers.
+    """
+    limiter = current_rate_limiter.get()
+    if limiter is not None:
+        limiter.update_from_headers(headers)
+
+
+class RateLimitedChain:
+    """
+    Wrap a LangChain runnable (prompt | llm) so every `invoke` goes through a shared limiter.
+
+    This replaces the fixed `time.sleep` calls between LLM calls in the batch scripts.
+    """
+
+    def __init__(self, chain, limiter, template=""):
+        self.chain = chain
+        self.limiter = limiter
+        self._template_tokens = estimate_tokens(template) if template else 0
+
+    def invoke(self, inputs):
+        """
+        Invoke the wrapped chain once the budget allows it, backing off on 429s.
+
+        Args:
+            inputs (dict): Values for the placeholders in the template.
+
+        Returns:
+            The wrapped chain's response.
+        """
+        estimated = self._template_tokens + sum(estimate_tokens(str(value)) for value in inputs.values())
+        return self.limiter.call(lambda: self.chain.invoke(inputs), estimated + DEFAULT_COMPLETION_TOKENS)
@@ -7,13 +7,11 @@ import os
 import io
 import zipfile
 import pandas as pd
-import time
 import tkinter as tk
 from tkinter import filedialog
 from dotenv import load_dotenv
 import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+import llm_providers
 from datetime import datetime
 
 # Load API Key
@@ -190,21 +188,14 @@ app = FastAPI()
 
 def get_conversation(template):
     """
-    Initializes a conversation using a template and LangChain's LLM integration.
+    Initializes a conversation for a template, routed over the configured LLM providers.
     Args:
         template (str): Template content for the conversation.
     Returns:
-        Callable: Configured conversation object.
+        Callable: Configured conversation object; `invoke` returns a message with `.content`.
     """
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.1,
-        max_tokens=None,
-        timeout=None,
-        max_retries=3
-    )
-    prompt = PromptTemplate.from_template(template)
-    return prompt | llm
+    # Weighted OpenAI/Gemini routing with failover, see llm_providers.LLM_PROVIDERS
+    return llm_providers.get_conversation(template)
 
 def read_pdf(file: io.BytesIO):
     """Extract text from a PDF file."""
@@ -351,7 +342,6 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
         print(f"{filename}") #: {response_data[filename]["content"]}
 
         resume_response = conversation_resume.invoke({"resume_text": response_data[filename]["content"]})
-        time.sleep(3)
         # print(resume_response.content)
         response_data[filename]["key_feature"] = resume_response.content
         # response_data[filename] = {"key_aspect": resume_response.content}
@@ -359,7 +349,6 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
             "resume_text": resume_response.content,
             "job_description": processed_jd
         })
-        time.sleep(3)
         response_data[filename]["score"] = score_response.content
         print(score_response.content)
 
@@ -0,0 +1,272 @@
+import os
+import re
+import threading
+from collections import Counter
+import rate_limiter
+
+try:
+    import tiktoken
+except ImportError:
+    # Fall back to the rate limiter's character-based estimate
+    tiktoken = None
+
+
+# Compaction settings, overridable through the environment
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+RESUME_TOKENIZER_MODEL = os.getenv("RESUME_TOKENIZER_MODEL", "gpt-4o-mini")
+
+# Lines near the top/bottom of a page that repeat on at least this share of pages are headers/footers
+PAGE_FURNITURE_LINES = 3
+PAGE_FURNITURE_MIN_SHARE = 0.5
+# Shorter repeated lines (e.g. a skill listed under two roles) are kept
+DUPLICATE_MIN_CHARS = 20
+
+# Section headings and how much they are worth keeping; lower is kept first
+SECTION_PRIORITIES = {
+    "summary": 0, "profile": 0, "professional summary": 0, "objective": 0, "career objective": 0,
+    "experience": 0, "work experience": 0, "professional experience": 0, "employment history": 0,
+    "work history": 0, "skills": 0, "technical skills": 0, "core competencies": 0, "key skills": 0,
+    "education": 0, "educational qualifications": 0, "academic qualifications": 0, "qualifications": 0,
+    "certifications": 0, "certificates": 0, "licenses and certifications": 0,
+    "projects": 1, "key projects": 1, "achievements": 1, "accomplishments": 1, "awards": 1,
+    "honors and awards": 1, "training": 1, "courses": 1,
+    "publications": 2, "languages": 2, "volunteer experience": 2, "volunteering": 2,
+    "extracurricular activities": 2, "activities": 2, "leadership": 2,
+    "interests": 3, "hobbies": 3, "hobbies and interests": 3, "references": 3, "portfolio": 3,
+    "appendix": 3, "personal details": 3, "personal information": 3, "declaration": 3,
+}
+# Text before the first heading holds the name, contact details and often a summary
+PREAMBLE_PRIORITY = 0
+
+PAGE_BREAK = "\f"
+_PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?#+(\s*(of|/)\s*#+)?$")
+
+_encoder = None
+_stats = {"resumes": 0, "original_tokens": 0, "compacted_tokens": 0}
+_stats_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """
+    Count the tokens of a text with the model's tokenizer, or estimate them without tiktoken.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Number of tokens.
+    """
+    global _encoder
+    if tiktoken is None:
+        return rate_limiter.estimate_tokens(text)
+    if _encoder is None:
+        try:
+            _encoder = tiktoken.encoding_for_model(RESUME_TOKENIZER_MODEL)
+        except KeyError:
+            _encoder = tiktoken.get_encoding("o200k_base")
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def _normalize(line):
+    # Compare lines case-insensitively, ignoring spacing and page numbers
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def remove_page_furniture(pages):
+    """
+    Drop running headers, footers and bare page numbers.
+
+    Headers and footers are only looked for near the top and bottom of each page, and a line
+    holding only a number is treated as a page number only next to a page break, so numbers
+    in the body (years, counts, list items) are kept.
+
+    Args:
+        pages (list[str]): Text of each page.
+
+    Returns:
+        list[str]: Lines of all pages with headers and footers removed.
+    """
+    page_lines = [[line for line in page.splitlines() if line.strip()] for page in pages]
+    furniture = set()
+    if len(page_lines) > 1:
+        edge_counts = Counter()
+        for lines in page_lines:
+            edges = lines[:PAGE_FURNITURE_LINES] + lines[-PAGE_FURNITURE_LINES:]
+            edge_counts.update({_normalize(line) for line in edges})
+        min_pages = max(2, int(len(page_lines) * PAGE_FURNITURE_MIN_SHARE + 0.5))
+        furniture = {line for line, count in edge_counts.items() if count >= min_pages}
+
+    kept = []
+    last_page = len(page_lines) - 1
+    for page, lines in enumerate(page_lines):
+        for position, line in enumerate(lines):
+            normalized = _normalize(line)
+            at_page_edge = position < PAGE_FURNITURE_LINES or position >= len(lines) - PAGE_FURNITURE_LINES
+            if at_page_edge and normalized in furniture:
+                continue
+            # Only the first line after a page break and the last line before one can be a page number
+            at_page_break = (position == 0 and page > 0) or (position == len(lines) - 1 and page < last_page)
+            if at_page_break and _PAGE_NUMBER_PATTERN.match(normalized):
+                continue
+            kept.append(line)
+    return kept
+
+
+def remove_repeated_lines(lines):
+    """
+    Keep only the first occurrence of every repeated line.
+
+    Args:
+        lines (list[str]): Resume lines.
+
+    Returns:
+        list[str]: Lines without repeats.
+    """
+    seen = set()
+    kept = []
+    for line in lines:
+        normalized = " ".join(line.lower().split())
+        if len(normalized) >= DUPLICATE_MIN_CHARS:
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+        kept.append(line)
+    return kept
+
+
+def _heading_priority(line):
+    # A short line naming a known section starts that section
+    heading = re.sub(r"[^a-z ]", " ", line.lower())
+    heading = " ".join(heading.split())
+    if len(heading) > 40:
+        return None
+    return SECTION_PRIORITIES.get(heading)
+
+
+def split_sections(lines):
+    """
+    Split resume lines at known section headings.
+
+    Args:
+        lines (list[str]): Resume lines.
+
+    Returns:
+        list[tuple]: (priority, lines) per section, in document order.
+    """
+    sections = [(PREAMBLE_PRIORITY, [])]
+    for line in lines:
+        priority = _heading_priority(line)
+        if priority is not None:
+            sections.append((priority, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(priority, section_lines) for priority, section_lines in sections if section_lines]
+
+
+def _truncate_lines(lines, budget):
+    # Keep whole lines while they fit, then as much of the next line as fits
+    kept, used = [], 0
+    for line in lines:
+        tokens = count_tokens(line) + 1
+        if used + tokens > budget:
+            remaining_chars = (budget - used) * 4
+            if remaining_chars > 40:
+                kept.append(line[:remaining_chars].rsplit(" ", 1)[0])
+            break
+        kept.append(line)
+        used += tokens
+    return kept
+
+
+def fit_to_budget(sections, token_budget):
+    """
+    Keep the highest-value sections that fit in the token budget, in document order.
+
+    Sections are admitted by priority, then by position. The first section that does not fit
+    whole is cut to the remaining budget; lower-value sections after it are dropped.
+
+    Args:
+        sections (list[tuple]): (priority, lines) per section, as returned by split_sections.
+        token_budget (int): Maximum tokens to keep.
+
+    Returns:
+        list[str]: The kept lines.
+    """
+    order = sorted(range(len(sections)), key=lambda index: (sections[index][0], index))
+    kept = {}
+    remaining = token_budget
+    for index in order:
+        if remaining <= 0:
+            break
+        section_lines = sections[index][1]
+        tokens = count_tokens("\n".join(section_lines)) + 1
+        if tokens <= remaining:
+            kept[index] = section_lines
+            remaining -= tokens
+        else:
+            kept[index] = _truncate_lines(section_lines, remaining)
+            remaining = 0
+    return [line for index in sorted(kept) for line in kept[index]]
+
+
+def compact_resume(text, token_budget=RESUME_TOKEN_BUDGET):
+    """
+    Shrink a resume's raw text before it is sent to the LLM.
+
+    Running headers/footers, page numbers and repeated lines are removed first. If the text is
+    still over the budget, low-value sections (hobbies, references, appendices, ...) are dropped
+    and the last kept section is cut so the result fits.
+
+    Args:
+        text (str): Raw extracted text, with line breaks and pages separated by form feeds.
+        token_budget (int, optional): Maximum tokens to keep.
+
+    Returns:
+        tuple: (compacted_text, report) where report holds original_tokens, compacted_tokens
+               and tokens_saved.
+    """
+    original_tokens = count_tokens(text)
+    lines = remove_repeated_lines(remove_page_furniture(text.split(PAGE_BREAK)))
+    compacted = "\n".join(lines)
+    compacted_tokens = count_tokens(compacted)
+    if compacted_tokens > token_budget:
+        compacted = "\n".join(fit_to_budget(split_sections(lines), token_budget))
+        compacted_tokens = count_tokens(compacted)
+
+    report = {
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "tokens_saved": max(0, original_tokens - compacted_tokens),
+    }
+    return compacted, report
+
+
+def record_compaction(report):
+    """
+    Add one resume's compaction report to this process's totals and log it.
+
+    Compaction usually runs in a parsing worker, so the process serving the stats records the
+    report once the parsed resume comes back.
+
+    Args:
+        report (dict): Report returned by compact_resume.
+    """
+    with _stats_lock:
+        _stats["resumes"] += 1
+        _stats["original_tokens"] += report["original_tokens"]
+        _stats["compacted_tokens"] += report["compacted_tokens"]
+    print(f"Resume compacted: {report['original_tokens']} -> {report['compacted_tokens']} tokens "
+          f"({report['tokens_saved']} saved)")
+
+
+def compaction_stats():
+    """
+    Return the totals of every resume compaction recorded by this process.
+
+    Returns:
+        dict: Resume count, original and compacted tokens and tokens saved.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = max(0, stats["original_tokens"] - stats["compacted_tokens"])
+    return stats
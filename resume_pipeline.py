@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import inspect
+
+
+# Stage sizes, overridable through the environment
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "16"))
+SCORE_CONCURRENCY = int(os.getenv("SCORE_CONCURRENCY", "16"))
+PERSIST_CONCURRENCY = int(os.getenv("PERSIST_CONCURRENCY", "1"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+
+# Marks the end of the input for one worker
+_STOP = object()
+
+
+async def _maybe_await(result):
+    # Stage functions may be plain functions or coroutines
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+class ResumePipeline:
+    """
+    Move each resume through extract -> score -> persist on its own.
+
+    Parsed resumes are submitted one at a time as soon as they are ready. Each stage has its
+    own worker pool and the stages are connected by bounded queues, so a slow resume only
+    holds up itself and the connection is never idle between two global phases. Total batch
+    time approaches the slowest single resume instead of the sum of the two slowest phases.
+
+    Stage functions take `(filename, data)` and update `data` in place; they may be plain
+    functions or coroutines. `score` may be None when `extract` already scores the resume. A stage that raises is logged and the resume moves on, so
+    one bad resume never stalls the pipeline.
+    """
+
+    def __init__(self, extract, score, persist=None,
+                 extract_concurrency=EXTRACT_CONCURRENCY, score_concurrency=SCORE_CONCURRENCY,
+                 persist_concurrency=PERSIST_CONCURRENCY, queue_size=PIPELINE_QUEUE_SIZE):
+        self._stages = [("extract", extract, extract_concurrency)]
+        if score is not None:
+            self._stages.append(("score", score, score_concurrency))
+        if persist is not None:
+            self._stages.append(("persist", persist, persist_concurrency))
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in self._stages]
+        self._workers = []
+        self.stage_seconds = {name: 0.0 for name, _, _ in self._stages}
+        self.completed = 0
+
+    def start(self):
+        """Start the worker pools of every stage."""
+        for index, (name, func, concurrency) in enumerate(self._stages):
+            self._workers.append([
+                asyncio.create_task(self._worker(index, name, func))
+                for _ in range(concurrency)
+            ])
+        return self
+
+    async def submit(self, filename, data):
+        """
+        Hand a parsed resume to the first stage, waiting if that stage's queue is full.
+
+        Args:
+            filename (str): Name of the resume.
+            data (dict): Resume data; stages add `key_feature`, `score`, etc. to it.
+        """
+        await self._queues[0].put((filename, data))
+
+    async def _worker(self, index, name, func):
+        queue = self._queues[index]
+        next_queue = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            filename, data = item
+            started_at = time.perf_counter()
+            try:
+                await _maybe_await(func(filename, data))
+            except Exception as e:
+                print(f"Error in {name} stage for {filename}: {e}")
+            self.stage_seconds[name] += time.perf_counter() - started_at
+            if next_queue is not None:
+                await next_queue.put(item)
+            else:
+                self.completed += 1
+
+    async def finish(self):
+        """Wait until every submitted resume has left the last stage, then stop the workers."""
+        for queue, workers in zip(self._queues, self._workers):
+            for _ in workers:
+                await queue.put(_STOP)
+            await asyncio.gather(*workers)
+
+    def cancel(self):
+        """Cancel the workers that are still running, e.g. when the caller fails before `finish`."""
+        for workers in self._workers:
+            for worker in workers:
+                worker.cancel()
+
+
+async def run_pipeline(items, extract, score, persist=None, **kwargs):
+    """
+    Run a batch of already-parsed resumes through a ResumePipeline.
+
+    Args:
+        items (dict): Resume data keyed by filename.
+        extract, score, persist: Stage functions, see ResumePipeline.
+        **kwargs: Stage concurrency and queue size overrides.
+
+    Returns:
+        dict: The same `items`, updated by the stages.
+    """
+    pipeline = ResumePipeline(extract, score, persist, **kwargs).start()
+    try:
+        for filename, data in items.items():
+            await pipeline.submit(filename, data)
+        await pipeline.finish()
+    finally:
+        pipeline.cancel()
+    return items
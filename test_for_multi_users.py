@@ -11,6 +11,7 @@ import re
 import psycopg2
 import shutil
 import utils
+import parse_pool
 import boto3
 from botocore.exceptions import NoCredentialsError, ClientError
 from fastapi.middleware.cors import CORSMiddleware
@@ -375,30 +376,27 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                     
 
                     if file_name.endswith(".pdf"):
-                        with open(file_path, "rb") as pdf_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_pdf(pdf_file)
-                            response_data[original_name] = {"content": resume_content, "file_path": file_name}
+                        # Now read for text extraction
+                        resume_content = await parse_pool.parse_file(file_path)
+                        response_data[original_name] = {"content": resume_content, "file_path": file_name}
                     
                     # Process TXT files
                     elif file_name.endswith(".txt"):
-                        with open(file_path, "rb") as txt_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_txt(txt_file)
-                            response_data[original_name] = {"content": resume_content, "file_path": file_name}
+                        # Now read for text extraction
+                        resume_content = await parse_pool.parse_file(file_path)
+                        response_data[original_name] = {"content": resume_content, "file_path": file_name}
 
                     elif file_name.endswith(".docx"):
                         try:
-                            with open(file_path, "rb") as docx_file:
-                                # Now read for text extraction
-                                resume_content = utils.read_docx(docx_file)
-                                response_data[original_name] = {"content": resume_content, "file_path": file_name}
+                            # Now read for text extraction
+                            resume_content = await parse_pool.parse_file(file_path)
+                            response_data[original_name] = {"content": resume_content, "file_path": file_name}
                         except Exception as e:
                             response_data[original_name] = {"content": f"Error reading DOCX file: {str(e)}", "file_path": file_name}
 
                     # Process DOC files
                     elif file_name.endswith(".doc"):
-                        resume_content, _ = utils.read_doc(file_path)
+                        resume_content = await parse_pool.parse_file(file_path)
                         response_data[original_name] = {"content": resume_content, "file_path": file_name}
                 
                     if resume_content is not None:
@@ -441,30 +439,27 @@ async def upload_files(job_description: str, files: list[UploadFile] = File(...)
                 print(f"Reading file: {file_name}")
                 # Process based on file type
                 if file_extension == "pdf":
-                    with open(file_path, "rb") as pdf_file:
-                        # Now read for text extraction
-                        resume_content = utils.read_pdf(pdf_file)
-                        response_data[file_name] = {"content": resume_content}
+                    # Now read for text extraction
+                    resume_content = await parse_pool.parse_file(file_path)
+                    response_data[file_name] = {"content": resume_content}
                 
                 elif file_extension == "txt":
-                    with open(file_path, "rb") as txt_file:
-                        # Now read for text extraction
-                        resume_content = utils.read_txt(txt_file)
-                        response_data[file_name] = {"content": resume_content}
+                    # Now read for text extraction
+                    resume_content = await parse_pool.parse_file(file_path)
+                    response_data[file_name] = {"content": resume_content}
                         
                 
                 elif file_extension == "docx":
                     try:
-                        with open(file_path, "rb") as docx_file:
-                            # Now read for text extraction
-                            resume_content = utils.read_docx(docx_file)
-                            response_data[file_name] = {"content": resume_content}
+                        # Now read for text extraction
+                        resume_content = await parse_pool.parse_file(file_path)
+                        response_data[file_name] = {"content": resume_content}
                             
                     except Exception as e:
                         response_data[file_name] = {"content": str(e)}
                 
                 elif file_extension == "doc":
-                    resume_content, _ = utils.read_doc(file_path)
+                    resume_content = await parse_pool.parse_file(file_path)
                     response_data[file_name] = {"content": resume_content}
                 
                 else:
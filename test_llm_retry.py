@@ -0,0 +1,60 @@
+import asyncio
+import llm_retry
+
+
+def _half_open_breaker():
+    # A breaker that has just become half-open: the next call is its single trial
+    breaker = llm_retry.CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    breaker = _half_open_breaker()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow_call():
+            started.set()
+            await asyncio.sleep(60)
+
+        trial = asyncio.create_task(llm_retry.call_with_retry_async(slow_call, breaker))
+        await started.wait()
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+        async def ok():
+            return "ok"
+
+        return await llm_retry.call_with_retry_async(ok, breaker)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.snapshot()["state"] == llm_retry.CircuitBreaker.CLOSED
+
+
+def test_interrupted_blocking_trial_releases_the_breaker():
+    breaker = _half_open_breaker()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    try:
+        llm_retry.call_with_retry(interrupted, breaker)
+    except KeyboardInterrupt:
+        pass
+    assert llm_retry.call_with_retry(lambda: "ok", breaker) == "ok"
+
+
+def test_second_call_is_rejected_while_trial_in_flight():
+    breaker = _half_open_breaker()
+    breaker.before_call()
+    try:
+        breaker.before_call()
+    except llm_retry.CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("a second half-open trial was let through")
@@ -9,6 +9,9 @@ import win32com.client as win32
 import tkinter as tk
 from tkinter import filedialog
 from langchain_core.prompts import PromptTemplate
+import rate_limiter
+import batch_jobs
+import sys
 from datetime import datetime
 import threading
 from queue import Queue
@@ -209,6 +212,9 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
 
     """
  
+    # Parse the template once instead of on every call
+    prompt_template = PromptTemplate.from_template(template)
+
     # Define a nested function to handle API interaction
     def call_openai_model(inputs):
         """
@@ -221,13 +227,16 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
             str: The content of the response generated by the OpenAI model.
         """
         # Generate the prompt by formatting the template with the provided inputs
-        prompt = PromptTemplate.from_template(template).format(**inputs)
-        # Call the OpenAI Chat API to generate a response
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[{"role": "system", "content": prompt}],
-            temperature=temperature,
-            max_tokens=max_tokens
+        prompt = prompt_template.format(**inputs)
+        # Call the OpenAI Chat API, waiting on the shared rate-limit budget for the model
+        response = rate_limiter.get_rate_limiter(model).call(
+            lambda: openai.ChatCompletion.create(
+                model=model,
+                messages=[{"role": "system", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            rate_limiter.estimate_tokens(prompt) + (max_tokens or rate_limiter.DEFAULT_COMPLETION_TOKENS)
         )
         # Extract and return the content of the response
         return response["choices"][0]["message"]["content"]
@@ -633,5 +642,10 @@ if __name__ == "__main__":
     job_description = input("Please enter JOB description: ")
 
     resume_df = extract_text_from_files(folder_path)
-    resume_df = process_resumes(resume_df, job_description)
+    if "--bulk" in sys.argv:
+        # Nightly runs: score through the batch-job API, or the offline stand-in with --local
+        client = batch_jobs.get_batch_client(local="--local" in sys.argv)
+        resume_df = batch_jobs.process_resumes_bulk(resume_df, job_description, TEMPLATES, client)
+    else:
+        resume_df = process_resumes(resume_df, job_description)
     save_results(resume_df)
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import tempfile
+
+
+# Upload buffering settings, overridable through the environment
+# Files up to this size stay in memory; larger ones spill to an unnamed temporary file
+UPLOAD_SPOOL_MAX_BYTES = int(float(os.getenv("UPLOAD_SPOOL_MAX_MB", "16")) * 2 ** 20)
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+
+class UploadBuffer:
+    """
+    The bytes of one uploaded file, read once and shared by the hash, the parser and the S3 upload.
+
+    The content is fingerprinted while it is written, so it is never read back just to hash it.
+    It lives in a SpooledTemporaryFile: an in-memory buffer that only rolls over to disk past
+    UPLOAD_SPOOL_MAX_BYTES, so resumes never go through the filesystem.
+
+    A buffer can stand in for the UploadFile it was read from: it has the same `filename`,
+    `content_type` and seekable `file`.
+    """
+
+    def __init__(self, name, max_memory=UPLOAD_SPOOL_MAX_BYTES, content_type=None):
+        self.name = name
+        self.content_type = content_type
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def filename(self):
+        """Name of the buffered file, as on the UploadFile."""
+        return self.name
+
+    @property
+    def sha256(self):
+        """Hex SHA-256 digest of the content written so far."""
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self):
+        """Whether the content is still held in memory rather than in a temporary file."""
+        return not self.file._rolled
+
+    def getvalue(self):
+        """
+        Return the whole content.
+
+        Returns:
+            bytes: The file's bytes.
+        """
+        self.file.seek(0)
+        return self.file.read()
+
+    def open(self):
+        """
+        Rewind the buffer and return it for reading, e.g. by boto3's upload_fileobj.
+
+        Returns:
+            file-like: The binary buffer, positioned at the start.
+        """
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        """Release the memory or temporary file holding the content."""
+        self.file.close()
+
+
+async def from_upload(upload, max_memory=UPLOAD_SPOOL_MAX_BYTES):
+    """
+    Copy an uploaded file into a buffer, hashing it on the way.
+
+    Args:
+        upload (fastapi.UploadFile): The uploaded file.
+        max_memory (int, optional): Size past which the buffer spills to a temporary file.
+
+    Returns:
+        UploadBuffer: The buffered file.
+    """
+    buffer = UploadBuffer(upload.filename, max_memory, upload.content_type)
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return buffer
+        buffer.write(chunk)
+
+
+def from_zip_member(archive, member, max_memory=UPLOAD_SPOOL_MAX_BYTES):
+    """
+    Decompress one member of a zip archive into a buffer, hashing it on the way.
+
+    Args:
+        archive (zipfile.ZipFile): Open archive.
+        member (str): Name of the member.
+        max_memory (int, optional): Size past which the buffer spills to a temporary file.
+
+    Returns:
+        UploadBuffer: The buffered member.
+    """
+    buffer = UploadBuffer(member, max_memory)
+    with archive.open(member) as source:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return buffer
+            buffer.write(chunk)
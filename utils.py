@@ -1,13 +1,166 @@
-from PyPDF2 import PdfReader
 from docx import Document
-import win32com.client
 import os
 import openai
 import io
-from langchain_core.prompts import PromptTemplate
 import re
+import json
+import asyncio
+import aiohttp
+import requests
+import llm_cache
+import rate_limiter
+import llm_retry
+import prompt_registry
+import resume_compaction
+import pdf_backends
+import doc_reader
+
+
+# Connection pool settings for the async OpenAI client. Every async call shares one
+# keep-alive session, so concurrency is limited by these values and not by a thread pool.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "50"))
+OPENAI_KEEPALIVE_TIMEOUT = float(os.getenv("OPENAI_KEEPALIVE_TIMEOUT", "30"))
+
+# Attempts per call when the provider answers 429, backing off through the shared rate limiter
+RATE_LIMIT_MAX_ATTEMPTS = int(os.getenv("RATE_LIMIT_MAX_ATTEMPTS", "5"))
+
+_openai_session = None
+_openai_semaphore = None
+
+
+# Rubric shared by the single and multi-resume scoring templates
+SCORING_RUBRIC = """        Scoring Guidelines:
+        Evaluate the resume against the job description using the criteria outlined below. Assign marks in each category, calculate the total, and round the final score to the nearest whole number.
+
+        1. Candidate Profile (Max 16 Marks)
+            1.1 Job-Related Keywords (Max 6 Marks):
+                6 Points: Resume includes all highly relevant keywords, indicating strong alignment with job requirements.
+                3 Points: Resume includes many relevant keywords but misses some critical ones.
+                1 Points: Resume includes few relevant keywords or misses key terms.
+            1.2 Relevance of Past Roles to Job Description (Max 5 Marks):
+                5 Points: Past roles and responsibilities strongly align with the job description.
+                3 Points: Moderate alignment, with partial overlap in roles and responsibilities.
+                1 Points: Limited relevance or weak alignment.
+            1.3 Clarity of Responsibilities (Max 5 Marks):
+                5 Points: Responsibilities are clearly defined using action words (e.g., "Developed," "Managed") with measurable outcomes.
+                3 Points: Responsibilities are described but lack clear action words or measurable outcomes.
+                1 Points: Responsibilities are vague or generic.
+
+        2. Experience Section (Max 63 Marks)
+            2.1 Years of Experience (Max 15 Marks):
+                15 Points: Meets or exceeds the required years of experience.
+                10 Points: Slightly below the required years but with relevant experience.
+                5 Points: Limited relevance or inadequate years of experience.
+            2.2 Matching Technical Skills (Max 39 Marks):
+                39 Points: All technical skills mentioned in the job description are evident, supported by examples or certifications.
+                25 Points: Most technical skills are evident, but examples or certifications are missing.
+                15 Points: Some technical skills align, but several are missing.
+                5 Points: Minimal or no alignment with the required technical skills.
+            2.3 Communication and Teamwork (Max 9 Marks):
+                9 Points: Strong evidence of soft skills, supported by examples (e.g., "Led a team of 5," "Facilitated cross-department collaboration").
+                7 Points: Mentions soft skills but lacks specific examples.
+                3 Points: Minimal or generic mention of soft skills.
+
+        3. Educational Qualifications and Certifications (Max 21 Marks)
+            3.1 Minimum Educational Qualifications (Max 16 Marks):
+                16 Points: Meets or exceeds the educational qualifications specified in the job description.
+                10 Points: Meets basic qualifications but lacks advanced or preferred qualifications.
+                5 Points: Does not fully meet the educational qualifications.
+            3.2 Additional Certifications/Training Programs (Max 5 Marks):
+                5 Points: Certifications/training are directly relevant to the job description (e.g., industry-specific certifications).
+                3 Points: Certifications or training are partially relevant to the job description.
+                1 Point: No additional certifications or irrelevant certifications.
+
+        Additional Refinements:
+            Ensure that scoring accounts for both the breadth and depth of alignment between the resume and job description.
+            Emphasize evidence-backed qualifications and experience to avoid scoring inflated or unsupported claims.
+"""
 
 
+# Instructions, rubric and inputs shared by the single-resume scoring templates
+SCORE_PROMPT = """
+        Your task is to evaluate the alignment between the provided resume and job description by analyzing three critical sections: Candidate Profile, Experience, and Educational Qualifications and Certifications. Based on your evaluation, assign a final score between 0 and 100, reflecting the overall suitability of the candidate for the job. Also remember do not rush to score, take your time while processing.
+
+""" + SCORING_RUBRIC + """
+        Inputs:
+        Job Description Text:
+        {job_description}
+
+        Resume Text:
+        {resume_text}
+
+"""
+
+# Maximum marks of each rubric section in the score_json output
+SCORE_SECTIONS = {
+    "candidate_profile": 16,
+    "experience": 63,
+    "education_and_certifications": 21,
+}
+
+# The score_json answer is a few dozen tokens; a small cap keeps latency and cost down
+SCORE_MAX_TOKENS = int(os.getenv("SCORE_MAX_TOKENS", "60"))
+# Attempts per resume when the score output is malformed; only that resume is re-requested
+SCORE_PARSE_ATTEMPTS = int(os.getenv("SCORE_PARSE_ATTEMPTS", "3"))
+
+# Strict JSON schema for the score_json output (OpenAI structured outputs)
+SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resume_score",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {name: {"type": "integer"} for name in [*SCORE_SECTIONS, "total"]},
+            "required": [*SCORE_SECTIONS, "total"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# The extract_and_score answer carries the key-aspect summary as well as the marks
+EXTRACT_AND_SCORE_MAX_TOKENS = int(os.getenv("EXTRACT_AND_SCORE_MAX_TOKENS", "1200"))
+
+# Strict JSON schema for the extract_and_score output
+EXTRACT_AND_SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resume_key_aspects_and_score",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "key_aspects": {"type": "string"},
+                **SCORE_RESPONSE_FORMAT["json_schema"]["schema"]["properties"],
+            },
+            "required": ["key_aspects", *SCORE_SECTIONS, "total"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# The score_quick answer is a single number, used as the cheap first pass of the model cascade
+QUICK_SCORE_MAX_TOKENS = int(os.getenv("QUICK_SCORE_MAX_TOKENS", "12"))
+
+# Strict JSON schema for the score_quick output
+QUICK_SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resume_quick_score",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"total": {"type": "integer"}},
+            "required": ["total"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# The scoring templates put the static instructions and rubric first, then the job description
+# shared by the whole batch, and the per-resume text last, so consecutive calls share a long
+# identical prefix that the provider can serve from its prompt cache.
 TEMPLATES = {
     "job_description" : """
         
@@ -112,82 +265,291 @@ TEMPLATES = {
         Ensure alignment with the resume content without adding interpretations or assumptions.
 
         """ , 
-    "score" : """
-        Your task is to evaluate the alignment between the provided resume and job description by analyzing three critical sections: Candidate Profile, Experience, and Educational Qualifications and Certifications. Based on your evaluation, assign a final score between 0 and 100, reflecting the overall suitability of the candidate for the job. Also remember do not rush to score, take your time while processing.
-
+    "score" : SCORE_PROMPT + """        Output:
+            Provide the final calculated score as a single whole number (0 – 100) with no additional explanation or text. If you are not able to score the resume then you can give 0 score to the resume.
+        """, 
+    "score_json" : SCORE_PROMPT + """        Output:
+            Return only a JSON object with the marks of each section and their total, with no additional explanation or text:
+            {{"candidate_profile": <0-16>, "experience": <0-63>, "education_and_certifications": <0-21>, "total": <0-100>}}
+            If you are not able to score the resume then give 0 for every field.
+        """, 
+    "extract_and_score" : """
+        Your task is to read the raw resume below, summarize its key aspects, and evaluate its alignment with the job description by analyzing three critical sections: Candidate Profile, Experience, and Educational Qualifications and Certifications. Use only the content of the resume without making assumptions or adding external details. Also remember do not rush to score, take your time while processing.
+
+        Key Aspects:
+        Summarize the resume in short bullet points under these categories: Candidate Profile (keywords, past roles, measurable achievements), Experience Details (total years, technical skills, soft skills) and Educational Qualifications and Certifications.
+
+""" + SCORING_RUBRIC + """
         Inputs:
+        Job Description Text:
+        {job_description}
+
         Resume Text:
         {resume_text}
 
+        Output:
+            Return only a JSON object with the key-aspect summary, the marks of each section and their total, with no additional explanation or text:
+            {{"key_aspects": "<summary>", "candidate_profile": <0-16>, "experience": <0-63>, "education_and_certifications": <0-21>, "total": <0-100>}}
+            If you are not able to score the resume then give 0 for every mark.
+        """, 
+    "score_quick" : """
+        Your task is to estimate how well the resume below fits the job description, weighing job-related keywords, relevance of past roles, years of experience, matching technical skills, and educational qualifications and certifications. Assign a single overall score between 0 and 100.
+
         Job Description Text:
         {job_description}
 
-        Scoring Guidelines:
-        Evaluate the resume against the job description using the criteria outlined below. Assign marks in each category, calculate the total, and round the final score to the nearest whole number.
+        Resume Text:
+        {resume_text}
 
-        1. Candidate Profile (Max 16 Marks)
-            1.1 Job-Related Keywords (Max 6 Marks):
-                6 Points: Resume includes all highly relevant keywords, indicating strong alignment with job requirements.
-                3 Points: Resume includes many relevant keywords but misses some critical ones.
-                1 Points: Resume includes few relevant keywords or misses key terms.
-            1.2 Relevance of Past Roles to Job Description (Max 5 Marks):
-                5 Points: Past roles and responsibilities strongly align with the job description.
-                3 Points: Moderate alignment, with partial overlap in roles and responsibilities.
-                1 Points: Limited relevance or weak alignment.
-            1.3 Clarity of Responsibilities (Max 5 Marks):
-                5 Points: Responsibilities are clearly defined using action words (e.g., "Developed," "Managed") with measurable outcomes.
-                3 Points: Responsibilities are described but lack clear action words or measurable outcomes.
-                1 Points: Responsibilities are vague or generic.
+        Output:
+            Return only a JSON object of the form {{"total": <whole number 0-100>}} with no additional explanation or text.
+        """, 
+    "score_batch" : """
+        Your task is to evaluate the alignment between each of the resumes below and the job description by analyzing three critical sections: Candidate Profile, Experience, and Educational Qualifications and Certifications. Score every resume independently against the job description, without comparing candidates with each other, and assign each one a final score between 0 and 100.
 
-        2. Experience Section (Max 63 Marks)
-            2.1 Years of Experience (Max 15 Marks):
-                15 Points: Meets or exceeds the required years of experience.
-                10 Points: Slightly below the required years but with relevant experience.
-                5 Points: Limited relevance or inadequate years of experience.
-            2.2 Matching Technical Skills (Max 39 Marks):
-                39 Points: All technical skills mentioned in the job description are evident, supported by examples or certifications.
-                25 Points: Most technical skills are evident, but examples or certifications are missing.
-                15 Points: Some technical skills align, but several are missing.
-                5 Points: Minimal or no alignment with the required technical skills.
-            2.3 Communication and Teamwork (Max 9 Marks):
-                9 Points: Strong evidence of soft skills, supported by examples (e.g., "Led a team of 5," "Facilitated cross-department collaboration").
-                7 Points: Mentions soft skills but lacks specific examples.
-                3 Points: Minimal or generic mention of soft skills.
+""" + SCORING_RUBRIC + """
+        Job Description Text:
+        {job_description}
 
-        3. Educational Qualifications and Certifications (Max 21 Marks)
-            3.1 Minimum Educational Qualifications (Max 16 Marks):
-                16 Points: Meets or exceeds the educational qualifications specified in the job description.
-                10 Points: Meets basic qualifications but lacks advanced or preferred qualifications.
-                5 Points: Does not fully meet the educational qualifications.
-            3.2 Additional Certifications/Training Programs (Max 5 Marks):
-                5 Points: Certifications/training are directly relevant to the job description (e.g., industry-specific certifications).
-                3 Points: Certifications or training are partially relevant to the job description.
-                1 Point: No additional certifications or irrelevant certifications.
+        Resumes:
+        {resumes}
 
-        Additional Refinements:
-            Ensure that scoring accounts for both the breadth and depth of alignment between the resume and job description.
-            Emphasize evidence-backed qualifications and experience to avoid scoring inflated or unsupported claims.
         Output:
-            Provide the final calculated score as a single whole number (0 – 100) with no additional explanation or text. If you are not able to score the resume then you can give 0 score to the resume.
+            Return only a JSON object of the form {{"scores": [{{"id": "<resume id>", "score": <whole number 0-100>}}]}} with exactly one entry for every resume id listed above, in the same order, and no additional explanation or text. If you are not able to score a resume then give it a score of 0.
         """
 }
 
+# Parse every template once at startup instead of on every call
+prompt_registry.prompt_registry.register_all(TEMPLATES)
+
 def extract_first_two_digit_number(text):
     """
-    Extract the first two-digit number from the input text.
+    Extract the first score (a whole number from 0 to 100) from the input text.
 
     Args:
         text (str): The input text.
 
     Returns:
-        str or None: The first two-digit number as a string, or None if no two-digit number is found.
+        str: The first score as a string, or "0" if no score is found.
     """
-    # Use regex to find the first two-digit number
-    match = re.search(r'\b\d{2}\b', text)
+    # Match 100, two-digit and single-digit numbers, but not digits inside longer numbers
+    match = re.search(r'\b(100|[1-9]?\d)\b', text)
     return match.group() if match else "0"
 
 
-def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_tokens=None):
+def _load_json_object(text, label):
+    # Models sometimes wrap the object in a code fence; take the outermost braces
+    match = re.search(r"\{.*\}", text or "", re.S)
+    if match is None:
+        raise ValueError(f"No JSON object in the {label} output")
+    output = json.loads(match.group())
+    if not isinstance(output, dict):
+        raise ValueError(f"The {label} output is not a JSON object")
+    return output
+
+
+def _validate_scores(output):
+    # Check every section mark and the total, and settle a total that disagrees with the marks
+    scores = {}
+    for name, maximum in [*SCORE_SECTIONS.items(), ("total", 100)]:
+        value = output.get(name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= maximum:
+            raise ValueError(f"Invalid '{name}' in score output: {value!r}")
+        scores[name] = int(round(value))
+
+    section_total = sum(scores[name] for name in SCORE_SECTIONS)
+    if abs(scores["total"] - section_total) > 1:
+        print(f"Score total {scores['total']} does not match section marks; using {section_total}")
+        scores["total"] = section_total
+    return scores
+
+
+def parse_score_output(text):
+    """
+    Parse and validate the JSON answer of the score_json template.
+
+    A total that disagrees with the section marks is replaced by their sum.
+
+    Args:
+        text (str): The model output.
+
+    Returns:
+        dict: Marks per section in SCORE_SECTIONS plus "total", all ints.
+
+    Raises:
+        ValueError: If the output is not JSON or a mark is missing or out of range.
+    """
+    return _validate_scores(_load_json_object(text, "score"))
+
+
+def parse_extract_and_score_output(text):
+    """
+    Parse and validate the JSON answer of the extract_and_score template.
+
+    Args:
+        text (str): The model output.
+
+    Returns:
+        tuple: (key_aspects, scores) where scores is as returned by parse_score_output.
+
+    Raises:
+        ValueError: If the output is not JSON, the summary is empty, or a mark is invalid.
+    """
+    output = _load_json_object(text, "extract-and-score")
+    key_aspects = output.get("key_aspects")
+    if not isinstance(key_aspects, str) or not key_aspects.strip():
+        raise ValueError("Missing 'key_aspects' in extract-and-score output")
+    return key_aspects, _validate_scores(output)
+
+
+def parse_quick_score_output(text):
+    """
+    Parse and validate the JSON answer of the score_quick template.
+
+    Args:
+        text (str): The model output.
+
+    Returns:
+        int: The overall score from 0 to 100.
+
+    Raises:
+        ValueError: If the output is not JSON or the score is missing or out of range.
+    """
+    total = _load_json_object(text, "quick score").get("total")
+    if isinstance(total, bool) or not isinstance(total, (int, float)) or not 0 <= total <= 100:
+        raise ValueError(f"Invalid 'total' in quick score output: {total!r}")
+    return int(round(total))
+
+
+def cache_lookup(use_cache, template, inputs, model, temperature, max_tokens=None, response_format=None):
+    """
+    Look up a call in the shared response cache.
+
+    Returns:
+        tuple: (cache, cache_key, cached_response). `cache` is None when caching is off,
+               and `cached_response` is None on a miss.
+    """
+    cache = llm_cache.get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+    cache_key = llm_cache.make_cache_key(template, inputs, model, temperature, max_tokens, response_format)
+    return cache, cache_key, cache.get(cache_key)
+
+
+def cache_store(cache, cache_key, content, model, response):
+    """Store a fresh response in the shared response cache together with its token usage."""
+    if cache is None:
+        return
+    usage = response.get("usage", {})
+    cache.set(cache_key, content, model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+
+async def cache_lookup_async(*args, **kwargs):
+    """`cache_lookup` run in a worker thread, so SQLite reads do not block the event loop."""
+    return await asyncio.to_thread(cache_lookup, *args, **kwargs)
+
+
+async def cache_store_async(cache, cache_key, content, model, response):
+    """`cache_store` run in a worker thread, so SQLite writes do not block the event loop."""
+    if cache is None:
+        return
+    await asyncio.to_thread(cache_store, cache, cache_key, content, model, response)
+
+
+def _build_requests_session():
+    """Create a per-thread requests session that reports rate-limit headers to the shared limiter."""
+    session = requests.Session()
+    session.hooks["response"].append(
+        lambda response, *args, **kwargs: rate_limiter.report_response_headers(response.headers)
+    )
+    return session
+
+
+# The OpenAI SDK calls this once per thread to build its HTTP session
+openai.requestssession = _build_requests_session
+
+
+def estimate_call_tokens(prompt, max_tokens):
+    """Estimate prompt plus completion tokens for a call, used to reserve rate-limit budget."""
+    return rate_limiter.estimate_tokens(prompt) + (max_tokens or rate_limiter.DEFAULT_COMPLETION_TOKENS)
+
+
+def create_chat_completion(model, estimated_tokens, rate_limit_attempts=RATE_LIMIT_MAX_ATTEMPTS, **request):
+    """
+    Call the OpenAI Chat API through the shared rate limiter and circuit breaker for the model.
+
+    The call waits for budget before it is sent and backs off through the limiter on 429s.
+    Timeouts, connection errors and 5xx responses are retried with jittered exponential
+    backoff, and calls fail fast while the model's circuit breaker is open.
+
+    Args:
+        model (str): The OpenAI model name.
+        estimated_tokens (int): Tokens to reserve for the call.
+        rate_limit_attempts (int, optional): Attempts on 429 before the error is raised; 1 raises at once so
+                                             the caller can fail over. Defaults to RATE_LIMIT_MAX_ATTEMPTS.
+        **request: Remaining ChatCompletion arguments.
+
+    Returns:
+        OpenAIObject: The raw API response.
+    """
+    limiter = rate_limiter.get_rate_limiter(model)
+    breaker = llm_retry.get_circuit_breaker(model)
+    context_token = rate_limiter.current_rate_limiter.set(limiter)
+    try:
+        return llm_retry.call_with_retry(
+            lambda: limiter.call(
+                lambda: openai.ChatCompletion.create(
+                    model=model, request_timeout=llm_retry.LLM_REQUEST_TIMEOUT_SECONDS, **request
+                ),
+                estimated_tokens,
+                max_attempts=rate_limit_attempts
+            ),
+            breaker
+        )
+    finally:
+        rate_limiter.current_rate_limiter.reset(context_token)
+
+
+async def acreate_chat_completion(model, estimated_tokens, rate_limit_attempts=RATE_LIMIT_MAX_ATTEMPTS, **request):
+    """
+    Async counterpart of `create_chat_completion`, sent over the shared aiohttp session.
+
+    Args:
+        model (str): The OpenAI model name.
+        estimated_tokens (int): Tokens to reserve for the call.
+        rate_limit_attempts (int, optional): Attempts on 429 before the error is raised; 1 raises at once so
+                                             the caller can fail over. Defaults to RATE_LIMIT_MAX_ATTEMPTS.
+        **request: Remaining ChatCompletion arguments.
+
+    Returns:
+        OpenAIObject: The raw API response.
+    """
+
+    async def send():
+        # The timeout covers only the request itself, not the wait for rate-limit budget
+        async with get_openai_semaphore():
+            return await asyncio.wait_for(
+                openai.ChatCompletion.acreate(
+                    model=model, request_timeout=llm_retry.LLM_REQUEST_TIMEOUT_SECONDS, **request
+                ),
+                timeout=llm_retry.LLM_REQUEST_TIMEOUT_SECONDS
+            )
+
+    limiter = rate_limiter.get_rate_limiter(model)
+    breaker = llm_retry.get_circuit_breaker(model)
+    context_token = rate_limiter.current_rate_limiter.set(limiter)
+    openai.aiosession.set(get_openai_session())
+    try:
+        return await llm_retry.call_with_retry_async(
+            lambda: limiter.call_async(send, estimated_tokens, max_attempts=rate_limit_attempts),
+            breaker
+        )
+    finally:
+        rate_limiter.current_rate_limiter.reset(context_token)
+
+
+def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_tokens=None, use_cache=True,
+                            response_format=None, validate=None):
 
     """
     Creates a function that interacts with the OpenAI model based on a provided template.
@@ -200,6 +562,10 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
                                        Lower values make output more focused and deterministic. Defaults to 0.1.
         max_tokens (int, optional): The maximum number of tokens to include in the response. Defaults to None, 
                                     allowing the model to determine the length.
+        use_cache (bool, optional): Serve byte-identical calls from the shared response cache. Defaults to True.
+        response_format (dict, optional): OpenAI `response_format`, e.g. a strict JSON schema. Defaults to None.
+        validate (Callable, optional): Called with each fresh response; a response it rejects with ValueError
+                                       is not cached and the error is raised to the caller. Defaults to None.
 
     Returns:
         function: A callable function that takes a dictionary of inputs, formats the prompt based on the template,
@@ -207,6 +573,10 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
 
     """
  
+    # Look up the template parsed at startup, or parse it once here
+    compiled_prompt = prompt_registry.prompt_registry.get(template)
+    extra_request = {"response_format": response_format} if response_format is not None else {}
+
     # Define a nested function to handle API interaction
     def call_openai_model(inputs):
         """
@@ -218,47 +588,260 @@ def get_conversation_openai(template, model="gpt-4o-mini", temperature=0.1, max_
         Returns:
             str: The content of the response generated by the OpenAI model.
         """
-        # Generate the prompt by formatting the template with the provided inputs
-        prompt = PromptTemplate.from_template(template).format(**inputs)
-        # Call the OpenAI Chat API to generate a response
-        response = openai.ChatCompletion.create(
-            model=model,
+        # Return the cached response if this exact call was made before
+        cache, cache_key, cached = cache_lookup(use_cache, template, inputs, model, temperature, max_tokens,
+                                                response_format)
+        if cached is not None:
+            return cached
+        # Generate the prompt by formatting the precompiled template with the provided inputs
+        prompt = compiled_prompt.format(**inputs)
+        # Call the OpenAI Chat API through the shared rate limiter to generate a response
+        response = create_chat_completion(
+            model,
+            estimate_call_tokens(prompt, max_tokens),
             messages=[{"role": "system", "content": prompt}],
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **extra_request
         )
-        # Extract and return the content of the response
-        return response["choices"][0]["message"]["content"]
+        # Extract the content of the response and cache it once it is known to be usable
+        content = response["choices"][0]["message"]["content"]
+        compiled_prompt.record_usage(response)
+        if validate is not None:
+            validate(content)
+        cache_store(cache, cache_key, content, model, response)
+        return content
     
     # Return the nested function for reuse
     return call_openai_model
 
 
-def clean_text(text):
-    # To Remove HTML tags
-    text = re.sub(r'<[^>]*?>', ' ', text)
-    # To Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', ' ', text)
-    # To Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', ' ', text)
-    # To Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # To Trim leading and trailing whitespace
-    text = text.strip()
-    # To Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
+def get_openai_session():
+    """
+    Return the shared aiohttp session used by every async OpenAI call.
 
+    The session is created lazily on first use so that it is bound to the running event loop,
+    and it keeps connections alive between calls instead of opening a new one per request.
 
-def read_pdf(file: io.BytesIO):
+    Returns:
+        aiohttp.ClientSession: The shared client session.
     """
-    Extract text from a PDF file using PyPDF2 library.
+    global _openai_session
+    if _openai_session is None or _openai_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=OPENAI_MAX_CONNECTIONS,
+            keepalive_timeout=OPENAI_KEEPALIVE_TIMEOUT
+        )
+        # Report the rate-limit headers of every response to the shared limiter
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(_report_trace_headers)
+        _openai_session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+    return _openai_session
+
+
+async def _report_trace_headers(session, trace_config_ctx, params):
+    """aiohttp trace hook forwarding response headers to the limiter of the call in flight."""
+    rate_limiter.report_response_headers(params.response.headers)
+
+
+def get_openai_semaphore():
+    """
+    Return the semaphore that caps the number of in-flight async OpenAI calls.
+
+    Returns:
+        asyncio.Semaphore: The shared semaphore, sized by OPENAI_MAX_CONCURRENCY.
+    """
+    global _openai_semaphore
+    if _openai_semaphore is None:
+        _openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _openai_semaphore
+
+
+async def close_openai_session():
+    """
+    Close the shared aiohttp session. Call this once when the application shuts down.
+    """
+    global _openai_session
+    if _openai_session is not None and not _openai_session.closed:
+        await _openai_session.close()
+    _openai_session = None
+
+
+def get_conversation_openai_async(template, model="gpt-4o-mini", temperature=0.1, max_tokens=None, use_cache=True,
+                                  response_format=None, validate=None):
+    """
+    Creates an async conversation function for the OpenAI Chat API.
+
+    This is the native async counterpart of `get_conversation_openai`. The returned coroutine
+    function awaits the OpenAI API directly over the shared keep-alive session, so it does not
+    take a thread from the default executor.
+
+    Args:
+        template (str): A string template for the prompt, containing placeholders for dynamic values.
+        model (str, optional): The name of the OpenAI model to use. Defaults to "gpt-4o-mini".
+        temperature (float, optional): Sampling temperature for the response. Defaults to 0.1.
+        max_tokens (int, optional): The maximum number of tokens to include in the response. Defaults to None.
+        use_cache (bool, optional): Serve byte-identical calls from the shared response cache. Defaults to True.
+        response_format (dict, optional): OpenAI `response_format`, e.g. a strict JSON schema. Defaults to None.
+        validate (Callable, optional): Called with each fresh response; a response it rejects with ValueError
+                                       is not cached and the error is raised to the caller. Defaults to None.
+
+    Returns:
+        function: A coroutine function that takes a dictionary of inputs and returns the model response.
+    """
+
+    # Look up the template parsed at startup, or parse it once here
+    compiled_prompt = prompt_registry.prompt_registry.get(template)
+    extra_request = {"response_format": response_format} if response_format is not None else {}
+
+    async def call_openai_model_async(inputs):
+        """
+        Invokes the OpenAI model asynchronously using the provided template and inputs.
+
+        Args:
+            inputs (dict): A dictionary containing values for the placeholders in the template.
+
+        Returns:
+            str: The content of the response generated by the OpenAI model.
+        """
+        # Return the cached response if this exact call was made before
+        cache, cache_key, cached = await cache_lookup_async(use_cache, template, inputs, model, temperature,
+                                                            max_tokens, response_format)
+        if cached is not None:
+            return cached
+        # Generate the prompt by formatting the precompiled template with the provided inputs
+        prompt = compiled_prompt.format(**inputs)
+        # Send the request through the shared rate limiter and connection pool
+        response = await acreate_chat_completion(
+            model,
+            estimate_call_tokens(prompt, max_tokens),
+            messages=[{"role": "system", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **extra_request
+        )
+        # Extract the content of the response and cache it once it is known to be usable
+        content = response["choices"][0]["message"]["content"]
+        compiled_prompt.record_usage(response)
+        if validate is not None:
+            validate(content)
+        await cache_store_async(cache, cache_key, content, model, response)
+        return content
+
+    return call_openai_model_async
+
+
+# Characters a URL may contain; a "<" is part of a URL only if it does not start an HTML tag
+_URL_CHAR = r"(?:[a-zA-Z0-9$-;=-_@.&+!*\\(),]|<(?![^>]*>))"
+# HTML tags and URLs, found in one scan; tags are tried first, as they were stripped before URLs
+_MARKUP_PATTERN = re.compile(r"<[^>]*>|https?://" + _URL_CHAR + r"+")
+# Byte table keeping ASCII letters and digits and turning every other byte into a space
+_ALNUM_BYTES = bytes(byte if chr(byte).isalnum() and byte < 128 else 32 for byte in range(256))
+# Tokens kept whole when clean_text is asked to keep them: C++, C#, F#, Node.js, Vue.js, ...
+_TECH_TOKEN = r"(?<![a-zA-Z0-9])(?:[a-zA-Z][a-zA-Z0-9]*(?:\+\+|#)|[a-zA-Z0-9]+\.js)(?![a-zA-Z0-9])"
+# Tags, URLs, tech tokens (kept) and runs of other characters; "<" is matched on its own so a
+# tag is never swallowed by a neighbouring run
+_CLEAN_PATTERN_KEEP_TECH = re.compile(
+    r"<[^>]*>|https?://" + _URL_CHAR + r"+|(" + _TECH_TOKEN + r")|[^a-zA-Z0-9<]+|<"
+)
+
+
+def _keep_tech_token(match):
+    return match.group(1) or " "
+
+
+def clean_text(text, keep_tech_tokens=False):
+    """
+    Reduce text to single-spaced ASCII letters and digits, dropping HTML tags and URLs.
+
+    Args:
+        text (str): Text to clean.
+        keep_tech_tokens (bool, optional): Keep tokens such as C++, C# and Node.js whole instead of
+                                           splitting off their symbols. Defaults to False.
+
+    Returns:
+        str: The cleaned text.
+    """
+    if keep_tech_tokens:
+        text = _CLEAN_PATTERN_KEEP_TECH.sub(_keep_tech_token, text)
+        return " ".join(text.split())
+
+    if "<" in text or "http" in text:
+        text = _MARKUP_PATTERN.sub(" ", text)
+    # Every byte of a non-ASCII character is >= 128, so it becomes a space like any other symbol;
+    # encoding, translating, splitting and joining all run in C
+    cleaned = text.encode("utf-8", "surrogatepass").translate(_ALNUM_BYTES)
+    return b" ".join(cleaned.split()).decode("ascii")
+
+
+def extract_pdf_text(file: io.BytesIO, backend=None, max_pages=None):
+    """
+    Extract the raw text of a PDF with the configured PDF backend (PyPDF2 by default).
+
+    Args:
+        file (io.BytesIO): A file-like object containing the PDF data.
+        backend (str, optional): PDF backend name, see pdf_backends. Defaults to PDF_BACKEND.
+        max_pages (int, optional): Read at most this many pages. Defaults to PDF_MAX_PAGES.
+
+    Returns:
+        str: Text of the pages, separated by form feeds so headers and footers can be detected.
+    """
+    return resume_compaction.PAGE_BREAK.join(pdf_backends.iter_pdf_pages(file, backend=backend, max_pages=max_pages))
+
+def extract_docx_text(file: io.BytesIO):
+    """Extract the raw text of a DOCX file, one paragraph per line."""
+    document = Document(file)
+    return "".join(paragraph.text + "\n" for paragraph in document.paragraphs)
+
+def extract_doc_text(file):
+    """Extract the raw text of a legacy Word 97-2003 DOC file, given as a path or a binary file-like object."""
+    if isinstance(file, str):
+        with open(file, "rb") as doc_file:
+            return doc_reader.extract_text(doc_file.read())
+    return doc_reader.extract_text(file.read())
+
+def extract_txt_text(file: io.BytesIO):
+    """Extract the raw text of a UTF-8 plain text file."""
+    return file.read().decode("utf-8")
+
+# Raw text extractors by file extension; the line breaks they keep are what resume compaction works on
+TEXT_EXTRACTORS = {"pdf": extract_pdf_text, "docx": extract_docx_text, "doc": extract_doc_text, "txt": extract_txt_text}
+
+
+def prepare_resume_text(raw_text, token_budget=None):
+    """
+    Clean a resume's raw text for storage and, separately, compact it for the LLM.
+
+    The full cleaned text is what gets stored, fingerprinted, ranked and indexed; only the
+    LLM input is compacted, and compaction needs the raw line breaks, so both are built here.
+
+    Args:
+        raw_text (str): Text returned by one of TEXT_EXTRACTORS.
+        token_budget (int, optional): Compact the LLM input to this many tokens,
+                                      see resume_compaction.compact_resume. Defaults to None (no compaction).
+
+    Returns:
+        dict: "content" (full cleaned text), "llm_content" (cleaned, compacted text) and
+              "compaction" (the compaction report, or None without a budget).
+    """
+    content = clean_text(raw_text.strip())
+    if token_budget is None:
+        return {"content": content, "llm_content": content, "compaction": None}
+    compacted, report = resume_compaction.compact_resume(raw_text, token_budget)
+    return {"content": content, "llm_content": clean_text(compacted.strip()), "compaction": report}
+
+
+def read_pdf(file: io.BytesIO, backend=None, max_pages=None):
+    """
+    Extract text from a PDF file with the configured PDF backend (PyPDF2 by default).
 
     This function takes a PDF file as a BytesIO object and extracts 
-    the text content from all pages of the PDF.
+    the text content from the pages of the PDF, up to the page cap.
 
     Args:
         file (io.BytesIO): A file-like object containing the PDF data.
+        backend (str, optional): PDF backend name, see pdf_backends. Defaults to PDF_BACKEND.
+        max_pages (int, optional): Read at most this many pages. Defaults to PDF_MAX_PAGES.
 
     Returns:
         str: A string containing the extracted text from all pages of the PDF,
@@ -267,63 +850,32 @@ def read_pdf(file: io.BytesIO):
     Raises:
         Exception: If there are issues reading the PDF file.
     """
-    # Create a PDF reader object from the input file
-    pdf_reader = PdfReader(file)
-    
-    # Initialize an empty string to store extracted text
-    extracted_text = ""
-    
-    # Iterate through each page of the PDF
-    for page in pdf_reader.pages:
-        # Extract text from the current page and append to the result
-        extracted_text += page.extract_text()
-    
     # Return the extracted text with leading and trailing whitespaces removed
-    return clean_text(extracted_text.strip())
+    return clean_text(extract_pdf_text(file, backend, max_pages).strip())
 
 def read_docx(file: io.BytesIO):
     """Extract text from a DOCX file."""
-    document = Document(file)
-    extracted_text = ""
-    for paragraph in document.paragraphs:
-        extracted_text += paragraph.text + "\n"
-    return clean_text(extracted_text.strip())
+    return clean_text(extract_docx_text(file).strip())
 
 
 
-def read_doc(file_path: str):
+def read_doc(file):
     """
-    Extract text from a DOC file using COM automation (Windows only).
+    Extract text from a legacy Word 97-2003 DOC file, given as a path or a binary file-like object.
+
+    The text is read from the file's piece table by doc_reader, so no Word installation is needed.
     """
-    word = None
     try:
-        # First read the file as binary for blob storage
-        with open(file_path, "rb") as doc_file:
-            data = doc_file.read()
-            blob_data = None
-
-        # Now extract text using Word automation
-        word = win32com.client.Dispatch("Word.Application")
-        word.Visible = False
-        doc = word.Documents.Open(os.path.abspath(file_path))
-        text = doc.Content.Text
-        doc.Close(False)
-        resume_content = clean_text(text)
+        blob_data = None
+        resume_content = clean_text(extract_doc_text(file))
         return resume_content, blob_data
     except Exception as e:
         return f"Error reading DOC file: {str(e)}", None
-    finally:
-        if word is not None:
-            try:
-                word.Quit()
-            except:
-                pass  # Ignore errors during Word cleanup
 
 def read_txt(file: io.BytesIO):
     """Extract text from a plain text file."""
     try:
-        contents = file.read()
-        return clean_text(contents.decode("utf-8").strip())
+        return clean_text(extract_txt_text(file).strip())
     except Exception as e:
         return f"Error processing TXT file: {str(e)}"
  
\ No newline at end of file
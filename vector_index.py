@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import zlib
+import threading
+import numpy as np
+import openai
+import lexical_ranker
+
+
+# Index settings, overridable through the environment
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+# "hashing" works offline; "openai" calls the embeddings API
+VECTOR_EMBEDDER = os.getenv("VECTOR_EMBEDDER", "hashing")
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "512"))
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+# IVF: vectors are grouped around this many centroids once the index holds enough vectors to train them
+IVF_LISTS = int(os.getenv("IVF_LISTS", "64"))
+IVF_PROBES = int(os.getenv("IVF_PROBES", "8"))
+# Vectors per list needed before training, and growth that triggers retraining
+IVF_TRAIN_MIN_PER_LIST = 20
+IVF_RETRAIN_GROWTH = 4
+IVF_TRAIN_ITERATIONS = 10
+INITIAL_CAPACITY = 1024
+# Resume ids are the 20-digit upload timestamps, which do not fit in 64 bits
+ID_DTYPE = "S20"
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    Embed text locally by hashing its terms into a fixed number of signed buckets.
+
+    This is a sparse random projection of the term-count vector: each term lands in one bucket
+    with a random sign, so texts sharing weighted terms get a high cosine similarity. It needs
+    no model or network, and the same text always gets the same vector.
+    """
+
+    def __init__(self, dim=HASHING_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._buckets = {}
+
+    def _bucket(self, term):
+        # Stable across processes, unlike the built-in hash(); terms repeat across resumes, so cache them
+        bucket = self._buckets.get(term)
+        if bucket is None:
+            digest = zlib.crc32(term.encode("utf-8"))
+            bucket = (digest % self.dim, 1.0 if digest & 0x80000000 else -1.0)
+            if len(self._buckets) < 1_000_000:
+                self._buckets[term] = bucket
+        return bucket
+
+    def embed(self, texts):
+        """
+        Embed texts.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            numpy.ndarray: One L2-normalized float32 row per text.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = lexical_ranker.term_counts(text)
+            if not counts:
+                continue
+            buckets, signs = zip(*[self._bucket(term) for term in counts])
+            weights = np.asarray(signs, dtype=np.float32) * (1.0 + np.log(np.fromiter(counts.values(), np.float32)))
+            # Terms sharing a bucket add up
+            np.add.at(vectors[row], np.asarray(buckets), weights)
+        return _normalize_rows(vectors)
+
+
+class OpenAIEmbedder:
+    """Embed text with the OpenAI embeddings API."""
+
+    def __init__(self, model=OPENAI_EMBEDDING_MODEL, dim=1536):
+        self.model = model
+        self.dim = dim
+        self.name = f"openai-{model}"
+
+    def embed(self, texts):
+        """
+        Embed texts.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            numpy.ndarray: One L2-normalized float32 row per text.
+        """
+        response = openai.Embedding.create(model=self.model, input=[text or " " for text in texts])
+        rows = sorted(response["data"], key=lambda item: item["index"])
+        return _normalize_rows(np.array([row["embedding"] for row in rows], dtype=np.float32))
+
+
+def get_embedder(name=VECTOR_EMBEDDER):
+    """
+    Return the embedder configured by name.
+
+    Args:
+        name (str, optional): "hashing" or "openai".
+
+    Returns:
+        An object with `name`, `dim` and `embed(texts)`.
+    """
+    if name == "openai":
+        return OpenAIEmbedder()
+    return HashingEmbedder()
+
+
+class VectorIndex:
+    """
+    Persistent IVF index of resume embeddings on memory-mapped files.
+
+    Vectors, ids and list assignments are appended to memory-mapped files in `directory`, so
+    the index survives restarts and only the pages a search touches are read. Once the index
+    holds enough vectors it trains IVF centroids with k-means; a search then scans only the
+    vectors of the `probes` lists closest to the query. Until then, and for small indexes,
+    every vector is scanned, which is still a single matrix product.
+
+    An index is bound to one embedder; vectors from another embedder are not comparable.
+    """
+
+    def __init__(self, directory=VECTOR_INDEX_DIR, embedder=None, lists=IVF_LISTS, probes=IVF_PROBES):
+        self.directory = directory
+        self.embedder = embedder or get_embedder()
+        self.lists = lists
+        self.probes = probes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        meta = self._read_meta()
+        if meta is not None and meta["embedder"] != self.embedder.name:
+            raise ValueError(f"Vector index in {directory} was built with {meta['embedder']}, "
+                             f"not {self.embedder.name}")
+        self.count = meta["count"] if meta else 0
+        self.capacity = meta["capacity"] if meta else INITIAL_CAPACITY
+        self.trained_count = meta["trained_count"] if meta else 0
+        self._open_files(create=meta is None)
+        self._centroids = np.load(self._path("centroids.npy")) if self.trained_count else None
+        self._rows = {bytes(self._ids[row]).decode(): row for row in range(self.count)}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        meta = {"embedder": self.embedder.name, "dim": self.embedder.dim, "count": self.count,
+                "capacity": self.capacity, "trained_count": self.trained_count}
+        # Replace the file atomically so a crash never leaves half-written metadata
+        temporary_path = self._path("meta.json.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(temporary_path, self._path("meta.json"))
+
+    def _open_files(self, create=False):
+        mode = "w+" if create else "r+"
+        self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode=mode,
+                                  shape=(self.capacity, self.embedder.dim))
+        self._ids = np.memmap(self._path("ids.bin"), dtype=ID_DTYPE, mode=mode, shape=(self.capacity,))
+        self._assignments = np.memmap(self._path("lists.i32"), dtype=np.int32, mode=mode, shape=(self.capacity,))
+
+    def _grow(self, needed):
+        # Double the files in place; memmaps must be reopened at the new size
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype, row_shape in [("vectors.f32", np.float32, (self.embedder.dim,)),
+                                       ("ids.bin", np.dtype(ID_DTYPE), ()),
+                                       ("lists.i32", np.int32, ())]:
+            with open(self._path(name), "r+b") as file:
+                file.truncate(capacity * int(np.prod(row_shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+        self.capacity = capacity
+        self._open_files()
+
+    def add(self, items):
+        """
+        Embed and add resumes; ids already in the index are skipped.
+
+        Args:
+            items (list[tuple]): (unique_id, text) pairs.
+
+        Returns:
+            int: Number of resumes added.
+        """
+        with self._lock:
+            seen = set()
+            new_items = []
+            for unique_id, text in items:
+                unique_id = str(unique_id)
+                if unique_id not in self._rows and unique_id not in seen:
+                    seen.add(unique_id)
+                    new_items.append((unique_id, text))
+            if not new_items:
+                return 0
+            vectors = self.embedder.embed([text for _, text in new_items])
+            if self.count + len(new_items) > self.capacity:
+                self._grow(self.count + len(new_items))
+
+            start, end = self.count, self.count + len(new_items)
+            self._vectors[start:end] = vectors
+            self._ids[start:end] = [unique_id.encode() for unique_id, _ in new_items]
+            self._assignments[start:end] = self._assign(vectors)
+            for offset, (unique_id, _) in enumerate(new_items):
+                self._rows[unique_id] = start + offset
+            self.count = end
+
+            if self._needs_training():
+                self._train()
+            self._vectors.flush()
+            self._ids.flush()
+            self._assignments.flush()
+            self._write_meta()
+            return len(new_items)
+
+    def _assign(self, vectors):
+        if self._centroids is None:
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _needs_training(self):
+        if self.count < self.lists * IVF_TRAIN_MIN_PER_LIST:
+            return False
+        return not self.trained_count or self.count >= self.trained_count * IVF_RETRAIN_GROWTH
+
+    def _train(self):
+        # Spherical k-means on a sample, then assign every vector to its nearest centroid
+        started_at = time.perf_counter()
+        generator = np.random.default_rng(0)
+        sample_size = min(self.count, self.lists * 256)
+        sample = np.asarray(self._vectors[np.sort(generator.choice(self.count, sample_size, replace=False))])
+        centroids = sample[generator.choice(sample_size, self.lists, replace=False)]
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for list_index in range(self.lists):
+                members = sample[labels == list_index]
+                if len(members):
+                    centroids[list_index] = members.sum(axis=0)
+            centroids = _normalize_rows(centroids)
+
+        self._centroids = centroids
+        np.save(self._path("centroids.npy"), centroids)
+        for start in range(0, self.count, 65536):
+            end = min(self.count, start + 65536)
+            self._assignments[start:end] = self._assign(np.asarray(self._vectors[start:end]))
+        self.trained_count = self.count
+        print(f"Vector index trained {self.lists} lists on {self.count} vectors "
+              f"in {time.perf_counter() - started_at:.2f} s")
+
+    def search(self, text, k=200, exclude=()):
+        """
+        Return the resumes closest to a text, e.g. a job description.
+
+        Args:
+            text (str): Query text.
+            k (int, optional): Number of resumes to return.
+            exclude (Iterable[str], optional): Resume ids to leave out.
+
+        Returns:
+            list[tuple]: (unique_id, similarity) pairs, most similar first.
+        """
+        query = self.embedder.embed([text])[0]
+        with self._lock:
+            count = self.count
+            if not count:
+                return []
+            if self._centroids is not None:
+                probes = np.argsort(-(self._centroids @ query))[:self.probes]
+                candidates = np.flatnonzero(np.isin(self._assignments[:count], probes))
+            else:
+                candidates = np.arange(count)
+            similarities = np.asarray(self._vectors[candidates]) @ query
+            ids = self._ids[candidates]
+
+        excluded = {str(unique_id).encode() for unique_id in exclude}
+        if excluded:
+            keep = np.array([unique_id not in excluded for unique_id in ids], dtype=bool)
+            similarities, ids = similarities[keep], ids[keep]
+        k = min(k, len(similarities))
+        if k <= 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(bytes(ids[index]).decode(), round(float(similarities[index]), 4)) for index in top]
+
+    def stats(self):
+        """
+        Return the size and layout of the index.
+
+        Returns:
+            dict: Embedder, dimensions, vector count, capacity and IVF state.
+        """
+        with self._lock:
+            return {
+                "embedder": self.embedder.name,
+                "dim": self.embedder.dim,
+                "vectors": self.count,
+                "capacity": self.capacity,
+                "ivf_lists": self.lists if self._centroids is not None else 0,
+                "ivf_probes": self.probes,
+                "trained_on": self.trained_count,
+            }
+
+
+def get_vector_index():
+    """
+    Return the shared vector index, opening it on first use.
+
+    Returns:
+        VectorIndex: The shared index.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex()
+        return _index
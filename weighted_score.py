@@ -3,13 +3,13 @@ import PyPDF2
 import pandas as pd
 import docx
 import win32com.client as win32
-import time
 import tkinter as tk
 from tkinter import filedialog
 from dotenv import load_dotenv
 import google.generativeai as genai
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+import rate_limiter
 from datetime import datetime
 
 
@@ -202,7 +202,8 @@ def get_conversation(template):
         max_retries=3
     )
     prompt = PromptTemplate.from_template(template)
-    return prompt | llm
+    # Every invoke waits on the shared Gemini budget instead of a fixed sleep
+    return rate_limiter.RateLimitedChain(prompt | llm, rate_limiter.get_rate_limiter("gemini-1.5-flash"), template)
 
 def extract_text_from_files(folder_path):
     """
@@ -251,8 +252,6 @@ def process_resumes(resume_df, job_description):
         resume_response = conversation_resume.invoke({"resume_text": resume_text})
         resume_df.loc[i, "resume_key_aspect"] = resume_response.content
         
-        time.sleep(3)  # Avoid API rate limits
-        
         # Score resume
         score_response = conversation_score.invoke({
             "resume_text": resume_text,
@@ -262,7 +261,6 @@ def process_resumes(resume_df, job_description):
 
         print(f"{i+1}. Working on - ",resume_df["resume_file_name"][i])
 
-        time.sleep(3)  # Avoid API rate limits
     return resume_df
 
 def save_results(resume_df):
@@ -48,7 +48,6 @@ async def upload_zip(file: UploadFile = File(...)):
 from fastapi import FastAPI, File, UploadFile
 from io import BytesIO
 import os
-import time
 from typing import List
 from PyPDF2 import PdfReader
 from docx import Document
@@ -67,13 +66,13 @@ import PyPDF2
 import pandas as pd
 import docx
 import win32com.client as win32
-import time
 import tkinter as tk
 from tkinter import filedialog
 from dotenv import load_dotenv
 import google.generativeai as genai
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+import rate_limiter
 from datetime import datetime
 
 # Load API Key
@@ -180,7 +179,8 @@ def get_conversation(template: str):
         max_retries=3
     )
     prompt = PromptTemplate.from_template(template)
-    return prompt | llm
+    # Every invoke waits on the shared Gemini budget instead of a fixed sleep
+    return rate_limiter.RateLimitedChain(prompt | llm, rate_limiter.get_rate_limiter("gemini-1.5-flash"), template)
 
 def read_pdf(file: BytesIO) -> str:
     """Extract text from a PDF file."""
@@ -275,16 +275,12 @@ async def score_resumes(response_data: dict, job_description: str) -> dict:
 
     for filename, file_data in response_data.items():
         resume_response = conversation_resume.invoke({"resume_text": file_data["content"]})
-        time.sleep(3)  # Introducing delay to avoid rate limiting
-
         file_data["key_feature"] = resume_response.content
 
         score_response = conversation_score.invoke({
             "resume_text": resume_response.content,
             "job_description": job_description
         })
-        time.sleep(3)  # Introducing delay to avoid rate limiting
-
         file_data["score"] = score_response.content
         print(f"{filename}: {score_response.content}")
 